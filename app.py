@@ -1,13 +1,42 @@
+import json
+import logging
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor
 import requests # Import requests for requests.exceptions.RequestException
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, Response, g, request, jsonify, send_from_directory
 from flask_swagger_ui import get_swaggerui_blueprint
-from utils.bible import get_bible_verses
-from utils.summarizer import summarize_text
-from utils.archaeology import get_archeological_proof
+from utils import metrics, profiling, request_log
+from utils.bible import BIBLE_BACKEND, BIBLE_CORPUS_PATH, get_bible_verses, passage_exists, verse_cache_key
+from utils.cache import track_lookups
+from utils.corpus import get_local_corpus
+from utils.forksafe import per_process
+from utils.summarizer import (
+    DEFAULT_SUMMARY_MODE, SUMMARY_MODES, effective_summary_mode, model_status, start_model_warmup, summarize_range,
+    summarize_range_stream, summarize_text, summarize_text_stream, summarize_texts
+)
+from utils.archaeology import get_archeological_proof, load_proofs, proofs_index_stats
+from utils.jobs import get_job, start_job_workers, submit_job
+from utils.precompute import get_precomputed
 
 app = Flask(__name__)
 
+# Largest number of references accepted by one /summarize/batch request
+SUMMARIZE_BATCH_MAX_ITEMS = int(os.environ.get("SUMMARIZE_BATCH_MAX_ITEMS", 100))
+# Passages of a batch fetched at the same time
+BATCH_FETCH_WORKERS = int(os.environ.get("BATCH_FETCH_WORKERS", 8))
+
+# Build the archaeology index once at startup; later edits to the data file are hot-reloaded
+load_proofs()
+# Load and warm up the model in the background so the worker can answer /healthz right away.
+# Set MODEL_WARMUP=0 to load it on the first /summarize instead.
+if os.environ.get("MODEL_WARMUP", "1") != "0":
+    start_model_warmup()
+# Pick up queued jobs, and jobs interrupted by a restart, without waiting for a new one.
+# gunicorn.conf.py disables this when preloading and starts them in each worker instead.
+if os.environ.get("JOB_WORKERS_AUTOSTART", "1") != "0":
+    start_job_workers()
+
 # --- Swagger UI Setup ---
 # Serve swagger.yaml from the root directory by creating a static folder for it implicitly
 @app.route('/static/swagger.yaml')
@@ -29,69 +58,388 @@ app.register_blueprint(swaggerui_blueprint)
 # --- End Swagger UI Setup ---
 
 
-@app.route("/summarize", methods=["POST"])
-def summarize():
-    data = request.json
-    if not data:
-        return jsonify({"error": "Request body must be JSON"}), 400
+@app.before_request
+def _start_request_metrics():
+    g.metrics_started = time.perf_counter()
+    metrics.add_gauge("in_flight_requests", 1)
+    if profiling.PROFILING_ENABLED:
+        mode = profiling.requested_mode(
+            request.headers.get("X-Profile") or request.args.get("profile"), request.headers.get("X-Profile-Token")
+        )
+        if mode:
+            g.profile_token = profiling.start(mode)
+
+
+@app.after_request
+def _record_response_status(response):
+    g.metrics_status = response.status_code
+    profile = profiling.current()
+    if profile is not None:
+        # Streamed bodies are generated after this point, so their timings cover only the setup
+        response.headers["Server-Timing"] = profiling.server_timing(profile)
+        summary = profiling.cprofile_summary(profile)
+        body = response.get_json(silent=True) if summary and not response.is_streamed else None
+        if isinstance(body, dict):
+            response.set_data(app.json.dumps({**body, "profile": {"cprofile": summary}}))
+    return response
+
+
+@app.teardown_request
+def _finish_request_metrics(exc):
+    # Popped so a request is counted once, even if its context is torn down twice (test clients)
+    token = g.pop("profile_token", None)
+    if token is not None:
+        profiling.stop(token)
+    started = g.pop("metrics_started", None)
+    if started is None:
+        return
+    # Route patterns, not raw paths, keep the label set bounded
+    endpoint = request.url_rule.rule if request.url_rule is not None else "unmatched"
+    status = g.get("metrics_status", 500)
+    metrics.add_gauge("in_flight_requests", -1)
+    metrics.inc("requests_total", endpoint=endpoint, status=str(status))
+    metrics.observe("request_duration_seconds", time.perf_counter() - started, endpoint=endpoint)
+
+
+@app.route("/metrics")
+def prometheus_metrics():
+    return Response(metrics.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+@app.route("/healthz")
+def healthz():
+    # Liveness only: the process is up and serving requests
+    return jsonify({"status": "ok"})
+
+
+@app.route("/readyz")
+def readyz():
+    # Readiness: only route traffic here once the model is warm and the data is loaded
+    checks = {
+        "model": model_status()["state"],
+        "archaeology": "ready" if proofs_index_stats()["loads"] > 0 else "not_loaded",
+    }
+    if BIBLE_BACKEND != "remote":
+        checks["corpus"] = "ready" if get_local_corpus(BIBLE_CORPUS_PATH) is not None else "not_loaded"
+    ready = all(state == "ready" for state in checks.values())
+    return jsonify({"status": "ready" if ready else "not ready", "checks": checks}), 200 if ready else 503
+
+
+def validate_summary_request(data) -> str | None:
+    """The reason a /summarize body is invalid, or None if it is fine."""
+    if not isinstance(data, dict):
+        return "Request body must be JSON"
 
     book = data.get("book")
     chapter = data.get("chapter")
+    mode = data.get("mode", DEFAULT_SUMMARY_MODE)
 
     if not book or not isinstance(book, str):
-        return jsonify({"error": "Book is required and must be a string"}), 400
+        return "Book is required and must be a string"
     if not chapter: # Chapter can be integer or string like "1-3"
-        return jsonify({"error": "Chapter is required"}), 400
-    
+        return "Chapter is required"
+
     # Basic validation for chapter format (e.g., integer or string like "1" or "1-3")
     # More sophisticated validation could be added (e.g. regex for specific bible book formats)
     try:
         if isinstance(chapter, int):
             if chapter <= 0:
-                return jsonify({"error": "Chapter must be a positive integer"}), 400
+                return "Chapter must be a positive integer"
         elif isinstance(chapter, str):
             if '-' in chapter:
                 start_chap, end_chap = map(str.strip, chapter.split('-', 1))
                 if not (start_chap.isdigit() and end_chap.isdigit() and int(start_chap) > 0 and int(end_chap) > 0 and int(start_chap) <= int(end_chap)):
-                    return jsonify({"error": "Chapter range is invalid"}), 400
+                    return "Chapter range is invalid"
             elif not chapter.isdigit() or int(chapter) <= 0:
-                 return jsonify({"error": "Chapter must be a positive integer or a valid range string like '1-3'"}), 400
+                return "Chapter must be a positive integer or a valid range string like '1-3'"
         else:
-            return jsonify({"error": "Chapter must be an integer or a string"}), 400
+            return "Chapter must be an integer or a string"
 
     except ValueError:
-        return jsonify({"error": "Invalid chapter format"}), 400
+        return "Invalid chapter format"
+
+    if mode not in SUMMARY_MODES:
+        return f"Mode must be one of: {', '.join(SUMMARY_MODES)}"
+    return None
 
 
+def fetch_passage(book: str, chapter) -> tuple[dict | None, tuple[str, int] | None]:
+    """(verses, None) with non-empty verses["text"], or (None, (error message, HTTP status))."""
     try:
         verses = get_bible_verses(book, str(chapter)) # Bible API expects chapter as string
     except requests.exceptions.RequestException as e:
-        return jsonify({"error": f"Error connecting to Bible API: {str(e)}"}), 503 # Service Unavailable
+        return None, (f"Error connecting to Bible API: {str(e)}", 503) # Service Unavailable
+    return check_passage(book, chapter, verses)
+
 
+def check_passage(book: str, chapter, verses: dict) -> tuple[dict | None, tuple[str, int] | None]:
+    """fetch_passage's result for what get_bible_verses returned."""
     if "error" in verses:
         if "not found" in verses["error"].lower(): # Assuming bible-api.com returns specific error messages
-            return jsonify({"error": f"Book or chapter not found: {book} {chapter}"}), 404
-        return jsonify({"error": verses["error"]}), 400 # Other errors from bible API
+            return None, (f"Book or chapter not found: {book} {chapter}", 404)
+        return None, (verses["error"], 400) # Other errors from bible API
 
-    full_text = verses.get("text")
-    if not full_text:
+    if not verses.get("text"):
         # This case might occur if the API returns 200 but no verses (unlikely for valid book/chapter)
-        return jsonify({"error": "No verses found for the specified book and chapter."}), 404
+        return None, ("No verses found for the specified book and chapter.", 404)
+    return verses, None
+
+
+def precomputed_body(book: str, chapter, precomputed: dict) -> dict:
+    return {
+        # The requested reference, as the live path answers, not the artifact's canonical one
+        "book": f"{book} {chapter}",
+        "verses": precomputed["verses"],
+        "summary": precomputed["summary"],
+        "summary_mode": "abstractive",
+        # Proofs are looked up live so dataset edits show up without re-running the job
+        "archeological_proof": get_archeological_proof(book, str(chapter))
+    }
 
+
+def summary_body(book: str, chapter, verses: dict, summary: str, mode: str, proof) -> dict:
+    return {
+        "book": verses.get("reference", f"{book} {chapter}"), # Use reference from API if available
+        "verses": verses["text"],
+        "summary": summary,
+        "summary_mode": mode,
+        "archeological_proof": proof
+    }
+
+
+def _is_range(verses: dict) -> bool:
+    return len(verses.get("chapters") or ()) > 1
+
+
+def summarize_passage(verses: dict, mode: str) -> str:
+    """Summary of fetched verses. Ranges are reduced from per-chapter summaries, which other ranges reuse."""
+    if _is_range(verses):
+        chapters = verses["chapters"]
+        return summarize_range([c["text"] for c in chapters], first_chapter=int(chapters[0]["chapter"]), mode=mode)
+    return summarize_text(verses["text"], mode=mode)
+
+
+def summarize_passage_stream(verses: dict, mode: str):
+    if _is_range(verses):
+        chapters = verses["chapters"]
+        return summarize_range_stream([c["text"] for c in chapters], first_chapter=int(chapters[0]["chapter"]), mode=mode)
+    return summarize_text_stream(verses["text"], mode=mode)
+
+
+@app.route("/summarize", methods=["POST"])
+def summarize():
+    if not request_log.sampled():
+        return _summarize()
+    # Sampled for the request log (REQUEST_LOG_SAMPLE_RATE), along with its cache lookups
+    timestamp, started = time.time(), time.perf_counter()
+    with track_lookups() as lookups:
+        response = app.make_response(_summarize())
+    data = request.get_json(silent=True)
+    if isinstance(data, dict) and isinstance(data.get("book"), str) and data.get("chapter"):
+        request_log.log_request(
+            data["book"], data["chapter"], data.get("mode", DEFAULT_SUMMARY_MODE), timestamp,
+            time.perf_counter() - started, response.status_code,
+            "precomputed" if getattr(g, "precomputed", False) else request_log.cache_status(lookups),
+        )
+    return response
+
+
+def _summarize():
+    data = request.json
+    if not data:
+        return jsonify({"error": "Request body must be JSON"}), 400
+    error = validate_summary_request(data)
+    if error:
+        return jsonify({"error": error}), 400
+
+    book = data["book"]
+    chapter = data["chapter"]
+    mode = data.get("mode", DEFAULT_SUMMARY_MODE)
+
+    # Single chapters materialized by `python -m utils.precompute` skip the fetch and the model
+    precomputed = get_precomputed(book, chapter) if mode == "abstractive" else None
+    if precomputed is not None:
+        g.precomputed = True
+        return jsonify(precomputed_body(book, chapter, precomputed))
+
+    with metrics.timed("stage_duration_seconds", stage="fetch"):
+        verses, error = fetch_passage(book, chapter)
+    if error:
+        return jsonify({"error": error[0]}), error[1]
+
+    # Abstractive requests degrade to extractive while the model is unavailable or overloaded
+    mode = effective_summary_mode(mode)
     try:
-        summary = summarize_text(full_text)
+        # Includes waiting for the model; tokenize, chunk and generate are also timed on their own
+        with metrics.timed("stage_duration_seconds", stage="summarize"):
+            summary = summarize_passage(verses, mode)
     except Exception as e:
         # Log the exception e for debugging
         return jsonify({"error": "Error during text summarization"}), 500
 
-    proof = get_archeological_proof(book, str(chapter)) # Ensure chapter is string for consistency
+    with metrics.timed("stage_duration_seconds", stage="proof"):
+        proof = get_archeological_proof(book, str(chapter)) # Ensure chapter is string for consistency
+
+    with metrics.timed("stage_duration_seconds", stage="serialize"):
+        return jsonify(summary_body(book, chapter, verses, summary, mode, proof))
+
+
+def _ndjson(event: dict) -> str:
+    return json.dumps(event) + "\n"
+
+
+@app.route("/summarize/stream", methods=["POST"])
+def summarize_stream():
+    """
+    /summarize as newline-delimited JSON: a "passage" event with the verses and the proof as soon
+    as they are fetched, a "chunk" event per chunk of a long chapter (or per chapter of a range),
+    then a final
+    "summary" (or "error") event. Request errors are plain JSON with the same status codes.
+    """
+    data = request.json
+    if not data:
+        return jsonify({"error": "Request body must be JSON"}), 400
+    error = validate_summary_request(data)
+    if error:
+        return jsonify({"error": error}), 400
+
+    book = data["book"]
+    chapter = data["chapter"]
+    mode = data.get("mode", DEFAULT_SUMMARY_MODE)
+    proof = get_archeological_proof(book, str(chapter))
+
+    precomputed = get_precomputed(book, chapter) if mode == "abstractive" else None
+    if precomputed is not None:
+        reference, full_text = f"{book} {chapter}", precomputed["verses"]
+        summary_events = iter([{"event": "summary", "summary": precomputed["summary"]}])
+    else:
+        verses, error = fetch_passage(book, chapter)
+        if error:
+            return jsonify({"error": error[0]}), error[1]
+        reference, full_text = verses.get("reference", f"{book} {chapter}"), verses["text"]
+        mode = effective_summary_mode(mode)
+        summary_events = summarize_passage_stream(verses, mode)
+
+    def events():
+        yield _ndjson({"event": "passage", "book": reference, "verses": full_text, "archeological_proof": proof})
+        try:
+            for event in summary_events:
+                if event["event"] == "summary":
+                    event = {**event, "summary_mode": mode}
+                yield _ndjson(event)
+        except Exception:
+            yield _ndjson({"event": "error", "error": "Error during text summarization"})
+
+    # No-cache and X-Accel-Buffering keep proxies (nginx) from holding the events back
+    return Response(events(), mimetype="application/x-ndjson", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+# Separate from the chapter fetch pool, whose threads a range fetched here waits on
+_batch_pool = per_process(lambda: ThreadPoolExecutor(max_workers=BATCH_FETCH_WORKERS, thread_name_prefix="batch-fetch"))
+
+
+@app.route("/summarize/batch", methods=["POST"])
+def summarize_batch():
+    """
+    Many /summarize requests in one call: {"items": [{"book", "chapter", "mode"?}, ...]} (or the
+    bare list). Each distinct passage is fetched once, concurrently, and all abstractive summaries
+    go to the model together. Results come back in input order, each either the /summarize
+    response body or {"error", "status"}, so one bad reference does not fail the others.
+    """
+    data = request.json
+    items = data.get("items") if isinstance(data, dict) else data
+    if not isinstance(items, list) or not items:
+        return jsonify({"error": "Request body must be a non-empty list of {book, chapter} objects, or {\"items\": [...]}"}), 400
+    if len(items) > SUMMARIZE_BATCH_MAX_ITEMS:
+        return jsonify({"error": f"At most {SUMMARIZE_BATCH_MAX_ITEMS} items per batch"}), 400
+
+    results = [None] * len(items)
+    passages = {} # verse cache key -> (book, chapter) of its first occurrence
+    pending = [] # (index, passage key, requested mode)
+    for i, item in enumerate(items):
+        error = validate_summary_request(item)
+        if error:
+            results[i] = {"error": error, "status": 400}
+            continue
+        book, chapter = item["book"], item["chapter"]
+        mode = item.get("mode", DEFAULT_SUMMARY_MODE)
+        precomputed = get_precomputed(book, chapter) if mode == "abstractive" else None
+        if precomputed is not None:
+            results[i] = precomputed_body(book, chapter, precomputed)
+            continue
+        key = verse_cache_key(book, str(chapter))
+        passages.setdefault(key, (book, chapter))
+        pending.append((i, key, mode))
+
+    fetched = dict(zip(passages, _batch_pool().map(lambda ref: fetch_passage(*ref), passages.values())))
+
+    # Summarize each distinct (text, mode) once
+    to_summarize = {} # mode -> {text: (verses, item indices)}
+    for i, key, mode in pending:
+        verses, error = fetched[key]
+        if error:
+            results[i] = {"error": error[0], "status": error[1]}
+            continue
+        to_summarize.setdefault(effective_summary_mode(mode), {}).setdefault(verses["text"], (verses, []))[1].append(i)
+
+    for mode, by_text in to_summarize.items():
+        groups = list(by_text.values())
+        # Single passages share model batches; ranges are reduced from their chapters' summaries.
+        # A failure only fails the items it covers.
+        singles = [verses["text"] for verses, _ in groups if not _is_range(verses)]
+        try:
+            single_summaries = iter(summarize_texts(singles, mode=mode))
+        except Exception as e:
+            logging.error(f"Error during batch summarization: {e}")
+            single_summaries = iter([None] * len(singles))
+        summaries = []
+        for verses, _ in groups:
+            if not _is_range(verses):
+                summaries.append(next(single_summaries))
+                continue
+            try:
+                summaries.append(summarize_passage(verses, mode))
+            except Exception as e:
+                logging.error(f"Error during batch summarization of a range: {e}")
+                summaries.append(None)
+        for summary, (verses, indices) in zip(summaries, groups):
+            for i in indices:
+                if summary is None:
+                    results[i] = {"error": "Error during text summarization", "status": 500}
+                    continue
+                book, chapter = items[i]["book"], items[i]["chapter"]
+                results[i] = summary_body(book, chapter, verses, summary, mode, get_archeological_proof(book, str(chapter)))
+
+    return jsonify({"results": results})
+
+@app.route("/jobs", methods=["POST"])
+def create_job():
+    """Queues a /summarize request (typically a long range) as a background job and returns 202 with its id."""
+    data = request.json
+    if not data:
+        return jsonify({"error": "Request body must be JSON"}), 400
+    error = validate_summary_request(data)
+    if error:
+        return jsonify({"error": error}), 400
+    priority = data.get("priority", 0)
+    if not isinstance(priority, int) or isinstance(priority, bool):
+        return jsonify({"error": "Priority must be an integer"}), 400
+
+    book, chapter = data["book"], data["chapter"]
+    if not passage_exists(book, str(chapter)):
+        return jsonify({"error": f"Book or chapter not found: {book} {chapter}"}), 404
+
+    job_id = submit_job(book, chapter, mode=data.get("mode", DEFAULT_SUMMARY_MODE), priority=priority)
+    status_url = f"/jobs/{job_id}"
+    return jsonify({"id": job_id, "state": "queued", "status_url": status_url}), 202, {"Location": status_url}
+
+
+@app.route("/jobs/<job_id>")
+def job_status(job_id):
+    job = get_job(job_id)
+    if job is None:
+        return jsonify({"error": f"Job not found: {job_id}"}), 404
+    return jsonify(job)
 
-    return jsonify({
-        "book": verses.get("reference", f"{book} {chapter}"), # Use reference from API if available
-        "verses": full_text,
-        "summary": summary,
-        "archeological_proof": proof
-    })
 
 if __name__ == "__main__":
     # Consider using environment variables for host and port in production
@@ -0,0 +1,250 @@
+"""
+ASGI entry point: POST /summarize on an event loop, every other route through the Flask app.
+
+Under gunicorn's gthread workers a /summarize request holds one of GUNICORN_THREADS threads while
+it waits for bible-api.com, so a slow upstream caps throughput with the CPU idle. Here the verse
+fetch is awaited on the shared httpx.AsyncClient (utils.http_client) and only the summarization
+itself, which needs a thread, runs on an executor of SUMMARIZE_EXECUTOR_WORKERS threads. Waiting
+requests cost a coroutine each, not a thread.
+
+The request body, status codes and response JSON are the same as app.summarize's. Requests the
+native handler does not take (bodies that are not a JSON object, profiled requests, other routes)
+are passed to the Flask app on a separate pool of WSGI_THREADS threads, so their responses are
+byte for byte what the WSGI deployment sends. Needs the optional `httpx` and an ASGI server:
+
+    pip install httpx uvicorn
+    uvicorn asgi:app --workers 2 --port 5000
+    gunicorn asgi:app -k uvicorn.workers.UvicornWorker    # With gunicorn.conf.py's hooks
+"""
+import asyncio
+import contextvars
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from io import BytesIO
+from urllib.parse import parse_qs
+import requests
+from app import (
+    app as flask_app, check_passage, precomputed_body, summarize_passage, summary_body, validate_summary_request
+)
+from utils import metrics, profiling, request_log
+from utils.archaeology import get_archeological_proof
+from utils.bible import get_bible_verses_async
+from utils.cache import track_lookups
+from utils.forksafe import per_process
+from utils.http_client import aclose_async_client
+from utils.precompute import get_precomputed
+from utils.summarizer import DEFAULT_SUMMARY_MODE, effective_summary_mode
+
+# Threads summarizing at the same time per worker, like gunicorn's GUNICORN_THREADS
+SUMMARIZE_EXECUTOR_WORKERS = int(os.environ.get("SUMMARIZE_EXECUTOR_WORKERS", 4))
+# Threads running requests passed on to the Flask app
+WSGI_THREADS = int(os.environ.get("WSGI_THREADS", 4))
+
+_summarize_pool = per_process(lambda: ThreadPoolExecutor(max_workers=SUMMARIZE_EXECUTOR_WORKERS, thread_name_prefix="asgi-summarize"))
+_wsgi_pool = per_process(lambda: ThreadPoolExecutor(max_workers=WSGI_THREADS, thread_name_prefix="asgi-wsgi"))
+
+
+async def app(scope, receive, send):
+    if scope["type"] == "lifespan":
+        await _lifespan(receive, send)
+        return
+    if scope["type"] != "http":
+        return
+    body = await _read_body(receive)
+    if scope["method"] == "POST" and scope["path"] == "/summarize":
+        data = _json_object(scope, body)
+        if data and not _wants_profile(scope):
+            await _summarize(data, send)
+            return
+    await _call_flask(scope, body, send)
+
+
+async def fetch_passage_async(book: str, chapter) -> tuple[dict | None, tuple[str, int] | None]:
+    """app.fetch_passage, awaiting the upstream call instead of blocking a thread on it."""
+    try:
+        verses = await get_bible_verses_async(book, str(chapter))
+    except requests.exceptions.RequestException as e:
+        return None, (f"Error connecting to Bible API: {str(e)}", 503)
+    return check_passage(book, chapter, verses)
+
+
+async def summarize_response(data: dict, info: dict | None = None) -> tuple[int, dict]:
+    """(status, body) of app.summarize for a JSON object body. Sets info["precomputed"] when served from the artifact."""
+    error = validate_summary_request(data)
+    if error:
+        return 400, {"error": error}
+
+    book = data["book"]
+    chapter = data["chapter"]
+    mode = data.get("mode", DEFAULT_SUMMARY_MODE)
+
+    # The precomputed artifact is SQLite, read on a thread so a slow read never stalls the loop
+    precomputed = await asyncio.get_running_loop().run_in_executor(None, get_precomputed, book, chapter) if mode == "abstractive" else None
+    if precomputed is not None:
+        if info is not None:
+            info["precomputed"] = True
+        return 200, precomputed_body(book, chapter, precomputed)
+
+    with metrics.timed("stage_duration_seconds", stage="fetch"):
+        verses, error = await fetch_passage_async(book, chapter)
+    if error:
+        return error[1], {"error": error[0]}
+
+    mode = effective_summary_mode(mode)
+    try:
+        with metrics.timed("stage_duration_seconds", stage="summarize"):
+            # The copied context carries this request's cache lookup tracking into the thread
+            run = partial(contextvars.copy_context().run, summarize_passage, verses, mode)
+            summary = await asyncio.get_running_loop().run_in_executor(_summarize_pool(), run)
+    except Exception:
+        return 500, {"error": "Error during text summarization"}
+
+    with metrics.timed("stage_duration_seconds", stage="proof"):
+        proof = get_archeological_proof(book, str(chapter))
+    return 200, summary_body(book, chapter, verses, summary, mode, proof)
+
+
+async def _summarize(data: dict, send) -> None:
+    started, timestamp = time.perf_counter(), time.time()
+    metrics.add_gauge("in_flight_requests", 1)
+    status = 500
+    try:
+        sampled = request_log.sampled()
+        info = {}
+        with track_lookups() as lookups:
+            status, body = await summarize_response(data, info)
+        with metrics.timed("stage_duration_seconds", stage="serialize"):
+            # Serialized exactly as flask.jsonify does
+            payload = (flask_app.json.dumps(body, separators=(",", ":")) + "\n").encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(payload)).encode())],
+        })
+        await send({"type": "http.response.body", "body": payload})
+        if sampled and isinstance(data.get("book"), str) and data.get("chapter"):
+            request_log.log_request(
+                data["book"], data["chapter"], data.get("mode", DEFAULT_SUMMARY_MODE), timestamp,
+                time.perf_counter() - started, status, "precomputed" if info.get("precomputed") else request_log.cache_status(lookups),
+            )
+    finally:
+        metrics.add_gauge("in_flight_requests", -1)
+        metrics.inc("requests_total", endpoint="/summarize", status=str(status))
+        metrics.observe("request_duration_seconds", time.perf_counter() - started, endpoint="/summarize")
+
+
+def _json_object(scope, body: bytes) -> dict | None:
+    # Only what Flask would parse as a JSON object; anything else gets Flask's own error response
+    content_type = _header(scope, b"content-type").split(";")[0].strip().lower()
+    if not (content_type == "application/json" or (content_type.startswith("application/") and content_type.endswith("+json"))):
+        return None
+    try:
+        data = json.loads(body)
+    except ValueError:
+        return None
+    return data if isinstance(data, dict) else None
+
+
+def _wants_profile(scope) -> bool:
+    # Profiles (and cProfile in particular) follow one request thread, so they are taken by the Flask app
+    if not profiling.PROFILING_ENABLED:
+        return False
+    return bool(_header(scope, b"x-profile") or parse_qs(scope["query_string"].decode("latin-1")).get("profile"))
+
+
+def _header(scope, name: bytes) -> str:
+    for key, value in scope["headers"]:
+        if key.lower() == name:
+            return value.decode("latin-1")
+    return ""
+
+
+async def _read_body(receive) -> bytes:
+    chunks = []
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            break
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body"):
+            break
+    return b"".join(chunks)
+
+
+async def _lifespan(receive, send) -> None:
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            await aclose_async_client()
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+def _wsgi_environ(scope, body: bytes) -> dict:
+    server = scope.get("server") or ("localhost", 80)
+    client = scope.get("client") or ("", 0)
+    environ = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": scope.get("root_path", "").encode("utf-8").decode("latin-1"),
+        "PATH_INFO": scope["path"].encode("utf-8").decode("latin-1"),
+        "QUERY_STRING": scope["query_string"].decode("latin-1"),
+        "SERVER_NAME": server[0],
+        "SERVER_PORT": str(server[1]),
+        "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+        "REMOTE_ADDR": client[0],
+        "REMOTE_PORT": str(client[1]),
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": BytesIO(body),
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": True,
+        "wsgi.run_once": False,
+    }
+    for key, value in scope["headers"]:
+        name = key.decode("latin-1").upper().replace("-", "_")
+        value = value.decode("latin-1")
+        if name in ("CONTENT_LENGTH", "TRANSFER_ENCODING"):
+            continue
+        if name == "CONTENT_TYPE":
+            environ[name] = value
+            continue
+        name = f"HTTP_{name}"
+        environ[name] = f"{environ[name]},{value}" if name in environ else value
+    # The body is already read whole, chunked or not
+    environ["CONTENT_LENGTH"] = str(len(body))
+    return environ
+
+
+async def _call_flask(scope, body: bytes, send) -> None:
+    """Runs the request through the Flask app on the WSGI pool, streaming its response (e.g. /summarize/stream)."""
+    loop = asyncio.get_running_loop()
+    pool = _wsgi_pool()
+    started = {}
+
+    def start_response(status, headers, exc_info=None):
+        started["status"] = int(status.split(" ", 1)[0])
+        started["headers"] = [(name.lower().encode("latin-1"), value.encode("latin-1")) for name, value in headers]
+        return lambda data: None  # The legacy write() callable; Flask never uses it
+
+    iterable = await loop.run_in_executor(pool, flask_app, _wsgi_environ(scope, body), start_response)
+    try:
+        iterator = iter(iterable)
+        done = object()
+        chunk = await loop.run_in_executor(pool, next, iterator, done)
+        await send({"type": "http.response.start", "status": started["status"], "headers": started["headers"]})
+        while chunk is not done:
+            if chunk:
+                await send({"type": "http.response.body", "body": chunk, "more_body": True})
+            chunk = await loop.run_in_executor(pool, next, iterator, done)
+        await send({"type": "http.response.body", "body": b""})
+    finally:
+        if hasattr(iterable, "close"):
+            # after_request and teardown already ran inside wsgi_app; close() only ends a streamed body's generator
+            await loop.run_in_executor(pool, iterable.close)
@@ -0,0 +1,113 @@
+"""
+Latency and throughput of the summarizer backends (SUMMARIZER_BACKENDS) on the same inputs.
+
+For each backend it reports load time, per-summary latency (mean, p50, p95) for one text per call,
+and throughput for the same texts sent as padded batches of SUMMARY_BATCH_SIZE. Inputs are
+chapters of the packed corpus that fit the model in one pass, or built-in passages without one.
+
+    python -m benchmarks.bench_backends --backends pytorch onnx onnx-int8 --texts 20 --output backends.json
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import time
+from utils import summarizer
+from utils.bible import BIBLE_CORPUS_PATH
+from utils.books import BOOKS
+from utils.corpus import LocalCorpus
+
+FALLBACK_TEXTS = [
+    "In the beginning God created the heaven and the earth. And the earth was without form, and void; and darkness "
+    "was upon the face of the deep. And the Spirit of God moved upon the face of the waters. And God said, Let there "
+    "be light: and there was light.",
+    "The LORD is my shepherd; I shall not want. He maketh me to lie down in green pastures: he leadeth me beside the "
+    "still waters. He restoreth my soul: he leadeth me in the paths of righteousness for his name's sake.",
+    "For God so loved the world, that he gave his only begotten Son, that whosoever believeth in him should not "
+    "perish, but have everlasting life. For God sent not his Son into the world to condemn the world; but that the "
+    "world through him might be saved.",
+]
+
+
+def load_texts(corpus_path: str, count: int, seed: int) -> list[str]:
+    if not os.path.exists(corpus_path):
+        return [FALLBACK_TEXTS[i % len(FALLBACK_TEXTS)] for i in range(count)]
+    corpus = LocalCorpus(corpus_path)
+    chapters = [(book.id, chapter) for book in BOOKS for chapter in range(1, book.chapters + 1)]
+    random.Random(seed).shuffle(chapters)
+    texts = []
+    for book_id, chapter in chapters:
+        text = corpus.get_text(book_id, str(chapter))
+        # Character bound keeps inputs under the model limit without needing a tokenizer yet
+        if text and len(text) < 3000:
+            texts.append(text)
+        if len(texts) == count:
+            break
+    corpus.close()
+    return texts
+
+
+def percentile(values: list[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def bench_backend(backend: str, texts: list[str]) -> dict:
+    started = time.perf_counter()
+    engine = summarizer.build_pipeline(backend)
+    load_seconds = time.perf_counter() - started
+    params = dict(max_length=summarizer.SUMMARY_MAX_LENGTH, min_length=summarizer.SUMMARY_MIN_LENGTH, do_sample=False, truncation=True)
+    engine(summarizer.WARMUP_TEXT, **params)
+
+    latencies = []
+    for text in texts:
+        started = time.perf_counter()
+        engine(text, **params)
+        latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    engine(texts, batch_size=summarizer.SUMMARY_BATCH_SIZE, **params)
+    batched_seconds = time.perf_counter() - started
+
+    return {
+        "load_seconds": round(load_seconds, 2),
+        "mean_ms": round(statistics.mean(latencies) * 1000, 1),
+        "p50_ms": round(percentile(latencies, 0.5) * 1000, 1),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 1),
+        "sequential_per_second": round(len(texts) / sum(latencies), 3),
+        "batched_per_second": round(len(texts) / batched_seconds, 3),
+    }
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Compare summarizer backends.")
+    parser.add_argument("--backends", nargs="+", default=list(summarizer.SUMMARIZER_BACKENDS), choices=summarizer.SUMMARIZER_BACKENDS)
+    parser.add_argument("--corpus", default=BIBLE_CORPUS_PATH, help="Packed corpus to sample chapters from")
+    parser.add_argument("--texts", type=int, default=20, help="Number of inputs")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the chapter sample")
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    args = parser.parse_args(argv)
+
+    texts = load_texts(args.corpus, args.texts, args.seed)
+    results = {"texts": len(texts), "batch_size": summarizer.SUMMARY_BATCH_SIZE, "backends": {}}
+    for backend in args.backends:
+        print(f"Benchmarking {backend}...")
+        try:
+            results["backends"][backend] = bench_backend(backend, texts)
+        except Exception as e:
+            results["backends"][backend] = {"error": str(e)}
+
+    baseline = results["backends"].get("pytorch", {})
+    for backend, result in results["backends"].items():
+        if backend != "pytorch" and "p50_ms" in result and "p50_ms" in baseline:
+            result["p50_speedup_vs_pytorch"] = round(baseline["p50_ms"] / result["p50_ms"], 2)
+
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
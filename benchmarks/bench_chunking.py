@@ -0,0 +1,110 @@
+"""
+Compares the old character-based chunking of summarize_text with token-aware chunking.
+
+For every chapter of the packed corpus it counts how many chunks (model forward passes, not
+counting the recombination pass) each strategy produces. With --time N it also runs the model
+over a sample of N chapters with both strategies, and with the token chunks of each chapter sent
+as one padded batch (summarize_batch), and reports the wall time.
+
+    python -m benchmarks.bench_chunking --corpus data/kjv.pack --time 20 --output chunking.json
+"""
+import argparse
+import json
+import random
+import time
+from utils import summarizer
+from utils.bible import BIBLE_CORPUS_PATH
+from utils.books import BOOKS
+from utils.corpus import LocalCorpus
+
+# Constants of the character-based implementation this replaces
+LEGACY_MAX_INPUT_CHARS = 1024
+LEGACY_CHUNK_CHARS = LEGACY_MAX_INPUT_CHARS - summarizer.SUMMARY_MAX_LENGTH
+
+
+def legacy_chunks(text: str) -> list[str]:
+    """Chunks exactly as the old summarize_text did: fixed character slices."""
+    if len(text) <= LEGACY_MAX_INPUT_CHARS:
+        return [text]
+    num_chunks = len(text) // LEGACY_CHUNK_CHARS + 1
+    return [text[i * LEGACY_CHUNK_CHARS:(i + 1) * LEGACY_CHUNK_CHARS] for i in range(num_chunks)]
+
+
+def token_chunks(text: str) -> list[str]:
+    """Chunks as summarize_text does now."""
+    if summarizer.count_tokens(text) <= summarizer.MODEL_MAX_INPUT_LENGTH - summarizer.MODEL_SPECIAL_TOKENS:
+        return [text]
+    return summarizer.chunk_text(text)
+
+
+def iter_chapters(corpus: LocalCorpus):
+    for book in BOOKS:
+        for chapter in range(1, book.chapters + 1):
+            text = corpus.get_text(book.id, str(chapter))
+            if text:
+                yield f"{book.name} {chapter}", text
+
+
+def run_chunks(chunks: list[str], batched: bool = False) -> None:
+    max_length = summarizer.SUMMARY_MAX_LENGTH if len(chunks) == 1 else max(summarizer.SUMMARY_MIN_LENGTH, summarizer.SUMMARY_MAX_LENGTH // len(chunks))
+    min_length = summarizer.SUMMARY_MIN_LENGTH if len(chunks) == 1 else max(10, summarizer.SUMMARY_MIN_LENGTH // len(chunks))
+    if batched:
+        summarizer.summarize_batch(chunks, max_length, min_length)
+        return
+    for chunk in chunks:
+        summarizer.summarizer_pipeline(chunk, max_length=max_length, min_length=min_length, do_sample=False, truncation=True)
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Chunk counts and wall time: character-based vs token-aware chunking.")
+    parser.add_argument("--corpus", default=BIBLE_CORPUS_PATH, help="Packed corpus built with utils.corpus")
+    parser.add_argument("--time", type=int, default=0, metavar="N", help="Also time the model on N sampled chapters")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the timing sample")
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    args = parser.parse_args(argv)
+
+    if not summarizer.load_model():
+        print("Model unavailable: token counts are character estimates and timing is skipped")
+
+    corpus = LocalCorpus(args.corpus)
+    chapters = list(iter_chapters(corpus))
+    legacy_total = 0
+    token_total = 0
+    chunked_chapters = 0
+    started = time.perf_counter()
+    for _, text in chapters:
+        legacy_total += len(legacy_chunks(text))
+        token_count = len(token_chunks(text))
+        token_total += token_count
+        chunked_chapters += token_count > 1
+    chunking_seconds = time.perf_counter() - started
+
+    results = {
+        "chapters": len(chapters),
+        "legacy_chunks": legacy_total,
+        "token_chunks": token_total,
+        "chunks_saved": legacy_total - token_total,
+        "chunk_reduction": round(legacy_total / token_total, 2) if token_total else None,
+        "chapters_needing_chunking": chunked_chapters,
+        "token_chunking_seconds": round(chunking_seconds, 3),
+    }
+
+    if args.time and summarizer.summarizer_pipeline is not None:
+        sample = random.Random(args.seed).sample(chapters, min(args.time, len(chapters)))
+        for name, strategy, batched in (("legacy", legacy_chunks, False), ("token", token_chunks, False), ("token_batched", token_chunks, True)):
+            started = time.perf_counter()
+            for _, text in sample:
+                run_chunks(strategy(text), batched)
+            results[f"{name}_model_seconds"] = round(time.perf_counter() - started, 2)
+        results["timed_chapters"] = len(sample)
+        results["model_seconds_saved"] = round(results["legacy_model_seconds"] - results["token_batched_model_seconds"], 2)
+
+    corpus.close()
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Per-worker memory of the gunicorn deployment, with and without preload-and-fork.
+
+Starts `gunicorn app:app` (configured by gunicorn.conf.py) once per mode, waits until /readyz
+answers 200 consistently (every worker has its model warm), then reads /proc/<pid>/smaps_rollup
+for the master and each worker. RSS counts shared pages in full for every process; PSS divides
+them among the processes sharing them, so the sum of PSS is the real footprint. With preload the
+model weights show up as shared and each worker's private (USS) memory stays small. Linux only.
+
+    python -m benchmarks.bench_fork_memory --workers 4 --output fork_memory.json
+"""
+import argparse
+import json
+import os
+import signal
+import subprocess
+import sys
+import time
+import requests
+
+_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+_FIELDS = ("Rss", "Pss", "Shared_Clean", "Shared_Dirty", "Private_Clean", "Private_Dirty")
+
+
+def read_memory(pid: int) -> dict:
+    """Memory of one process in MiB, from /proc/<pid>/smaps_rollup."""
+    values = {}
+    with open(f"/proc/{pid}/smaps_rollup", "r", encoding="utf-8") as f:
+        for line in f:
+            name, _, rest = line.partition(":")
+            if name in _FIELDS:
+                values[name] = int(rest.split()[0]) / 1024  # kB -> MiB
+    return {
+        "rss_mb": round(values["Rss"], 1),
+        "pss_mb": round(values["Pss"], 1),
+        "shared_mb": round(values["Shared_Clean"] + values["Shared_Dirty"], 1),
+        "uss_mb": round(values["Private_Clean"] + values["Private_Dirty"], 1),
+    }
+
+
+def child_pids(pid: int) -> list[int]:
+    with open(f"/proc/{pid}/task/{pid}/children", "r", encoding="utf-8") as f:
+        return [int(child) for child in f.read().split()]
+
+
+def wait_until_ready(port: int, workers: int, timeout: float) -> None:
+    # Requests land on arbitrary workers; enough consecutive 200s means all of them are warm
+    deadline = time.monotonic() + timeout
+    streak = 0
+    while streak < workers * 5:
+        if time.monotonic() > deadline:
+            raise TimeoutError(f"Workers not ready after {timeout}s")
+        try:
+            ok = requests.get(f"http://127.0.0.1:{port}/readyz", timeout=5).status_code == 200
+        except requests.exceptions.RequestException:
+            ok = False
+        streak = streak + 1 if ok else 0
+        time.sleep(0.1 if ok else 1)
+
+
+def measure(mode: str, workers: int, port: int, timeout: float) -> dict:
+    env = dict(os.environ, PORT=str(port), WEB_CONCURRENCY=str(workers), GUNICORN_PRELOAD="1" if mode == "preload" else "0")
+    server = subprocess.Popen([sys.executable, "-m", "gunicorn", "app:app"], cwd=_ROOT, env=env)
+    try:
+        started = time.monotonic()
+        wait_until_ready(port, workers, timeout)
+        ready_seconds = time.monotonic() - started
+        master = read_memory(server.pid)
+        worker_memory = [read_memory(pid) for pid in child_pids(server.pid)]
+    finally:
+        server.send_signal(signal.SIGTERM)
+        server.wait(timeout=30)
+
+    return {
+        "ready_seconds": round(ready_seconds, 1),
+        "master": master,
+        "workers": worker_memory,
+        "worker_rss_mb": round(sum(w["rss_mb"] for w in worker_memory) / len(worker_memory), 1),
+        "worker_uss_mb": round(sum(w["uss_mb"] for w in worker_memory) / len(worker_memory), 1),
+        "total_pss_mb": round(master["pss_mb"] + sum(w["pss_mb"] for w in worker_memory), 1),
+    }
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Measure gunicorn worker memory with and without preload.")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--modes", nargs="+", default=["preload", "no-preload"], choices=["preload", "no-preload"])
+    parser.add_argument("--timeout", type=float, default=600, help="Seconds to wait for the workers to be ready")
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    args = parser.parse_args(argv)
+
+    results = {"workers": args.workers}
+    for mode in args.modes:
+        print(f"Measuring {mode} with {args.workers} worker(s)...")
+        results[mode] = measure(mode, args.workers, args.port, args.timeout)
+
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
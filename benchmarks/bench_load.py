@@ -0,0 +1,162 @@
+"""
+Throughput and latency of POST /summarize at several concurrency levels.
+
+Starts the fake bible-api.com (benchmarks.fake_bible_api) in this process. For each level it
+starts a fresh app server with empty caches (benchmarks.serve) and runs that many client threads
+for --duration seconds. Each client sends requests back to back, drawing references from a pool of
+--references chapters with Zipf-distributed popularity (--zipf 0 for uniform), so caches see a
+realistic mix of hits and misses. Everything is seeded, so runs with the same arguments send the
+same requests. Reports requests per second and p50/p95/p99 latency per level.
+
+    python -m benchmarks.bench_load --concurrency 1 4 16 --duration 30 --api-latency-ms 150 --output load.json
+
+The stub model (default) costs --model-call-ms per batch; --model real loads distilbart. To
+measure another deployment, such as gunicorn, start it with BIBLE_API_URL pointing at
+--api-port and pass its URL with --url; its caches are then not reset between levels.
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+import requests
+from benchmarks.bench_backends import percentile
+from benchmarks.fake_bible_api import FakeBibleAPI
+from utils.books import BOOKS
+
+_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+
+def reference_pool(count: int, seed: int) -> list[dict]:
+    chapters = [{"book": book.name, "chapter": str(chapter)} for book in BOOKS for chapter in range(1, book.chapters + 1)]
+    return random.Random(seed).sample(chapters, min(count, len(chapters)))
+
+
+def run_clients(url: str, pool: list[dict], weights: list[float], concurrency: int, duration: float, seed: int, mode: str) -> dict:
+    latencies = []
+    statuses = {}
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration
+
+    def client(index: int) -> None:
+        rng = random.Random(seed * 1000 + index)
+        session = requests.Session()
+        while time.monotonic() < deadline:
+            body = {**rng.choices(pool, weights)[0], "mode": mode}
+            started = time.perf_counter()
+            try:
+                status = session.post(f"{url}/summarize", json=body, timeout=120).status_code
+            except requests.exceptions.RequestException:
+                status = "error"
+            elapsed = time.perf_counter() - started
+            with lock:
+                latencies.append(elapsed)
+                statuses[str(status)] = statuses.get(str(status), 0) + 1
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall_seconds = time.perf_counter() - started
+
+    return {
+        "requests": len(latencies),
+        "requests_per_second": round(len(latencies) / wall_seconds, 2),
+        "statuses": statuses,
+        "mean_ms": round(sum(latencies) / len(latencies) * 1000, 1) if latencies else None,
+        "p50_ms": round(percentile(latencies, 0.5) * 1000, 1) if latencies else None,
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 1) if latencies else None,
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 1) if latencies else None,
+    }
+
+
+def wait_until_ready(url: str, server: subprocess.Popen | None, timeout: float) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if server is not None and server.poll() is not None:
+            raise RuntimeError(f"Server exited with code {server.returncode}")
+        try:
+            if requests.get(f"{url}/readyz", timeout=5).status_code == 200:
+                return
+        except requests.exceptions.RequestException:
+            pass
+        time.sleep(0.2)
+    raise TimeoutError(f"{url} not ready after {timeout}s")
+
+
+def start_server(args, api_url: str) -> subprocess.Popen:
+    command = [
+        sys.executable, "-m", "benchmarks.serve", "--port", str(args.port), "--bible-api-url", api_url, "--server", args.server,
+        "--model", args.model, "--model-call-ms", str(args.model_call_ms), "--model-token-ms", str(args.model_token_ms),
+    ]
+    if args.model_busy:
+        command.append("--model-busy")
+    return subprocess.Popen(command, cwd=_ROOT, stdout=subprocess.DEVNULL)
+
+
+def git_revision() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=_ROOT, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Load test /summarize against local stand-ins for bible-api.com and the model.")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16], help="Client threads, one run per value")
+    parser.add_argument("--duration", type=float, default=20, help="Seconds per concurrency level")
+    parser.add_argument("--references", type=int, default=200, help="Distinct chapters requested")
+    parser.add_argument("--zipf", type=float, default=1.0, help="Popularity skew of the references (0 for uniform)")
+    parser.add_argument("--mode", choices=["abstractive", "extractive"], default="abstractive")
+    parser.add_argument("--api-latency-ms", type=float, default=150, help="Fake bible-api.com response time")
+    parser.add_argument("--api-jitter-ms", type=float, default=100, help="Extra random fake bible-api.com delay")
+    parser.add_argument("--api-error-rate", type=float, default=0, help="Fraction of fake bible-api.com 503s")
+    parser.add_argument("--api-port", type=int, default=0, help="Fake bible-api.com port (default: any free port)")
+    parser.add_argument("--server", choices=["wsgi", "asgi"], default="wsgi", help="Serve the app with werkzeug or asgi:app on uvicorn")
+    parser.add_argument("--model", choices=["stub", "real"], default="stub")
+    parser.add_argument("--model-call-ms", type=float, default=50, help="Stub model: fixed cost of each batch")
+    parser.add_argument("--model-token-ms", type=float, default=0.05, help="Stub model: cost per input token")
+    parser.add_argument("--model-busy", action="store_true", help="Stub model: spin on the CPU instead of sleeping")
+    parser.add_argument("--port", type=int, default=8767, help="Port of the app server started for each level")
+    parser.add_argument("--url", help="Benchmark this already running server instead of starting one")
+    parser.add_argument("--timeout", type=float, default=600, help="Seconds to wait for the server to be ready")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    args = parser.parse_args(argv)
+
+    pool = reference_pool(args.references, args.seed)
+    weights = [1 / (rank ** args.zipf) for rank in range(1, len(pool) + 1)]
+    api = FakeBibleAPI(args.api_latency_ms, args.api_jitter_ms, args.api_error_rate, port=args.api_port, seed=args.seed)
+    api_url = api.start()
+    results = {"revision": git_revision(), "started_at": time.time(), "config": vars(args), "levels": {}}
+    try:
+        for concurrency in args.concurrency:
+            print(f"Running {concurrency} client(s) for {args.duration}s...")
+            server = None if args.url else start_server(args, api_url)
+            url = args.url or f"http://127.0.0.1:{args.port}"
+            try:
+                wait_until_ready(url, server, args.timeout)
+                upstream_before = api.requests
+                level = run_clients(url, pool, weights, concurrency, args.duration, args.seed, args.mode)
+                level["upstream_requests"] = api.requests - upstream_before
+                results["levels"][str(concurrency)] = level
+            finally:
+                if server is not None:
+                    server.terminate()
+                    server.wait(timeout=30)
+    finally:
+        api.stop()
+
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Microbenchmarks of the hot paths that run on every uncached request.
+
+- chunking: count_tokens + chunk_text on chapters too long for one model pass
+- summarize_text: the whole chunked path (chunking, the batching scheduler, recombination) on
+  the stub model at zero cost, so only this service's own overhead is measured
+- proof: get_archeological_proof for a chapter with a proof, one without and an alias spelling
+
+Chapters come from the fake bible-api.com's generator, or from the packed corpus when it exists.
+The tokenizer is the stub model's, or distilbart's with --model real. Each benchmark reports
+per-call mean, p50 and p95 in microseconds.
+
+    python -m benchmarks.bench_micro --iterations 2000 --output micro.json
+"""
+import argparse
+import json
+import statistics
+import time
+from benchmarks import stub_model
+from benchmarks.bench_backends import percentile
+from benchmarks.bench_load import git_revision
+from benchmarks.fake_bible_api import FakeBibleAPI
+from utils import archaeology, summarizer
+from utils.books import BOOKS
+
+
+def timings(function, args_list: list[tuple], iterations: int) -> dict:
+    durations = []
+    for i in range(iterations):
+        args = args_list[i % len(args_list)]
+        started = time.perf_counter()
+        function(*args)
+        durations.append(time.perf_counter() - started)
+    return {
+        "calls": len(durations),
+        "mean_us": round(statistics.mean(durations) * 1e6, 1),
+        "p50_us": round(percentile(durations, 0.5) * 1e6, 1),
+        "p95_us": round(percentile(durations, 0.95) * 1e6, 1),
+    }
+
+
+def long_chapters(count: int) -> list[str]:
+    """The first `count` chapters that need more than one model pass."""
+    api = FakeBibleAPI()
+    texts = []
+    for book in BOOKS:
+        for chapter in range(1, book.chapters + 1):
+            text = api.chapter(f"{book.name} {chapter}")["text"]
+            if summarizer.count_tokens(text) > summarizer.MODEL_MAX_INPUT_LENGTH - summarizer.MODEL_SPECIAL_TOKENS:
+                texts.append(text)
+            if len(texts) == count:
+                api.stop()
+                return texts
+    api.stop()
+    return texts
+
+
+def chunk(text: str) -> None:
+    summarizer.count_tokens(text)
+    summarizer.chunk_text(text)
+
+
+def summarize_uncached(text: str) -> None:
+    summarizer.summary_cache.memory.clear()
+    summarizer.summarize_text(text)
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Microbenchmarks of chunking, the summarize path and proof lookup.")
+    parser.add_argument("--iterations", type=int, default=1000, help="Calls per benchmark")
+    parser.add_argument("--chapters", type=int, default=20, help="Long chapters to cycle through")
+    parser.add_argument("--model", choices=["stub", "real"], default="stub", help="Whose tokenizer chunking uses")
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    args = parser.parse_args(argv)
+
+    stub = stub_model.StubPipeline(call_ms=0, token_ms=0)
+    if args.model == "real":
+        if not summarizer.load_model():
+            raise SystemExit(f"Could not load the model: {summarizer.model_status()['error']}")
+    else:
+        stub_model.install(stub)
+    # The disk tier would turn repeated summaries into cache hits
+    summarizer.summary_cache.disk = None
+    archaeology.load_proofs()
+
+    texts = [(text,) for text in long_chapters(args.chapters)]
+    results = {"revision": git_revision(), "config": vars(args), "chunking": timings(chunk, texts, args.iterations)}
+    if args.model == "stub":
+        results["summarize_text"] = timings(summarize_uncached, texts, max(1, args.iterations // 10))
+    results["proof"] = {
+        "hit": timings(archaeology.get_archeological_proof, [("Genesis", "1")], args.iterations),
+        "miss": timings(archaeology.get_archeological_proof, [("Obadiah", "1")], args.iterations),
+        "alias": timings(archaeology.get_archeological_proof, [("gen", "1")], args.iterations),
+    }
+
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""
+Local stand-in for bible-api.com, so benchmarks measure this service rather than the network.
+
+Answers GET /<book>%20<chapter>?translation=kjv with the same JSON shape as bible-api.com,
+after a configurable delay (--latency-ms plus up to --jitter-ms). Chapters come from the packed
+corpus at BIBLE_CORPUS_PATH when it exists. Otherwise verses are generated deterministically
+per chapter: about 26 verses of about 24 words on average (the KJV averages), with one chapter in
+twenty several times longer, so long chapters still get chunked. --error-rate answers a fraction of
+requests with 503 to exercise the client's retries.
+
+Point the service at it with BIBLE_API_URL:
+
+    python -m benchmarks.fake_bible_api --port 8766 --latency-ms 150 --jitter-ms 100
+    BIBLE_API_URL=http://127.0.0.1:8766 python app.py
+"""
+import argparse
+import json
+import os
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+from utils.bible import BIBLE_CORPUS_PATH
+from utils.books import resolve_book
+from utils.corpus import LocalCorpus
+
+# Filler vocabulary for generated verses
+_WORDS = (
+    "and the of unto he that shall lord his said in god for they be is them not him with all thou thy was which "
+    "my me but ye this were people land house son children king israel came out against before earth hand "
+    "day upon men from there when their have hath went also made set up great word heart way sons"
+).split()
+
+
+def generated_verses(book: str, chapter: int) -> list[str]:
+    """Deterministic filler verses for a chapter, with KJV-like lengths."""
+    rng = random.Random(f"{book}:{chapter}")
+    count = rng.randint(60, 180) if rng.random() < 0.05 else max(3, int(rng.gauss(26, 10)))
+    verses = []
+    for _ in range(count):
+        words = [rng.choice(_WORDS) for _ in range(max(6, int(rng.gauss(24, 8))))]
+        verses.append(" ".join(words).capitalize() + ".")
+    return verses
+
+
+class FakeBibleAPI:
+    """A threaded HTTP server answering like bible-api.com. start() returns its base URL."""
+
+    def __init__(self, latency_ms: float = 0, jitter_ms: float = 0, error_rate: float = 0,
+                 corpus_path: str = BIBLE_CORPUS_PATH, port: int = 0, seed: int = 0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.port = port
+        self.requests = 0
+        self._corpus = LocalCorpus(corpus_path) if corpus_path and os.path.exists(corpus_path) else None
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = None
+
+    def chapter(self, reference: str) -> dict | None:
+        """The bible-api.com response body for "<book> <chapter>", or None if there is no such chapter."""
+        book_name, _, chapter = reference.strip().rpartition(" ")
+        book = resolve_book(book_name)
+        if book is None or not chapter.isdigit() or not 1 <= int(chapter) <= book.chapters:
+            return None
+        text = self._corpus.get_text(book.id, chapter) if self._corpus is not None else None
+        verses = text.split("\n") if text else generated_verses(book.id, int(chapter))
+        return {
+            "reference": f"{book.name} {chapter}",
+            "verses": [
+                {"book_id": book.id, "book_name": book.name, "chapter": int(chapter), "verse": i, "text": f"{verse}\n"}
+                for i, verse in enumerate(verses, start=1)
+            ],
+            "text": "\n".join(verses) + "\n",
+            "translation_id": "kjv",
+            "translation_name": "King James Version",
+            "translation_note": "Public Domain",
+        }
+
+    def delay(self) -> float:
+        with self._lock:
+            return (self.latency_ms + self._random.uniform(0, self.jitter_ms)) / 1000
+
+    def fail(self) -> bool:
+        with self._lock:
+            self.requests += 1
+            return self._random.random() < self.error_rate
+
+    def start(self) -> str:
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # Keep-alive, like the real API behind its CDN
+
+            def do_GET(self):
+                url = urlsplit(self.path)
+                failed = api.fail()
+                time.sleep(api.delay())
+                if failed:
+                    self._send(503, {"error": "service unavailable"})
+                    return
+                translation = parse_qs(url.query).get("translation", ["kjv"])[0]
+                body = api.chapter(unquote(url.path.lstrip("/"))) if translation == "kjv" else None
+                self._send(200, body) if body is not None else self._send(404, {"error": "not found"})
+
+            def _send(self, status: int, body: dict) -> None:
+                data = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json; charset=utf-8")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", self.port), Handler)
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        threading.Thread(target=self._server.serve_forever, name="fake-bible-api", daemon=True).start()
+        return f"http://127.0.0.1:{self.port}"
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+        if self._corpus is not None:
+            self._corpus.close()
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Serve bible-api.com responses locally.")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--latency-ms", type=float, default=0, help="Delay of every response")
+    parser.add_argument("--jitter-ms", type=float, default=0, help="Extra random delay, uniform between 0 and this")
+    parser.add_argument("--error-rate", type=float, default=0, help="Fraction of requests answered with 503")
+    parser.add_argument("--corpus", default=BIBLE_CORPUS_PATH, help="Packed corpus to serve real text from, if present")
+    args = parser.parse_args(argv)
+
+    api = FakeBibleAPI(args.latency_ms, args.jitter_ms, args.error_rate, args.corpus, args.port)
+    print(f"Serving fake bible-api.com on {api.start()} (Ctrl+C to stop)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        api.stop()
+
+
+if __name__ == "__main__":
+    main()
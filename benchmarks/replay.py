@@ -0,0 +1,124 @@
+"""
+Replays a request log (utils.request_log, REQUEST_LOG_PATH) against a running server.
+
+Each captured /summarize request is sent at its original offset from the first one, divided by
+--speed: 1 keeps the original pacing, 10 plays an hour of traffic in six minutes, and 0 sends
+everything as fast as --max-in-flight allows. Reports throughput, p50/p95/p99 latency, status
+codes, how far sends fell behind schedule, and the captured latencies and cache statuses next to
+the replayed ones. Results are written as JSON like the other benchmarks.
+
+    python -m benchmarks.replay data/requests.jsonl --url http://127.0.0.1:8000 --speed 5 --output replay.json
+
+A capture replayed against benchmarks.serve (or bench_load --url) exercises caches and batching
+with the real access distribution, without calling bible-api.com or loading the model.
+"""
+import argparse
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from benchmarks.bench_backends import percentile
+from benchmarks.bench_load import git_revision
+from utils.request_log import read_requests
+
+
+def latency_summary(latencies: list[float]) -> dict:
+    if not latencies:
+        return {"p50_ms": None, "p95_ms": None, "p99_ms": None}
+    return {
+        "p50_ms": round(percentile(latencies, 0.5) * 1000, 1),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 1),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 1),
+    }
+
+
+def count(values) -> dict:
+    counts = {}
+    for value in values:
+        counts[str(value)] = counts.get(str(value), 0) + 1
+    return counts
+
+
+def replay(records: list[dict], url: str, speed: float, max_in_flight: int) -> dict:
+    latencies = []
+    statuses = []
+    lags = []
+    lock = threading.Lock()
+    local = threading.local()
+
+    def send(record: dict, scheduled: float) -> None:
+        session = getattr(local, "session", None)
+        if session is None:
+            session = local.session = requests.Session()
+        # A send waits for a free connection when the server falls behind; that delay is the lag
+        lag = max(0.0, time.perf_counter() - scheduled)
+        body = {"book": record["book"], "chapter": record["chapter"], "mode": record.get("mode", "abstractive")}
+        started = time.perf_counter()
+        try:
+            status = session.post(f"{url}/summarize", json=body, timeout=120).status_code
+        except requests.exceptions.RequestException:
+            status = "error"
+        with lock:
+            latencies.append(time.perf_counter() - started)
+            statuses.append(status)
+            lags.append(lag)
+
+    first = records[0]["timestamp"]
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix="replay") as pool:
+        for record in records:
+            scheduled = started + ((record["timestamp"] - first) / speed if speed > 0 else 0)
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            pool.submit(send, record, scheduled)
+    wall_seconds = time.perf_counter() - started
+
+    return {
+        "requests": len(latencies),
+        "requests_per_second": round(len(latencies) / wall_seconds, 2),
+        "statuses": count(statuses),
+        **latency_summary(latencies),
+        "max_lag_ms": round(max(lags) * 1000, 1),
+        "p95_lag_ms": round(percentile(lags, 0.95) * 1000, 1),
+    }
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Replay captured /summarize traffic against a running server.")
+    parser.add_argument("capture", help="Request log written by utils.request_log")
+    parser.add_argument("--url", default="http://127.0.0.1:5000", help="Server to replay against")
+    parser.add_argument("--speed", type=float, default=1.0, help="Playback speed multiplier (0: as fast as possible)")
+    parser.add_argument("--max-in-flight", type=int, default=64, help="Most requests outstanding at once")
+    parser.add_argument("--limit", type=int, help="Replay only the first N records")
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    args = parser.parse_args(argv)
+
+    records = read_requests(args.capture)[:args.limit]
+    if not records:
+        raise SystemExit(f"No requests in {args.capture}")
+    span = records[-1]["timestamp"] - records[0]["timestamp"]
+    print(f"Replaying {len(records)} request(s) spanning {span:.0f}s at {args.speed}x against {args.url}...")
+
+    results = {
+        "revision": git_revision(),
+        "config": vars(args),
+        "captured": {
+            "requests": len(records),
+            "span_seconds": round(span, 1),
+            "statuses": count(record.get("status") for record in records),
+            "cache_statuses": count(record.get("cache_status") for record in records),
+            **latency_summary([record["latency_ms"] / 1000 for record in records if "latency_ms" in record]),
+        },
+        "replayed": replay(records, args.url, args.speed, args.max_in_flight),
+    }
+
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
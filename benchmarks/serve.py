@@ -0,0 +1,59 @@
+"""
+Runs the app for benchmarks: on werkzeug's threaded server (or, with --server asgi, the ASGI
+entry point on uvicorn), with fresh caches in a temporary directory and either the stub model
+(benchmarks.stub_model) or the real one.
+
+bench_load starts it once per concurrency level; it can also be started by hand:
+
+    python -m benchmarks.serve --port 8767 --bible-api-url http://127.0.0.1:8766 --model stub --model-call-ms 80
+"""
+import argparse
+import os
+import tempfile
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Serve the app with benchmark settings.")
+    parser.add_argument("--port", type=int, default=8767)
+    parser.add_argument("--bible-api-url", required=True, help="Base URL of the (fake) bible-api.com")
+    parser.add_argument("--server", choices=["wsgi", "asgi"], default="wsgi", help="werkzeug's threaded server or asgi:app on uvicorn")
+    parser.add_argument("--model", choices=["stub", "real"], default="stub")
+    parser.add_argument("--model-call-ms", type=float, default=50, help="Stub model: fixed cost of each batch")
+    parser.add_argument("--model-token-ms", type=float, default=0.05, help="Stub model: cost per input token")
+    parser.add_argument("--model-busy", action="store_true", help="Stub model: spin on the CPU instead of sleeping")
+    args = parser.parse_args(argv)
+
+    # Everything that persists goes to a fresh directory, so every run starts cold
+    state_dir = tempfile.mkdtemp(prefix="bible-summarizer-bench-")
+    os.environ.update({
+        "BIBLE_BACKEND": "remote",
+        "BIBLE_API_URL": args.bible_api_url,
+        "VERSE_CACHE_PATH": os.path.join(state_dir, "verses.sqlite3"),
+        "SUMMARY_CACHE_PATH": os.path.join(state_dir, "summaries.sqlite3"),
+        "PRECOMPUTED_PATH": os.path.join(state_dir, "precomputed.sqlite3"),
+        "JOBS_DB_PATH": os.path.join(state_dir, "jobs.sqlite3"),
+        "MODEL_WARMUP": "0",
+        "JOB_WORKERS_AUTOSTART": "0",
+    })
+    # Imported after the environment is set, since modules read their configuration at import
+    from werkzeug.serving import make_server
+    from app import app
+    from utils import summarizer
+    from benchmarks import stub_model
+
+    if args.model == "stub":
+        stub_model.install(stub_model.StubPipeline(args.model_call_ms, args.model_token_ms, args.model_busy))
+    elif not summarizer.load_model():
+        raise SystemExit(f"Could not load the model: {summarizer.model_status()['error']}")
+
+    print(f"Serving on http://127.0.0.1:{args.port} ({args.server}) with the {args.model} model, state in {state_dir}", flush=True)
+    if args.server == "asgi":
+        import uvicorn
+        import asgi
+        uvicorn.run(asgi.app, host="127.0.0.1", port=args.port, log_level="warning")
+    else:
+        make_server("127.0.0.1", args.port, app, threaded=True).serve_forever()
+
+
+if __name__ == "__main__":
+    main()
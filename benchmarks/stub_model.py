@@ -0,0 +1,55 @@
+"""
+A stand-in for the summarization pipeline with a configurable cost, for benchmarking everything
+around the model (fetching, caching, chunking, batching, serialization) without torch.
+
+StubPipeline has the interface build_pipeline() documents. Each padded batch takes
+call_ms + token_ms * (tokens in the batch) milliseconds. By default it sleeps, which, like torch,
+leaves the GIL to other threads. With busy=True it spins instead, to also load the CPU. Its
+tokenizer counts words and punctuation marks, close enough to BPE for chunking to behave as with
+the real model. install() makes the summarizer use it, as if load_model() had loaded it.
+"""
+import re
+import time
+from utils import summarizer
+
+_TOKEN = re.compile(r"\w+|[^\w\s]")
+
+
+class StubTokenizer:
+    def encode(self, text: str, add_special_tokens: bool = True) -> list[int]:
+        tokens = [hash(token) & 0xFFFF for token in _TOKEN.findall(text)]
+        return [0, *tokens, 2] if add_special_tokens else tokens
+
+
+class StubPipeline:
+    def __init__(self, call_ms: float = 50, token_ms: float = 0.05, busy: bool = False):
+        self.call_ms = call_ms
+        self.token_ms = token_ms
+        self.busy = busy
+        self.tokenizer = StubTokenizer()
+        self.calls = 0
+
+    def __call__(self, inputs, max_length: int = 150, min_length: int = 40, batch_size: int | None = None, **kwargs):
+        texts = [inputs] if isinstance(inputs, str) else list(inputs)
+        batch_size = batch_size or 1
+        for start in range(0, len(texts), batch_size):
+            batch = texts[start:start + batch_size]
+            self._spend(self.call_ms + self.token_ms * sum(len(self.tokenizer.encode(t, False)) for t in batch))
+        # The first words of the input, at most max_length tokens, so summaries have a realistic size
+        return [{"summary_text": " ".join(text.split()[:max_length])} for text in texts]
+
+    def _spend(self, ms: float) -> None:
+        self.calls += 1
+        if not self.busy:
+            time.sleep(ms / 1000)
+            return
+        deadline = time.perf_counter() + ms / 1000
+        while time.perf_counter() < deadline:
+            pass
+
+
+def install(pipeline) -> None:
+    """Makes the summarizer use `pipeline` and report the model as ready."""
+    summarizer.summarizer_pipeline = pipeline
+    summarizer._model_status.update(state="ready", error=None, load_seconds=0.0, warmup_seconds=0.0)
+    summarizer._model_done.set()
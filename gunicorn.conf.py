@@ -0,0 +1,87 @@
+"""
+Gunicorn configuration: load the model once in the master, then fork workers that share it.
+
+With preload_app the master imports the app and loads the model before forking, so every worker
+starts with the weights already in memory and shares those pages copy-on-write instead of loading
+its own copy. gunicorn reads this file automatically from the working directory:
+
+    gunicorn app:app
+
+Measure per-worker memory with `python -m benchmarks.bench_fork_memory`.
+"""
+import gc
+import os
+import tempfile
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 5000)}"
+workers = int(os.environ.get("WEB_CONCURRENCY", max(1, (os.cpu_count() or 1) // 2)))
+threads = int(os.environ.get("GUNICORN_THREADS", 4))
+timeout = 120
+preload_app = os.environ.get("GUNICORN_PRELOAD", "1") != "0"
+# Intra-op threads per worker, so that all workers together use each core once
+torch_threads = int(os.environ.get("TORCH_THREADS_PER_WORKER", 0)) or max(1, (os.cpu_count() or 1) // workers)
+
+# Each worker writes its metrics to this directory and /metrics adds them all up (utils.metrics)
+if not os.environ.get("METRICS_DIR"):
+    os.environ["METRICS_DIR"] = tempfile.mkdtemp(prefix="bible-summarizer-metrics-")
+
+if preload_app:
+    # Background threads in the master would not survive fork(); the model is loaded in when_ready
+    # instead, and job workers are started in post_fork
+    os.environ["MODEL_WARMUP"] = "0"
+    os.environ["JOB_WORKERS_AUTOSTART"] = "0"
+
+
+def _set_torch_threads(count: int) -> None:
+    try:
+        import torch
+    except ImportError:
+        return
+    torch.set_num_threads(count)
+
+
+def on_starting(server):
+    from utils import metrics
+
+    # Counters restart from zero with the server; files left by a previous run would be added in
+    metrics.clear_dir()
+
+
+def child_exit(server, worker):
+    from utils import metrics
+
+    metrics.mark_process_dead(worker.pid)
+
+
+def when_ready(server):
+    if not preload_app:
+        return
+    from utils import summarizer
+
+    if summarizer.SUMMARIZER_BACKEND != "pytorch":
+        # ONNX Runtime sessions own thread pools that do not survive fork(); each worker loads its own
+        server.log.info(f"{summarizer.SUMMARIZER_BACKEND} backend: model is loaded in each worker")
+        return
+    # One thread in the master so no OpenMP thread team exists at fork time; no warmup generation here
+    # for the same reason. Workers run it after fork.
+    _set_torch_threads(1)
+    summarizer.load_model(warmup=False)
+    # Move everything allocated so far out of the collector's reach, so garbage collection in the
+    # workers does not write to (and un-share) the master's pages
+    gc.freeze()
+    server.log.info(f"Model loaded in master ({summarizer.model_status()['load_seconds']}s), forking {workers} worker(s)")
+
+
+def post_fork(server, worker):
+    _set_torch_threads(torch_threads)
+    from utils import summarizer
+
+    if summarizer.model_status()["state"] == "ready":
+        summarizer.warm_up_model()
+    else:
+        summarizer.start_model_warmup()
+    server.log.info(f"Worker {worker.pid}: {torch_threads} torch thread(s), model {summarizer.model_status()['state']}")
+    if preload_app:
+        from utils import jobs
+
+        jobs.start_job_workers()
@@ -0,0 +1,6 @@
+import os
+
+# Importing app would otherwise start loading the real model in the background during collection
+os.environ.setdefault("MODEL_WARMUP", "0")
+# Likewise for the background job workers, which would poll the real jobs database
+os.environ.setdefault("JOB_WORKERS_AUTOSTART", "0")
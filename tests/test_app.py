@@ -1,5 +1,6 @@
 import pytest
 import json
+import requests
 from app import app as flask_app # Import the flask app instance
 from unittest.mock import patch, MagicMock
 
@@ -12,6 +13,11 @@ def client():
     with flask_app.test_client() as client:
         yield client
 
+# Never serve from a locally generated precompute artifact unless a test asks for it
+@pytest.fixture(autouse=True)
+def no_precomputed(mocker):
+    return mocker.patch('app.get_precomputed', return_value=None)
+
 # Mock data and services
 MOCK_BIBLE_VERSES_SUCCESS = {"text": "Mocked Bible verses for John 3."}
 MOCK_BIBLE_VERSES_NOT_FOUND = {"error": "Book or chapter not found"}
@@ -41,7 +47,7 @@ def test_summarize_success(mock_get_proof, mock_summarize, mock_get_verses, clie
     assert "book" in data # Check if book reference is included
 
     mock_get_verses.assert_called_once_with("John", "3")
-    mock_summarize.assert_called_once_with(MOCK_BIBLE_VERSES_SUCCESS["text"])
+    mock_summarize.assert_called_once_with(MOCK_BIBLE_VERSES_SUCCESS["text"], mode="abstractive")
     mock_get_proof.assert_called_once_with("John", "3")
 
 @patch('app.get_bible_verses')
@@ -132,6 +138,24 @@ def test_summarize_valid_chapter_range_format(client, mocker): # Use mocker from
     response = client.post('/summarize', json={"book": "Genesis", "chapter": "1-3"})
     assert response.status_code == 200 # Assuming downstream mocks handle it
 
+@patch('app.get_bible_verses')
+@patch('app.summarize_range', return_value="Range summary.")
+@patch('app.summarize_text')
+@patch('app.get_archeological_proof', return_value=MOCK_ARCHAEOLOGICAL_PROOF_SUCCESS)
+def test_summarize_range_is_reduced_from_chapters(mock_get_proof, mock_summarize, mock_range, mock_get_verses, client):
+    mock_get_verses.return_value = {
+        "text": "Genesis 11.\nGenesis 12.",
+        "chapters": [{"chapter": "11", "text": "Genesis 11."}, {"chapter": "12", "text": "Genesis 12."}],
+    }
+
+    response = client.post('/summarize', json={"book": "Genesis", "chapter": "11-12"})
+
+    assert response.status_code == 200
+    assert response.get_json()["summary"] == "Range summary."
+    assert response.get_json()["verses"] == "Genesis 11.\nGenesis 12."
+    mock_range.assert_called_once_with(["Genesis 11.", "Genesis 12."], first_chapter=11, mode="abstractive")
+    mock_summarize.assert_not_called()
+
 def test_summarize_not_json(client):
     response = client.post('/summarize', data="this is not json")
     data = response.get_json()
@@ -189,7 +213,7 @@ def test_summarize_summarizer_error(mock_summarize, mock_get_verses, client):
     assert response.status_code == 500 # Internal Server Error
     assert "error" in data
     assert data["error"] == "Error during text summarization"
-    mock_summarize.assert_called_once_with(MOCK_BIBLE_VERSES_SUCCESS["text"])
+    mock_summarize.assert_called_once_with(MOCK_BIBLE_VERSES_SUCCESS["text"], mode="abstractive")
 
 @patch('app.get_bible_verses', return_value={"text": None}) # API returns 200 but no text
 @patch('app.summarize_text')
@@ -216,4 +240,380 @@ def test_swagger_yaml_served(client):
     assert response.status_code == 200
     # Check if it's YAML content, e.g. by checking for "openapi: 3.0.0"
     assert b"openapi: 3.0.0" in response.data
-```
+
+
+# --- Precomputed summaries ---
+
+@patch('app.get_bible_verses')
+@patch('app.summarize_text')
+@patch('app.get_archeological_proof')
+def test_summarize_served_from_precomputed(mock_get_proof, mock_summarize, mock_get_verses, client, no_precomputed):
+    no_precomputed.return_value = {
+        "reference": "John 3", "verses": "Precomputed verses.", "summary": "Precomputed summary.", "proof": "Stored proof."
+    }
+    mock_get_proof.return_value = MOCK_ARCHAEOLOGICAL_PROOF_SUCCESS
+
+    response = client.post('/summarize', json={"book": "John", "chapter": "3"})
+    data = response.get_json()
+
+    assert response.status_code == 200
+    assert data == {
+        "book": "John 3",
+        "verses": "Precomputed verses.",
+        "summary": "Precomputed summary.",
+        "summary_mode": "abstractive",
+        "archeological_proof": MOCK_ARCHAEOLOGICAL_PROOF_SUCCESS, # Live lookup, not the stored copy
+    }
+    mock_get_verses.assert_not_called()
+    mock_summarize.assert_not_called()
+
+@patch('app.get_bible_verses', return_value={"text": "Precomputed verses."})
+@patch('app.summarize_text', return_value="Precomputed summary.")
+@patch('app.get_archeological_proof', return_value=MOCK_ARCHAEOLOGICAL_PROOF_SUCCESS)
+def test_precomputed_and_live_responses_match_for_an_alias(mock_get_proof, mock_summarize, mock_get_verses, client, no_precomputed):
+    request = {"book": "1kgs", "chapter": "3"}
+    live = client.post('/summarize', json=request).get_json()
+    no_precomputed.return_value = {
+        "reference": "1 Kings 3", "verses": "Precomputed verses.", "summary": "Precomputed summary.", "proof": "Stored proof."
+    }
+    precomputed = client.post('/summarize', json=request).get_json()
+
+    assert precomputed == live
+    assert live["book"] == "1kgs 3"
+
+
+# --- Summary modes ---
+
+@patch('app.get_bible_verses', return_value=MOCK_BIBLE_VERSES_SUCCESS)
+@patch('app.summarize_text', return_value="Extractive summary.")
+@patch('app.get_archeological_proof', return_value=MOCK_ARCHAEOLOGICAL_PROOF_SUCCESS)
+def test_summarize_extractive_mode(mock_get_proof, mock_summarize, mock_get_verses, client, no_precomputed):
+    response = client.post('/summarize', json={"book": "John", "chapter": "3", "mode": "extractive"})
+
+    assert response.status_code == 200
+    assert response.get_json()["summary_mode"] == "extractive"
+    mock_summarize.assert_called_once_with(MOCK_BIBLE_VERSES_SUCCESS["text"], mode="extractive")
+    no_precomputed.assert_not_called() # Precomputed summaries are abstractive
+
+def test_summarize_invalid_mode(client):
+    response = client.post('/summarize', json={"book": "John", "chapter": "3", "mode": "poetic"})
+    assert response.status_code == 400
+    assert "Mode must be one of" in response.get_json()["error"]
+
+@patch('app.get_bible_verses', return_value=MOCK_BIBLE_VERSES_SUCCESS)
+@patch('app.summarize_text', return_value="Extractive summary.")
+@patch('app.get_archeological_proof', return_value=MOCK_ARCHAEOLOGICAL_PROOF_SUCCESS)
+@patch('app.effective_summary_mode', return_value="extractive") # Model queue saturated
+def test_summarize_degrades_to_extractive(mock_mode, mock_get_proof, mock_summarize, mock_get_verses, client):
+    response = client.post('/summarize', json={"book": "John", "chapter": "3"})
+
+    assert response.status_code == 200
+    assert response.get_json()["summary_mode"] == "extractive"
+    mock_mode.assert_called_once_with("abstractive")
+    mock_summarize.assert_called_once_with(MOCK_BIBLE_VERSES_SUCCESS["text"], mode="extractive")
+
+
+# --- Streaming /summarize ---
+
+def read_events(response):
+    return [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+@patch('app.get_bible_verses', return_value={"text": "Long passage.", "reference": "Psalms 119"})
+@patch('app.summarize_text_stream')
+@patch('app.get_archeological_proof', return_value=MOCK_ARCHAEOLOGICAL_PROOF_SUCCESS)
+def test_summarize_stream(mock_get_proof, mock_stream, mock_get_verses, client):
+    mock_stream.return_value = iter([
+        {"event": "chunk", "index": 0, "total": 2, "summary": "First half."},
+        {"event": "chunk", "index": 1, "total": 2, "summary": "Second half."},
+        {"event": "summary", "summary": "Whole psalm."},
+    ])
+
+    response = client.post('/summarize/stream', json={"book": "Psalms", "chapter": "119"})
+
+    assert response.status_code == 200
+    assert response.mimetype == "application/x-ndjson"
+    assert read_events(response) == [
+        {"event": "passage", "book": "Psalms 119", "verses": "Long passage.", "archeological_proof": MOCK_ARCHAEOLOGICAL_PROOF_SUCCESS},
+        {"event": "chunk", "index": 0, "total": 2, "summary": "First half."},
+        {"event": "chunk", "index": 1, "total": 2, "summary": "Second half."},
+        {"event": "summary", "summary": "Whole psalm.", "summary_mode": "abstractive"},
+    ]
+    mock_stream.assert_called_once_with("Long passage.", mode="abstractive")
+
+@patch('app.get_bible_verses', return_value=MOCK_BIBLE_VERSES_SUCCESS)
+@patch('app.summarize_text_stream')
+@patch('app.get_archeological_proof', return_value=MOCK_ARCHAEOLOGICAL_PROOF_SUCCESS)
+def test_summarize_stream_passage_comes_before_the_model(mock_get_proof, mock_stream, mock_get_verses, client):
+    def failing_stream(text, mode):
+        raise RuntimeError("Model crashed")
+        yield
+    mock_stream.side_effect = failing_stream
+
+    response = client.post('/summarize/stream', json={"book": "John", "chapter": "3"})
+
+    events = read_events(response)
+    assert response.status_code == 200 # Headers and the passage are already sent by then
+    assert events[0]["verses"] == MOCK_BIBLE_VERSES_SUCCESS["text"]
+    assert events[1] == {"event": "error", "error": "Error during text summarization"}
+
+@patch('app.get_bible_verses', return_value=MOCK_BIBLE_VERSES_NOT_FOUND)
+@patch('app.summarize_text_stream')
+def test_summarize_stream_request_errors_are_plain_json(mock_stream, mock_get_verses, client):
+    response = client.post('/summarize/stream', json={"book": "Nonexistent", "chapter": "1"})
+    assert response.status_code == 404
+    assert "Book or chapter not found" in response.get_json()["error"]
+
+    response = client.post('/summarize/stream', json={"book": "John", "chapter": 0})
+    assert response.status_code == 400
+    mock_stream.assert_not_called()
+
+
+# --- Batch /summarize ---
+
+def fake_verses(book, chapter):
+    if book == "Nonexistent":
+        return MOCK_BIBLE_VERSES_NOT_FOUND
+    return {"text": f"Verses of {book} {chapter}.", "reference": f"{book} {chapter}"}
+
+@patch('app.get_bible_verses', side_effect=fake_verses)
+@patch('app.summarize_texts', side_effect=lambda texts, mode: [f"Summary of {t}" for t in texts])
+@patch('app.get_archeological_proof', return_value=MOCK_ARCHAEOLOGICAL_PROOF_SUCCESS)
+def test_summarize_batch_keeps_input_order_and_isolates_errors(mock_get_proof, mock_summarize, mock_get_verses, client):
+    response = client.post('/summarize/batch', json={"items": [
+        {"book": "John", "chapter": "3"},
+        {"book": "Nonexistent", "chapter": "1"},
+        {"book": "Genesis", "chapter": 1},
+        {"book": "John"}, # Missing chapter
+        {"book": "John", "chapter": 3}, # Same passage as the first item
+    ]})
+    results = response.get_json()["results"]
+
+    assert response.status_code == 200
+    assert results[0] == {
+        "book": "John 3",
+        "verses": "Verses of John 3.",
+        "summary": "Summary of Verses of John 3.",
+        "summary_mode": "abstractive",
+        "archeological_proof": MOCK_ARCHAEOLOGICAL_PROOF_SUCCESS,
+    }
+    assert results[1] == {"error": "Book or chapter not found: Nonexistent 1", "status": 404}
+    assert results[2]["summary"] == "Summary of Verses of Genesis 1."
+    assert results[3] == {"error": "Chapter is required", "status": 400}
+    assert results[4] == results[0]
+    # Duplicates are fetched once, and all summaries go to the model in one call
+    assert mock_get_verses.call_count == 3
+    mock_summarize.assert_called_once_with(["Verses of John 3.", "Verses of Genesis 1."], mode="abstractive")
+
+@patch('app.get_bible_verses', side_effect=fake_verses)
+@patch('app.summarize_texts', side_effect=lambda texts, mode: [f"{mode}: {t}" for t in texts])
+@patch('app.get_archeological_proof', return_value=MOCK_ARCHAEOLOGICAL_PROOF_SUCCESS)
+def test_summarize_batch_accepts_a_bare_list_with_mixed_modes(mock_get_proof, mock_summarize, mock_get_verses, client):
+    response = client.post('/summarize/batch', json=[
+        {"book": "John", "chapter": "3", "mode": "extractive"},
+        {"book": "John", "chapter": "3"},
+    ])
+    results = response.get_json()["results"]
+
+    assert [r["summary"] for r in results] == ["extractive: Verses of John 3.", "abstractive: Verses of John 3."]
+    assert mock_get_verses.call_count == 1
+
+def fake_range_verses(book, chapter):
+    first, last = (int(c) for c in chapter.split("-"))
+    chapters = [{"chapter": str(c), "text": f"{book} {c}."} for c in range(first, last + 1)]
+    return {"text": "\n".join(c["text"] for c in chapters), "chapters": chapters}
+
+def failing_range(chapter_texts, first_chapter, mode):
+    if chapter_texts[0].startswith("Ruth"):
+        raise RuntimeError("Model failed")
+    return f"Summary of {len(chapter_texts)} chapters"
+
+@patch('app.get_bible_verses', side_effect=lambda book, chapter: fake_range_verses(book, chapter) if "-" in chapter else fake_verses(book, chapter))
+@patch('app.summarize_texts', side_effect=lambda texts, mode: [f"Summary of {t}" for t in texts])
+@patch('app.summarize_range', side_effect=failing_range)
+@patch('app.get_archeological_proof', return_value=MOCK_ARCHAEOLOGICAL_PROOF_SUCCESS)
+def test_summarize_batch_failing_range_fails_only_its_items(mock_get_proof, mock_range, mock_summarize, mock_get_verses, client):
+    response = client.post('/summarize/batch', json=[
+        {"book": "Ruth", "chapter": "1-2"},
+        {"book": "John", "chapter": "3"},
+        {"book": "Genesis", "chapter": "1-3"},
+    ])
+    results = response.get_json()["results"]
+
+    assert response.status_code == 200
+    assert results[0] == {"error": "Error during text summarization", "status": 500}
+    assert results[1]["summary"] == "Summary of Verses of John 3."
+    assert results[2]["summary"] == "Summary of 3 chapters"
+
+@patch('app.get_bible_verses', side_effect=requests.exceptions.ConnectionError("API down"))
+def test_summarize_batch_upstream_error_is_per_item(mock_get_verses, client):
+    response = client.post('/summarize/batch', json={"items": [{"book": "John", "chapter": "3"}]})
+    assert response.status_code == 200
+    assert response.get_json()["results"][0]["status"] == 503
+
+def test_summarize_batch_invalid_body(client, monkeypatch):
+    assert client.post('/summarize/batch', json={"items": []}).status_code == 400
+    assert client.post('/summarize/batch', json={"book": "John"}).status_code == 400
+    monkeypatch.setattr('app.SUMMARIZE_BATCH_MAX_ITEMS', 2)
+    response = client.post('/summarize/batch', json=[{"book": "John", "chapter": "3"}] * 3)
+    assert response.status_code == 400
+    assert response.get_json()["error"] == "At most 2 items per batch"
+
+
+# --- Background jobs ---
+
+@patch('app.submit_job', return_value="abc123")
+def test_create_job(mock_submit, client):
+    response = client.post('/jobs', json={"book": "Psalms", "chapter": "1-150", "priority": 5})
+
+    assert response.status_code == 202
+    assert response.get_json() == {"id": "abc123", "state": "queued", "status_url": "/jobs/abc123"}
+    assert response.headers["Location"] == "/jobs/abc123"
+    mock_submit.assert_called_once_with("Psalms", "1-150", mode="abstractive", priority=5)
+
+@patch('app.submit_job')
+def test_create_job_rejects_bad_requests(mock_submit, client):
+    assert client.post('/jobs', json={"book": "Psalms"}).status_code == 400
+    assert client.post('/jobs', json={"book": "Psalms", "chapter": "1", "priority": "high"}).status_code == 400
+    response = client.post('/jobs', json={"book": "Psalms", "chapter": "1-151"}) # Psalms has 150 chapters
+    assert response.status_code == 404
+    mock_submit.assert_not_called()
+
+@patch('app.get_job')
+def test_job_status(mock_get_job, client):
+    mock_get_job.return_value = {"id": "abc123", "state": "running", "progress": {"done": 40, "total": 150}}
+    response = client.get('/jobs/abc123')
+    assert response.status_code == 200
+    assert response.get_json()["progress"] == {"done": 40, "total": 150}
+
+    mock_get_job.return_value = None
+    assert client.get('/jobs/missing').status_code == 404
+
+
+# --- Metrics ---
+
+@patch('app.get_bible_verses', return_value=MOCK_BIBLE_VERSES_SUCCESS)
+@patch('app.summarize_text', return_value=MOCK_SUMMARY_SUCCESS)
+@patch('app.get_archeological_proof', return_value=MOCK_ARCHAEOLOGICAL_PROOF_SUCCESS)
+def test_metrics_cover_requests_and_stages(mock_get_proof, mock_summarize, mock_get_verses, client):
+    from utils import metrics
+    metrics.reset()
+    client.post('/summarize', json={"book": "John", "chapter": "3"})
+    client.post('/summarize', json={"book": "John"})
+
+    response = client.get('/metrics')
+    text = response.get_data(as_text=True)
+
+    assert response.status_code == 200
+    assert response.content_type.startswith("text/plain; version=0.0.4")
+    assert 'bible_summarizer_requests_total{endpoint="/summarize",status="200"} 1' in text
+    assert 'bible_summarizer_requests_total{endpoint="/summarize",status="400"} 1' in text
+    for stage in ("fetch", "summarize", "proof", "serialize"):
+        assert f'bible_summarizer_stage_duration_seconds_count{{stage="{stage}"}} 1' in text
+    assert "bible_summarizer_in_flight_requests 1" in text # The scrape itself
+    assert 'bible_summarizer_cache_lookups_total{cache="summaries",result="miss"}' in text
+    assert "bible_summarizer_model_queue_depth 0" in text
+
+
+
+# --- Profiling ---
+
+@patch('app.get_bible_verses', return_value=MOCK_BIBLE_VERSES_SUCCESS)
+@patch('app.summarize_text', return_value=MOCK_SUMMARY_SUCCESS)
+@patch('app.get_archeological_proof', return_value=MOCK_ARCHAEOLOGICAL_PROOF_SUCCESS)
+def test_profiled_request_gets_server_timing(mock_get_proof, mock_summarize, mock_get_verses, client, monkeypatch):
+    from utils import profiling
+    monkeypatch.setattr(profiling, "PROFILING_ENABLED", True)
+
+    response = client.post('/summarize?profile=1', json={"book": "John", "chapter": "3"})
+    stages = [entry.split(";")[0] for entry in response.headers["Server-Timing"].split(", ")]
+    assert stages == ["fetch", "summarize", "proof", "serialize", "total"]
+    assert "profile" not in response.get_json()
+
+    # Nothing is recorded for the next, unprofiled request
+    assert "Server-Timing" not in client.post('/summarize', json={"book": "John", "chapter": "3"}).headers
+    assert profiling.current() is None
+
+@patch('app.get_bible_verses', return_value=MOCK_BIBLE_VERSES_SUCCESS)
+@patch('app.summarize_text', return_value=MOCK_SUMMARY_SUCCESS)
+@patch('app.get_archeological_proof', return_value=MOCK_ARCHAEOLOGICAL_PROOF_SUCCESS)
+def test_cprofile_summary_is_added_to_the_body(mock_get_proof, mock_summarize, mock_get_verses, client, monkeypatch):
+    from utils import profiling
+    monkeypatch.setattr(profiling, "PROFILING_ENABLED", True)
+
+    response = client.post('/summarize', json={"book": "John", "chapter": "3"}, headers={"X-Profile": "cprofile"})
+    data = response.get_json()
+    assert data["summary"] == MOCK_SUMMARY_SUCCESS
+    assert "cumulative" in data["profile"]["cprofile"]
+
+@patch('app.get_bible_verses', return_value=MOCK_BIBLE_VERSES_SUCCESS)
+@patch('app.summarize_text', return_value=MOCK_SUMMARY_SUCCESS)
+@patch('app.get_archeological_proof', return_value=MOCK_ARCHAEOLOGICAL_PROOF_SUCCESS)
+def test_profiling_is_restricted_by_config(mock_get_proof, mock_summarize, mock_get_verses, client, monkeypatch):
+    from utils import profiling
+    body = {"book": "John", "chapter": "3"}
+    # Disabled by default
+    assert "Server-Timing" not in client.post('/summarize?profile=1', json=body).headers
+
+    monkeypatch.setattr(profiling, "PROFILING_ENABLED", True)
+    monkeypatch.setattr(profiling, "PROFILING_TOKEN", "s3cret")
+    assert "Server-Timing" not in client.post('/summarize?profile=1', json=body).headers
+    assert "Server-Timing" not in client.post('/summarize?profile=1', json=body, headers={"X-Profile-Token": "wrong"}).headers
+    assert "Server-Timing" in client.post('/summarize?profile=1', json=body, headers={"X-Profile-Token": "s3cret"}).headers
+
+
+# --- Request log ---
+
+@patch('app.get_bible_verses', return_value=MOCK_BIBLE_VERSES_SUCCESS)
+@patch('app.get_archeological_proof', return_value=MOCK_ARCHAEOLOGICAL_PROOF_SUCCESS)
+def test_sampled_requests_are_logged(mock_get_proof, mock_get_verses, client, monkeypatch):
+    from utils import request_log
+    monkeypatch.setattr(request_log, "REQUEST_LOG_SAMPLE_RATE", 1)
+    logged = []
+    monkeypatch.setattr(request_log, "log_request", lambda *args: logged.append(args))
+
+    response = client.post('/summarize', json={"book": "John", "chapter": 3, "mode": "extractive"})
+    assert response.status_code == 200
+    mock_get_verses.return_value = MOCK_BIBLE_VERSES_NOT_FOUND
+    client.post('/summarize', json={"book": "Nowhere", "chapter": "1"}) # Logged with its status
+    client.post('/summarize', json={"chapter": "1"}) # Nothing to replay
+
+    book, chapter, mode, timestamp, latency, status, cache_status = logged[0]
+    assert (book, chapter, mode, status, cache_status) == ("John", 3, "extractive", 200, "uncached")
+    assert latency > 0
+    assert [(entry[0], entry[5]) for entry in logged] == [("John", 200), ("Nowhere", 404)]
+
+@patch('app.get_bible_verses', return_value=MOCK_BIBLE_VERSES_SUCCESS)
+@patch('app.get_archeological_proof', return_value=MOCK_ARCHAEOLOGICAL_PROOF_SUCCESS)
+def test_request_log_is_off_by_default(mock_get_proof, mock_get_verses, client, monkeypatch):
+    from utils import request_log
+    monkeypatch.setattr(request_log, "log_request", MagicMock())
+    client.post('/summarize', json={"book": "John", "chapter": 3, "mode": "extractive"})
+    request_log.log_request.assert_not_called()
+
+# --- Health and readiness ---
+
+def test_healthz(client):
+    response = client.get('/healthz')
+    assert response.status_code == 200
+    assert response.get_json() == {"status": "ok"}
+
+@patch('app.proofs_index_stats', return_value={"loads": 1})
+@patch('app.model_status', return_value={"state": "loading"})
+def test_readyz_while_model_loading(mock_model_status, mock_proofs_stats, client):
+    response = client.get('/readyz')
+    assert response.status_code == 503
+    assert response.get_json() == {"status": "not ready", "checks": {"model": "loading", "archaeology": "ready"}}
+
+@patch('app.proofs_index_stats', return_value={"loads": 1})
+@patch('app.model_status', return_value={"state": "ready"})
+def test_readyz_when_warm(mock_model_status, mock_proofs_stats, client):
+    response = client.get('/readyz')
+    assert response.status_code == 200
+    assert response.get_json()["status"] == "ready"
+
+@patch('app.proofs_index_stats', return_value={"loads": 0})
+@patch('app.model_status', return_value={"state": "ready"})
+def test_readyz_without_archaeology_data(mock_model_status, mock_proofs_stats, client):
+    response = client.get('/readyz')
+    assert response.status_code == 503
+    assert response.get_json()["checks"]["archaeology"] == "not_loaded"
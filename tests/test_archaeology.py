@@ -1,7 +1,9 @@
+import os
 import pytest
 import json
 from unittest.mock import patch, mock_open
-from utils.archaeology import get_archeological_proof
+from utils import archaeology
+from utils.archaeology import get_archeological_proof, load_proofs, proofs_index_stats
 
 # Sample data for mocking the JSON file
 MOCK_PROOFS_DATA = {
@@ -19,11 +21,18 @@ MOCK_PROOFS_DATA = {
 def get_mock_json_string():
     return json.dumps(MOCK_PROOFS_DATA)
 
-@patch('utils.archaeology.os.path.exists')
-@patch('builtins.open', new_callable=mock_open) # Mock open globally for this test
-def test_get_proof_specific_chapter_exists(mock_file_open, mock_path_exists):
-    mock_path_exists.return_value = True # Simulate file exists
-    mock_file_open.return_value.read.return_value = get_mock_json_string()
+# The dataset is loaded once and cached, so each test points the module at its own file
+# and starts from an empty state.
+@pytest.fixture
+def proofs_file(tmp_path, monkeypatch):
+    path = tmp_path / "archaeological_proofs.json"
+    path.write_text(get_mock_json_string(), encoding="utf-8")
+    monkeypatch.setattr(archaeology, "PROOFS_PATH", str(path))
+    monkeypatch.setattr(archaeology, "_state", None)
+    monkeypatch.setattr(archaeology, "_stats", dict(archaeology._stats, loads=0, reloads=0, load_errors=0))
+    return path
+
+def test_get_proof_specific_chapter_exists(proofs_file):
 
     book = "Genesis"
     chapter = "1"
@@ -32,11 +41,7 @@ def test_get_proof_specific_chapter_exists(mock_file_open, mock_path_exists):
     # Check normalization: 'genesis_1' key should be used
     # The function normalizes book to "genesis" and chapter to "1", forming "genesis_1"
 
-@patch('utils.archaeology.os.path.exists')
-@patch('builtins.open', new_callable=mock_open)
-def test_get_proof_book_normalization(mock_file_open, mock_path_exists):
-    mock_path_exists.return_value = True
-    mock_file_open.return_value.read.return_value = get_mock_json_string()
+def test_get_proof_book_normalization(proofs_file):
     
     # Test different book name variations that should normalize
     # e.g., "1 Kings", "1kings", "1st kings" should all become "1stkings"
@@ -48,81 +53,55 @@ def test_get_proof_book_normalization(mock_file_open, mock_path_exists):
     assert proof == MOCK_PROOFS_DATA["1stkings_9"]
 
 
-@patch('utils.archaeology.os.path.exists')
-@patch('builtins.open', new_callable=mock_open)
-def test_get_proof_list_of_proofs(mock_file_open, mock_path_exists):
-    mock_path_exists.return_value = True
-    mock_file_open.return_value.read.return_value = get_mock_json_string()
+def test_get_proof_list_of_proofs(proofs_file):
 
     proof = get_archeological_proof("John", "3")
     assert proof == MOCK_PROOFS_DATA["john_3"]
     assert isinstance(proof, list)
     assert len(proof) == 2
 
-@patch('utils.archaeology.os.path.exists')
-@patch('builtins.open', new_callable=mock_open)
-def test_get_proof_complex_object(mock_file_open, mock_path_exists):
-    mock_path_exists.return_value = True
-    mock_file_open.return_value.read.return_value = get_mock_json_string()
+def test_get_proof_complex_object(proofs_file):
     
     proof = get_archeological_proof("ErrorBook", "1") # Normalizes to "errorbook_1"
     assert proof == MOCK_PROOFS_DATA["errorbook_1"]
     assert isinstance(proof, dict)
     assert proof["type"] == "complex"
 
-@patch('utils.archaeology.os.path.exists')
-@patch('builtins.open', new_callable=mock_open)
-def test_get_proof_chapter_specific_not_found_fallback_to_general_book(mock_file_open, mock_path_exists):
-    mock_path_exists.return_value = True
-    mock_file_open.return_value.read.return_value = get_mock_json_string()
+def test_get_proof_chapter_specific_not_found_fallback_to_general_book(proofs_file):
 
     # "mark_5" is not in MOCK_PROOFS_DATA, but "mark" (general for Mark) is.
     # Book "Mark" normalizes to "mark".
     proof = get_archeological_proof("Mark", "5") # Should try "mark_5", then "mark"
     assert proof == MOCK_PROOFS_DATA["mark"]
 
-@patch('utils.archaeology.os.path.exists')
-@patch('builtins.open', new_callable=mock_open)
-def test_get_proof_chapter_and_general_book_not_found(mock_file_open, mock_path_exists):
-    mock_path_exists.return_value = True
-    mock_file_open.return_value.read.return_value = get_mock_json_string()
+def test_get_proof_chapter_and_general_book_not_found(proofs_file):
 
     # "nonexistentbook_1" and "nonexistentbook" are not in MOCK_PROOFS_DATA
     proof = get_archeological_proof("NonExistentBook", "1")
     assert proof == "No specific archaeological proof found for this passage or book."
 
-@patch('utils.archaeology.os.path.exists')
-def test_get_proof_file_not_exists(mock_path_exists):
-    mock_path_exists.return_value = False # Simulate file does not exist
+def test_get_proof_file_not_exists(proofs_file):
+    proofs_file.unlink() # File does not exist
     
     proof = get_archeological_proof("Genesis", "1")
     assert proof == {"error": "Archaeological data file is missing. Please contact administrator."}
 
-@patch('utils.archaeology.os.path.exists')
-@patch('builtins.open', new_callable=mock_open)
-def test_get_proof_json_decode_error(mock_file_open, mock_path_exists):
-    mock_path_exists.return_value = True
-    mock_file_open.return_value.read.return_value = "this is not valid json" # Corrupted JSON
+def test_get_proof_json_decode_error(proofs_file):
+    proofs_file.write_text("this is not valid json") # Corrupted JSON
     
     proof = get_archeological_proof("Genesis", "1")
     assert proof == {"error": "Archaeological data file is corrupted. Please contact administrator."}
 
-@patch('utils.archaeology.os.path.exists')
 @patch('builtins.open', new_callable=mock_open)
-def test_get_proof_unexpected_exception_during_open(mock_file_open, mock_path_exists):
-    mock_path_exists.return_value = True
+def test_get_proof_unexpected_exception_during_open(mock_file_open, proofs_file):
     mock_file_open.side_effect = Exception("Unexpected error during file open")
 
     proof = get_archeological_proof("Genesis", "1")
     assert proof == {"error": "An error occurred while fetching archaeological proof. Please contact administrator."}
 
-@patch('utils.archaeology.os.path.exists')
-@patch('builtins.open', new_callable=mock_open)
-def test_get_proof_chapter_range_key(mock_file_open, mock_path_exists):
+def test_get_proof_chapter_range_key(proofs_file):
     # This tests if a key like "luke_10-12" can be successfully retrieved
     # if the input chapter is "10-12".
-    mock_path_exists.return_value = True
-    mock_file_open.return_value.read.return_value = get_mock_json_string()
 
     book = "Luke"
     chapter_range = "10-12" # This exact string needs to be the chapter part of the key
@@ -131,17 +110,14 @@ def test_get_proof_chapter_range_key(mock_file_open, mock_path_exists):
     assert proof == MOCK_PROOFS_DATA["luke_10-12"]
 
 # Test how chapter numbers (int) are handled vs strings for keys
-@patch('utils.archaeology.os.path.exists')
-@patch('builtins.open', new_callable=mock_open)
-def test_get_proof_chapter_as_int_vs_string(mock_file_open, mock_path_exists):
-    mock_path_exists.return_value = True
+def test_get_proof_chapter_as_int_vs_string(proofs_file):
     # JSON keys are always strings. '1' vs 1.
     # The function converts chapter to str: chapter_str = str(chapter)
     # So, MOCK_PROOFS_DATA should use string chapter numbers in keys like "genesis_1".
-    mock_file_open.return_value.read.return_value = json.dumps({
+    proofs_file.write_text(json.dumps({
         "booka_1": "Proof for chapter 1 (string key)",
         "bookb_2": "Proof for chapter 2 (string key)" 
-    })
+    }))
 
     # Test with chapter as string
     proof_str = get_archeological_proof("BookA", "1")
@@ -151,4 +127,91 @@ def test_get_proof_chapter_as_int_vs_string(mock_file_open, mock_path_exists):
     proof_int = get_archeological_proof("BookB", 2) # chapter=2 (int)
     assert proof_int == "Proof for chapter 2 (string key)"
     # This works because `str(2)` becomes "2", matching the key "bookb_2".
-```
+
+
+# --- Load once / hot reload ---
+
+def _rewrite(path, data, bump=1):
+    # Write new content and move the mtime forward so the change is visible even on coarse clocks
+    stat = os.stat(path)
+    path.write_text(json.dumps(data), encoding="utf-8")
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + bump * 1_000_000_000))
+
+def test_dataset_is_read_once(proofs_file, monkeypatch):
+    monkeypatch.setattr(archaeology, "PROOFS_RELOAD_INTERVAL", 0)
+    assert load_proofs() is True
+    with patch('builtins.open', new_callable=mock_open) as mock_file_open:
+        for _ in range(5):
+            assert get_archeological_proof("Genesis", "1") == MOCK_PROOFS_DATA["genesis_1"]
+    mock_file_open.assert_not_called() # Unchanged file: only stat() on the hot path
+    assert proofs_index_stats()["loads"] == 1
+
+def test_stat_checks_are_throttled(proofs_file, monkeypatch):
+    monkeypatch.setattr(archaeology, "PROOFS_RELOAD_INTERVAL", 3600)
+    load_proofs()
+    with patch('utils.archaeology.os.stat') as mock_stat:
+        get_archeological_proof("Genesis", "1")
+    mock_stat.assert_not_called()
+
+def test_changed_file_is_hot_reloaded(proofs_file, monkeypatch):
+    monkeypatch.setattr(archaeology, "PROOFS_RELOAD_INTERVAL", 0)
+    assert get_archeological_proof("Genesis", "1") == MOCK_PROOFS_DATA["genesis_1"]
+
+    _rewrite(proofs_file, {"genesis_1": "Updated proof for Genesis 1."})
+    assert get_archeological_proof("Genesis", "1") == "Updated proof for Genesis 1."
+
+    stats = proofs_index_stats()
+    assert stats["loads"] == 2
+    assert stats["reloads"] == 1
+    assert stats["entries"] == 1
+    assert stats["last_load_seconds"] >= 0
+    assert stats["loaded_at"] is not None
+
+def test_bad_reload_keeps_last_good_index(proofs_file, monkeypatch):
+    monkeypatch.setattr(archaeology, "PROOFS_RELOAD_INTERVAL", 0)
+    load_proofs()
+
+    stat = os.stat(proofs_file)
+    proofs_file.write_text("{ half written")
+    os.utime(proofs_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert get_archeological_proof("Genesis", "1") == MOCK_PROOFS_DATA["genesis_1"]
+    assert proofs_index_stats()["load_errors"] == 1
+
+    # Once the file is fixed the new content is served
+    _rewrite(proofs_file, {"genesis_1": "Fixed."}, bump=2)
+    assert get_archeological_proof("Genesis", "1") == "Fixed."
+
+def test_index_is_immutable(proofs_file):
+    load_proofs()
+    with pytest.raises(TypeError):
+        archaeology._state.index["genesis_1"] = "Tampered"
+
+def test_readers_do_not_wait_for_a_reload(proofs_file, monkeypatch):
+    monkeypatch.setattr(archaeology, "PROOFS_RELOAD_INTERVAL", 0)
+    load_proofs()
+    # Simulate another thread holding the reload lock: readers keep using the current index
+    archaeology._reload_lock.acquire()
+    try:
+        _rewrite(proofs_file, {"genesis_1": "Newer."})
+        assert get_archeological_proof("Genesis", "1") == MOCK_PROOFS_DATA["genesis_1"]
+    finally:
+        archaeology._reload_lock.release()
+    assert get_archeological_proof("Genesis", "1") == "Newer."
+
+# --- Canonical book keys ---
+
+def test_dataset_keys_and_requests_resolve_to_the_same_book(proofs_file):
+    proofs_file.write_text(json.dumps({
+        "1stkings_9": "Proof for 1 Kings 9.",
+        "genesis_general": "General proof for Genesis.",
+        "song_of_solomon": "General proof for the Song of Solomon.",
+    }))
+    assert get_archeological_proof("I Kgs", "9") == "Proof for 1 Kings 9."
+    assert get_archeological_proof("first kings", 9) == "Proof for 1 Kings 9."
+    # "<book>_general" keys are book-level fallbacks
+    assert get_archeological_proof("Gen", "50") == "General proof for Genesis."
+    assert get_archeological_proof("Song of Songs", "2") == "General proof for the Song of Solomon."
+
+def test_bare_book_key_takes_precedence_over_general_suffix(proofs_file):
+    proofs_file.write_text(json.dumps({"mark": "Bare key.", "mark_general": "Suffixed key."}))
+    assert get_archeological_proof("Mark", "5") == "Bare key."
@@ -0,0 +1,155 @@
+import asyncio
+import json
+import time
+import pytest
+import requests
+from unittest.mock import patch
+from app import app as flask_app
+import asgi
+
+@pytest.fixture(autouse=True)
+def no_precomputed(mocker):
+    mocker.patch('app.get_precomputed', return_value=None)
+    mocker.patch('asgi.get_precomputed', return_value=None)
+
+@pytest.fixture
+def client():
+    flask_app.config['TESTING'] = True
+    with flask_app.test_client() as client:
+        yield client
+
+def call(method, path, body=b"", headers=(), query=b""):
+    """Runs one request through the ASGI app; returns (status, headers, body)."""
+    messages = []
+
+    async def run():
+        received = []
+        async def receive():
+            if received:
+                await asyncio.sleep(3600)
+            received.append(True)
+            return {"type": "http.request", "body": body, "more_body": False}
+        async def send(message):
+            messages.append(message)
+        scope = {
+            "type": "http", "method": method, "path": path, "query_string": query, "root_path": "",
+            "headers": [(k.encode(), v.encode()) for k, v in headers], "http_version": "1.1",
+            "scheme": "http", "server": ("testserver", 80), "client": ("127.0.0.1", 1234),
+        }
+        await asgi.app(scope, receive, send)
+
+    asyncio.run(run())
+    start = messages[0]
+    return start["status"], dict((k.decode(), v.decode()) for k, v in start["headers"]), b"".join(m.get("body", b"") for m in messages[1:])
+
+def post_json(payload):
+    return call("POST", "/summarize", json.dumps(payload).encode(), [("content-type", "application/json")])
+
+MOCK_VERSES = {"text": "Mocked Bible verses for John 3.", "reference": "John 3"}
+
+@patch('asgi.get_archeological_proof', return_value="Proof.")
+@patch('app.get_archeological_proof', return_value="Proof.")
+@patch('app.summarize_text', return_value="Summary.")
+@patch('app.get_bible_verses', return_value=MOCK_VERSES)
+@patch('asgi.get_bible_verses_async', return_value=MOCK_VERSES)
+def test_summarize_responses_match_the_flask_app(mock_async_verses, mock_verses, mock_summarize, mock_proof, mock_async_proof, client):
+    for payload in (
+        {"book": "John", "chapter": "3"},
+        {"book": "John", "chapter": 3, "mode": "extractive"},
+        {"book": "John"},
+        {"book": "John", "chapter": "0"},
+        {"book": "John", "chapter": "3", "mode": "poetic"},
+    ):
+        expected = client.post('/summarize', json=payload)
+        status, headers, body = post_json(payload)
+        assert (status, body) == (expected.status_code, expected.data), payload
+        assert headers["content-type"] == "application/json"
+
+@patch('app.get_bible_verses', return_value={"error": "Book or chapter not found"})
+@patch('asgi.get_bible_verses_async', return_value={"error": "Book or chapter not found"})
+def test_not_found_matches(mock_async_verses, mock_verses, client):
+    expected = client.post('/summarize', json={"book": "Nowhere", "chapter": "1"})
+    assert post_json({"book": "Nowhere", "chapter": "1"})[::2] == (404, expected.data)
+
+@patch('asgi.get_bible_verses_async', side_effect=requests.exceptions.ConnectionError("Upstream down"))
+def test_upstream_failure_is_503(mock_async_verses):
+    status, _, body = post_json({"book": "John", "chapter": "3"})
+    assert status == 503
+    assert json.loads(body) == {"error": "Error connecting to Bible API: Upstream down"}
+
+@patch('app.summarize_text', side_effect=RuntimeError("Model failed"))
+@patch('asgi.get_bible_verses_async', return_value=MOCK_VERSES)
+def test_summarization_failure_is_500(mock_async_verses, mock_summarize):
+    status, _, body = post_json({"book": "John", "chapter": "3"})
+    assert (status, json.loads(body)) == (500, {"error": "Error during text summarization"})
+
+def test_bodies_that_are_not_json_objects_get_flask_responses(client):
+    for body, content_type in ((b"book=John", "application/x-www-form-urlencoded"), (b"{not json", "application/json"), (b"[]", "application/json")):
+        expected = client.post('/summarize', data=body, content_type=content_type)
+        status, _, data = call("POST", "/summarize", body, [("content-type", content_type)])
+        assert (status, data) == (expected.status_code, expected.data)
+
+def test_other_routes_are_served_by_flask():
+    status, headers, body = call("GET", "/healthz")
+    assert (status, json.loads(body)) == (200, {"status": "ok"})
+    assert call("GET", "/nowhere")[0] == 404
+
+@patch('app.summarize_passage_stream', return_value=iter([{"event": "chunk", "index": 0, "total": 1, "summary": "A."}, {"event": "summary", "summary": "A."}]))
+@patch('app.get_bible_verses', return_value=MOCK_VERSES)
+def test_streams_pass_through(mock_verses, mock_stream):
+    status, headers, body = call("POST", "/summarize/stream", json.dumps({"book": "John", "chapter": "3"}).encode(), [("content-type", "application/json")])
+    assert status == 200
+    assert headers["content-type"] == "application/x-ndjson"
+    assert [json.loads(line)["event"] for line in body.splitlines()] == ["passage", "chunk", "summary"]
+
+@patch('app.summarize_text', return_value="Summary.")
+@patch('asgi.get_bible_verses_async', return_value=MOCK_VERSES)
+def test_requests_are_counted(mock_async_verses, mock_summarize):
+    from utils import metrics
+    metrics.reset()
+    post_json({"book": "John", "chapter": "3"})
+    text = metrics.render()
+    assert 'bible_summarizer_requests_total{endpoint="/summarize",status="200"} 1' in text
+    assert 'bible_summarizer_stage_duration_seconds_count{stage="fetch"} 1' in text
+    assert "bible_summarizer_in_flight_requests 0" in text
+
+def test_aget_with_retries_retries_then_returns():
+    httpx = pytest.importorskip("httpx")
+    from utils import http_client
+    statuses = iter([503, 200])
+
+    async def run():
+        await http_client.aclose_async_client()
+        client = http_client.get_async_client()
+        client._transport = httpx.MockTransport(lambda request: httpx.Response(next(statuses), json={"verses": []}))
+        try:
+            return await http_client.aget_with_retries("http://bible-api.test/John%203")
+        finally:
+            await http_client.aclose_async_client()
+
+    with patch('utils.http_client.UPSTREAM_BACKOFF', 0):
+        assert asyncio.run(run()).status_code == 200
+
+@patch('app.summarize_text', return_value="Summary.")
+@patch('asgi.get_bible_verses_async', return_value=MOCK_VERSES)
+def test_slow_precomputed_lookup_does_not_block_the_loop(mock_async_verses, mock_summarize, mocker):
+    mocker.patch('asgi.get_precomputed', side_effect=lambda book, chapter: time.sleep(0.3))
+    messages = []
+
+    async def run():
+        body = json.dumps({"book": "John", "chapter": "3"}).encode()
+        async def receive():
+            return {"type": "http.request", "body": body, "more_body": False}
+        async def send(message):
+            messages.append(message)
+        scope = {"type": "http", "method": "POST", "path": "/summarize", "query_string": b"",
+                 "headers": [(b"content-type", b"application/json")]}
+        request = asyncio.ensure_future(asgi.app(scope, receive, send))
+        ticks = 0
+        while not request.done():
+            await asyncio.sleep(0.01)
+            ticks += 1
+        return ticks
+
+    assert asyncio.run(run()) >= 10
+    assert messages[0]["status"] == 200
@@ -0,0 +1,86 @@
+import threading
+import pytest
+from utils.batching import BatchScheduler
+
+def make_scheduler(calls, max_batch_size=8, max_wait_ms=100):
+    def run_batch(items):
+        calls.append(list(items))
+        return [item * 10 for item in items]
+    return BatchScheduler("test", run_batch, max_batch_size=max_batch_size, max_wait_ms=max_wait_ms)
+
+def test_single_item_round_trip():
+    calls = []
+    scheduler = make_scheduler(calls, max_wait_ms=0)
+    assert scheduler.submit(4).result(timeout=5) == 40
+    assert calls == [[4]]
+
+def test_concurrent_submissions_are_coalesced():
+    calls = []
+    scheduler = make_scheduler(calls, max_wait_ms=200)
+    start = threading.Barrier(4)
+    results = {}
+
+    def submit(n):
+        start.wait()
+        results[n] = scheduler.submit(n).result(timeout=5)
+
+    threads = [threading.Thread(target=submit, args=(n,)) for n in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == {n: n * 10 for n in range(4)}
+    assert len(calls) < 4 # At least some of the submissions shared a call
+    stats = scheduler.stats()
+    assert stats["items"] == 4
+    assert stats["batches"] == len(calls)
+    assert stats["queue_depth"] == 0
+    assert sum(stats["batch_size_histogram"].values()) == len(calls)
+
+def test_submit_many_stays_together_and_in_order():
+    calls = []
+    scheduler = make_scheduler(calls, max_batch_size=2, max_wait_ms=0)
+    futures = scheduler.submit_many([1, 2, 3, 4, 5])
+    assert [f.result(timeout=5) for f in futures] == [10, 20, 30, 40, 50]
+    # One request's items are never split, even beyond max_batch_size
+    assert calls == [[1, 2, 3, 4, 5]]
+    assert scheduler.stats()["batch_size_histogram"]["8"] == 1
+
+def test_max_batch_size_bounds_coalescing():
+    calls = []
+    release = threading.Event()
+
+    def run_batch(items):
+        release.wait(5) # Hold the first batch so the rest queue up behind it
+        calls.append(list(items))
+        return items
+
+    scheduler = BatchScheduler("test", run_batch, max_batch_size=2, max_wait_ms=0)
+    first = scheduler.submit(0)
+    rest = [scheduler.submit(n) for n in range(1, 6)]
+    release.set()
+    assert [f.result(timeout=5) for f in [first] + rest] == list(range(6))
+    assert all(len(batch) <= 2 for batch in calls[1:])
+    assert scheduler.stats()["max_queue_depth"] >= 5
+
+def test_errors_are_raised_from_every_future():
+    def run_batch(items):
+        raise ValueError("model exploded")
+
+    scheduler = BatchScheduler("test", run_batch, max_wait_ms=0)
+    futures = scheduler.submit_many([1, 2])
+    for future in futures:
+        with pytest.raises(ValueError, match="model exploded"):
+            future.result(timeout=5)
+    assert scheduler.stats()["errors"] == 1
+
+    # The scheduler keeps running after a failed batch
+    scheduler.run_batch = lambda items: items
+    assert scheduler.submit(7).result(timeout=5) == 7
+
+def test_wrong_number_of_results_is_an_error():
+    scheduler = BatchScheduler("test", lambda items: items[:1], max_wait_ms=0)
+    futures = scheduler.submit_many([1, 2])
+    with pytest.raises(RuntimeError):
+        futures[1].result(timeout=5)
@@ -1,10 +1,23 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
 import pytest
 import requests
 from unittest.mock import patch, MagicMock # Changed from from unittest.mock import patch
-from utils.bible import get_bible_verses
+from utils import bible
+from utils.bible import get_bible_verses, verse_cache_key
+from utils.cache import LRUCache, TwoTierCache
+
+# Give every test a fresh, memory-only verse cache so mocked responses never leak between tests
+# and the shared on-disk cache is never touched.
+@pytest.fixture(autouse=True)
+def fresh_verse_cache(monkeypatch):
+    cache = TwoTierCache("verses", LRUCache(max_entries=16))
+    monkeypatch.setattr(bible, "verse_cache", cache)
+    return cache
 
 # Test successful API call
-@patch('utils.bible.requests.get')
+@patch('utils.bible.get_with_retries')
 def test_get_bible_verses_success(mock_get):
     mock_response = MagicMock()
     mock_response.status_code = 200
@@ -28,7 +41,7 @@ def test_get_bible_verses_success(mock_get):
     mock_get.assert_called_once_with(f"https://bible-api.com/{book}%20{chapter}?translation=kjv")
 
 # Test API call with invalid book/chapter (404 error)
-@patch('utils.bible.requests.get')
+@patch('utils.bible.get_with_retries')
 def test_get_bible_verses_not_found(mock_get):
     mock_response = MagicMock()
     mock_response.status_code = 404
@@ -37,8 +50,9 @@ def test_get_bible_verses_not_found(mock_get):
     mock_response.json.return_value = {"error": "Book not found or chapter out of range."} 
     mock_get.return_value = mock_response
 
-    book = "InvalidBook"
-    chapter = "999"
+    # A real book, so the request reaches the (mocked) upstream, which answers 404
+    book = "Obadiah"
+    chapter = "1"
     result = get_bible_verses(book, chapter)
 
     assert "error" in result
@@ -46,8 +60,30 @@ def test_get_bible_verses_not_found(mock_get):
     assert result["error"] == "Invalid book or chapter" 
     mock_get.assert_called_once_with(f"https://bible-api.com/{book}%20{chapter}?translation=kjv")
 
+# Unknown books and out-of-range chapters are rejected before any upstream call
+@patch('utils.bible.get_with_retries')
+def test_get_bible_verses_unknown_book_rejected_locally(mock_get):
+    result = get_bible_verses("InvalidBook", "999")
+    assert result == {"error": "Book or chapter not found: InvalidBook 999"}
+    assert get_bible_verses("Genesis", "51")["error"].startswith("Book or chapter not found")
+    assert get_bible_verses("Genesis", "49-51")["error"].startswith("Book or chapter not found")
+    mock_get.assert_not_called()
+
+# Book aliases are resolved to the canonical name before the upstream URL is built
+@patch('utils.bible.get_with_retries')
+def test_get_bible_verses_uses_canonical_book_name(mock_get):
+    mock_response = MagicMock()
+    mock_response.status_code = 200
+    mock_response.json.return_value = {"verses": [{"text": "And king Solomon raised a levy"}]}
+    mock_get.return_value = mock_response
+
+    get_bible_verses("1st kgs", "9")
+    get_bible_verses("I Kings", "9") # Same canonical reference, served from the cache
+
+    mock_get.assert_called_once_with("https://bible-api.com/1%20Kings%209?translation=kjv")
+
 # Test API call failure (e.g., network error)
-@patch('utils.bible.requests.get')
+@patch('utils.bible.get_with_retries')
 def test_get_bible_verses_request_exception(mock_get):
     mock_get.side_effect = requests.exceptions.RequestException("Test network error")
 
@@ -63,14 +99,14 @@ def test_get_bible_verses_request_exception(mock_get):
     mock_get.assert_called_once_with(f"https://bible-api.com/{book}%20{chapter}?translation=kjv")
 
 # Test API returning 200 but with an error message in JSON (if applicable for the API)
-@patch('utils.bible.requests.get')
+@patch('utils.bible.get_with_retries')
 def test_get_bible_verses_success_with_internal_api_error_message(mock_get):
     mock_response = MagicMock()
     mock_response.status_code = 200 # API itself is up
     mock_response.json.return_value = {"error": "Internal API error processing this book."} # But data has an error
     mock_get.return_value = mock_response
 
-    book = "ErrorBook"
+    book = "Esther"
     chapter = "1"
     result = get_bible_verses(book, chapter)
 
@@ -86,37 +122,29 @@ def test_get_bible_verses_success_with_internal_api_error_message(mock_get):
     assert result["text"] == "" # Because "verses" would be missing from the mocked response
     mock_get.assert_called_once_with(f"https://bible-api.com/{book}%20{chapter}?translation=kjv")
 
-# Test with chapter range (if bible-api.com supports it, e.g., "John 3:16-18")
-# The current get_bible_verses function constructs URL like "Book%20Chapter"
-# So "John%203:16-18" or "John%203-5".
-# Let's assume bible-api.com handles "John%203-5" for whole chapters.
-@patch('utils.bible.requests.get')
+# Chapter ranges are split into one upstream request per chapter and reassembled in order
+@patch('utils.bible.get_with_retries')
 def test_get_bible_verses_chapter_range(mock_get):
-    mock_response = MagicMock()
-    mock_response.status_code = 200
-    mock_response.json.return_value = {
-        "reference": "John 3:1-5", # Example
-        "verses": [
-            {"text": "Verse 1..."},
-            {"text": "Verse 2..."},
-            {"text": "Verse 3..."},
-            {"text": "Verse 4..."},
-            {"text": "Verse 5..."}
-        ],
-        "text": "Verse 1...\nVerse 2...\nVerse 3...\nVerse 4...\nVerse 5..."
-    }
-    mock_get.return_value = mock_response
+    def respond(url):
+        chapter = url.split("%20")[1].split("?")[0]
+        mock_response = MagicMock()
+        mock_response.status_code = 200
+        mock_response.json.return_value = {"verses": [{"text": f"Chapter {chapter} verse 1"}, {"text": f"Chapter {chapter} verse 2"}]}
+        return mock_response
+    mock_get.side_effect = respond
 
     book = "John"
     chapter_range = "3-5"
     result = get_bible_verses(book, chapter_range)
 
     assert "error" not in result
-    assert result["text"] == "Verse 1...\nVerse 2...\nVerse 3...\nVerse 4...\nVerse 5..."
-    mock_get.assert_called_once_with(f"https://bible-api.com/{book}%20{chapter_range}?translation=kjv")
+    assert result["text"] == "\n".join(f"Chapter {c} verse {v}" for c in (3, 4, 5) for v in (1, 2))
+    assert sorted(c.args[0] for c in mock_get.call_args_list) == [
+        f"https://bible-api.com/{book}%20{c}?translation=kjv" for c in (3, 4, 5)
+    ]
 
 # Test empty or malformed JSON response from API (status 200)
-@patch('utils.bible.requests.get')
+@patch('utils.bible.get_with_retries')
 def test_get_bible_verses_malformed_json(mock_get):
     mock_response = MagicMock()
     mock_response.status_code = 200
@@ -132,7 +160,7 @@ def test_get_bible_verses_malformed_json(mock_get):
     assert result["text"] == ""
     mock_get.assert_called_once_with(f"https://bible-api.com/{book}%20{chapter}?translation=kjv")
     
-@patch('utils.bible.requests.get')
+@patch('utils.bible.get_with_retries')
 def test_get_bible_verses_empty_verses_list(mock_get):
     mock_response = MagicMock()
     mock_response.status_code = 200
@@ -146,3 +174,201 @@ def test_get_bible_verses_empty_verses_list(mock_get):
     assert "error" not in result 
     assert result["text"] == ""
     mock_get.assert_called_once_with(f"https://bible-api.com/{book}%20{chapter}?translation=kjv")
+
+# --- Verse cache ---
+
+def _ok_response(text="In the beginning..."):
+    mock_response = MagicMock()
+    mock_response.status_code = 200
+    mock_response.json.return_value = {"verses": [{"text": text}]}
+    return mock_response
+
+@patch('utils.bible.get_with_retries')
+def test_get_bible_verses_cached_after_first_call(mock_get, fresh_verse_cache):
+    mock_get.return_value = _ok_response()
+
+    first = get_bible_verses("Genesis", "1")
+    second = get_bible_verses("Genesis", "1")
+
+    assert first == second == {"text": "In the beginning..."}
+    mock_get.assert_called_once() # Second call is served from the cache
+    stats = fresh_verse_cache.stats()
+    assert stats["misses"] == 1
+    assert stats["memory_hits"] == 1
+
+@patch('utils.bible.get_with_retries')
+def test_get_bible_verses_cache_key_is_normalized(mock_get):
+    mock_get.return_value = _ok_response()
+
+    get_bible_verses("1 John", "3")
+    get_bible_verses("  1  JOHN ", "3")
+
+    mock_get.assert_called_once()
+    assert verse_cache_key("1 John", "3 - 5") == verse_cache_key("1st jn", "3-5") == "kjv:1JN:3-5"
+
+@patch('utils.bible.get_with_retries')
+def test_get_bible_verses_errors_not_cached(mock_get):
+    mock_response = MagicMock()
+    mock_response.status_code = 404
+    mock_get.return_value = mock_response
+
+    assert "error" in get_bible_verses("Nahum", "1")
+    assert "error" in get_bible_verses("Nahum", "1")
+    assert mock_get.call_count == 2
+
+@patch('utils.bible.get_with_retries')
+def test_get_bible_verses_served_from_disk_tier(mock_get, tmp_path, monkeypatch):
+    from utils.cache import SQLiteStore
+    store = SQLiteStore(str(tmp_path / "verses.sqlite3"))
+    mock_get.return_value = _ok_response()
+
+    # Simulate two gunicorn workers: separate in-process tiers sharing one SQLite file
+    monkeypatch.setattr(bible, "verse_cache", TwoTierCache("verses", LRUCache(), store))
+    get_bible_verses("John", "3")
+    monkeypatch.setattr(bible, "verse_cache", TwoTierCache("verses", LRUCache(), store))
+    result = get_bible_verses("John", "3")
+
+    assert result == {"text": "In the beginning..."}
+    mock_get.assert_called_once()
+    assert bible.verse_cache_stats()["disk_hits"] == 1
+
+# --- Per-chapter range fetching ---
+
+def test_expand_chapter_range():
+    assert bible.expand_chapter_range("3-5") == ["3", "4", "5"]
+    assert bible.expand_chapter_range(" 7 - 8 ") == ["7", "8"]
+    assert bible.expand_chapter_range("3") == ["3"]
+    assert bible.expand_chapter_range("5-3") == ["5-3"] # Not expandable, passed through as-is
+
+@patch('utils.bible._fetch_bible_verses')
+def test_overlapping_ranges_reuse_cached_chapters(mock_fetch):
+    mock_fetch.side_effect = lambda book, chapter, translation: {"text": f"Genesis {chapter}"}
+
+    get_bible_verses("Genesis", "1-5")
+    result = get_bible_verses("Genesis", "3-8")
+
+    assert result["text"] == "\n".join(f"Genesis {c}" for c in range(3, 9))
+    fetched = sorted(int(c.args[1]) for c in mock_fetch.call_args_list)
+    assert fetched == list(range(1, 9)) # Chapters 3-5 were served from the cache the second time
+
+@patch('utils.bible._fetch_bible_verses')
+def test_range_keeps_chapters_apart(mock_fetch):
+    mock_fetch.side_effect = lambda book, chapter, translation: {"text": f"Ruth {chapter}"}
+    result = get_bible_verses("Ruth", "2-3")
+    assert result["chapters"] == [{"chapter": "2", "text": "Ruth 2"}, {"chapter": "3", "text": "Ruth 3"}]
+    assert "chapters" not in get_bible_verses("Ruth", "4") # Single chapters are just the text
+
+@patch('utils.bible._fetch_bible_verses')
+def test_range_chapters_fetched_concurrently(mock_fetch):
+    def slow_fetch(book, chapter, translation):
+        time.sleep(0.2)
+        return {"text": f"Psalms {chapter}"}
+    mock_fetch.side_effect = slow_fetch
+
+    started = time.monotonic()
+    result = get_bible_verses("Psalms", "1-6")
+    elapsed = time.monotonic() - started
+
+    assert result["text"].splitlines() == [f"Psalms {c}" for c in range(1, 7)]
+    assert elapsed < 0.2 * 6 / 2 # Roughly the slowest single chapter, not the sum
+
+@patch('utils.bible._fetch_bible_verses')
+def test_range_with_missing_chapter_returns_error(mock_fetch):
+    mock_fetch.side_effect = lambda book, chapter, translation: (
+        {"error": "Invalid book or chapter"} if chapter == "3" else {"text": f"Ruth {chapter}"}
+    )
+    assert get_bible_verses("Ruth", "1-3") == {"error": "Invalid book or chapter"}
+
+@patch('utils.bible._fetch_bible_verses')
+def test_range_propagates_request_exception(mock_fetch):
+    def fetch(book, chapter, translation):
+        if chapter == "2":
+            raise requests.exceptions.ConnectionError("Upstream down")
+        return {"text": "ok"}
+    mock_fetch.side_effect = fetch
+    with pytest.raises(requests.exceptions.RequestException):
+        get_bible_verses("Ruth", "1-3")
+
+@patch('utils.bible._fetch_bible_verses')
+def test_concurrent_misses_for_a_chapter_share_one_upstream_call(mock_fetch):
+    def slow_fetch(book, chapter, translation):
+        time.sleep(0.2)
+        return {"text": f"{book} {chapter}"}
+    mock_fetch.side_effect = slow_fetch
+
+    # Different spellings of the same chapter coalesce too
+    references = [("John", "3"), ("john", " 3"), ("Jn", "3"), ("JOHN", "3")]
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        results = list(pool.map(lambda reference: get_bible_verses(*reference), references))
+
+    assert results == [{"text": "John 3"}] * 4
+    mock_fetch.assert_called_once()
+
+@patch('utils.bible._fetch_bible_verses')
+def test_concurrent_misses_share_the_upstream_error(mock_fetch):
+    def failing_fetch(book, chapter, translation):
+        time.sleep(0.2)
+        raise requests.exceptions.ConnectionError("Upstream down")
+    mock_fetch.side_effect = failing_fetch
+
+    def fetch(_):
+        with pytest.raises(requests.exceptions.ConnectionError):
+            get_bible_verses("John", "3")
+
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        list(pool.map(fetch, range(3)))
+    mock_fetch.assert_called_once()
+
+# --- Async fetch (ASGI app) ---
+
+def chapter_response(text):
+    response = MagicMock()
+    response.status_code = 200
+    response.json.return_value = {"verses": [{"text": text}]}
+    return response
+
+@patch('utils.bible.aget_with_retries')
+def test_async_range_is_fetched_concurrently_and_cached(mock_get):
+    async def slow_get(url):
+        await asyncio.sleep(0.2)
+        return chapter_response(url.split("%20")[1].split("?")[0])
+    mock_get.side_effect = slow_get
+
+    started = time.monotonic()
+    result = asyncio.run(bible.get_bible_verses_async("Ruth", "1-4"))
+    assert time.monotonic() - started < 0.2 * 4 / 2
+    assert result["chapters"] == [{"chapter": str(c), "text": str(c)} for c in range(1, 5)]
+
+    # Shares the verse cache with the sync path
+    assert get_bible_verses("Ruth", "2") == {"text": "2"}
+    assert mock_get.call_count == 4
+
+@patch('utils.bible.aget_with_retries')
+def test_async_fetch_errors_match_the_sync_path(mock_get):
+    assert asyncio.run(bible.get_bible_verses_async("Ruth", "5"))["error"] == "Book or chapter not found: Ruth 5"
+    mock_get.return_value = MagicMock(status_code=404)
+    assert asyncio.run(bible.get_bible_verses_async("Ruth", "1")) == {"error": "Invalid book or chapter"}
+    mock_get.side_effect = requests.exceptions.ConnectionError("Upstream down")
+    with pytest.raises(requests.exceptions.RequestException):
+        asyncio.run(bible.get_bible_verses_async("Ruth", "2"))
+
+@patch('utils.bible.aget_with_retries')
+def test_async_fetch_keeps_the_loop_responsive_while_the_store_is_slow(mock_get, fresh_verse_cache, monkeypatch):
+    mock_get.return_value = chapter_response("Ruth 1")
+    lookup, store = fresh_verse_cache.get, fresh_verse_cache.set
+    # A locked SQLite file: reads and writes wait on its busy timeout
+    monkeypatch.setattr(fresh_verse_cache, "get", lambda key: time.sleep(0.3) or lookup(key))
+    monkeypatch.setattr(fresh_verse_cache, "set", lambda key, value: time.sleep(0.3) or store(key, value))
+
+    async def run():
+        ticks = 0
+        fetch = asyncio.ensure_future(bible.get_bible_verses_async("Ruth", "1"))
+        while not fetch.done():
+            await asyncio.sleep(0.01)
+            ticks += 1
+        return fetch.result(), ticks
+
+    result, ticks = asyncio.run(run())
+    assert result == {"text": "Ruth 1"}
+    # Other coroutines kept running during the 0.6 s of store calls
+    assert ticks >= 20
@@ -0,0 +1,49 @@
+import pytest
+from utils.books import BOOKS, BOOKS_BY_ID, alias_key, book_key, resolve_book
+
+def test_canon_has_66_books_and_1189_chapters():
+    assert len(BOOKS) == 66
+    assert sum(book.chapters for book in BOOKS) == 1189
+    assert len(BOOKS_BY_ID) == 66
+
+@pytest.mark.parametrize("name", [
+    "1 Kings", "1kings", "1st kings", "1st Kings", "1stkings", "I Kings", "first kings", "1 Kgs", "1KI", " 1  KINGS ",
+])
+def test_resolve_ordinal_variants(name):
+    assert resolve_book(name).id == "1KI"
+
+@pytest.mark.parametrize("name, book_id", [
+    ("Genesis", "GEN"),
+    ("gen", "GEN"),
+    ("Psalm", "PSA"),
+    ("Song of Songs", "SNG"),
+    ("Song of Solomon", "SNG"),
+    ("Revelations", "REV"),
+    ("Phillipians", "PHP"),
+    ("iii john", "3JN"),
+    ("3rd John", "3JN"),
+    ("2nd Timothy", "2TI"),
+    ("II Tim.", "2TI"),
+    ("Isaiah", "ISA"), # Leading "I" is not an ordinal without a space
+    ("Jn", "JHN"),
+])
+def test_resolve_aliases_and_misspellings(name, book_id):
+    assert resolve_book(name).id == book_id
+
+def test_resolve_returns_display_name_and_chapters():
+    book = resolve_book("song")
+    assert book.name == "Song of Solomon"
+    assert book.chapters == 8
+
+@pytest.mark.parametrize("name", ["InvalidBook", "", "4 Kings", "Kings", None, 123])
+def test_resolve_unknown(name):
+    assert resolve_book(name) is None
+
+def test_alias_key_does_not_corrupt_other_digits():
+    # The old normalization rewrote every "1" into "1st"
+    assert alias_key("1 Kings") == "1kings"
+    assert alias_key("Book 10") == "book10"
+
+def test_book_key_falls_back_to_alias_key():
+    assert book_key("1st kings") == "1KI"
+    assert book_key("Error Book") == "errorbook"
@@ -0,0 +1,135 @@
+import threading
+import pytest
+from unittest.mock import patch
+from utils.cache import MISSING, LRUCache, SQLiteStore, TwoTierCache, thread_connection, track_lookups
+
+# --- LRUCache ---
+
+def test_lru_get_set_and_miss():
+    cache = LRUCache(max_entries=2)
+    cache.set("a", {"text": "A"})
+    assert cache.get("a") == {"text": "A"}
+    assert cache.get("missing") is MISSING
+
+def test_lru_caches_falsy_values():
+    cache = LRUCache()
+    cache.set("empty", "")
+    assert cache.get("empty") == ""
+
+def test_lru_evicts_least_recently_used():
+    cache = LRUCache(max_entries=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a") # "a" is now most recently used
+    cache.set("c", 3)
+    assert cache.get("b") is MISSING
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+
+def test_lru_byte_budget():
+    cache = LRUCache(max_entries=100, max_bytes=10)
+    cache.set("a", "x", size=6)
+    cache.set("b", "y", size=6) # Pushes total to 12 > 10, so "a" is evicted
+    assert cache.get("a") is MISSING
+    assert cache.size_bytes == 6
+    cache.set("huge", "z", size=11) # Larger than the whole budget: never stored
+    assert cache.get("huge") is MISSING
+    assert cache.get("b") == "y"
+
+def test_lru_ttl_expiry():
+    cache = LRUCache(ttl=60)
+    with patch('utils.cache.time.time', return_value=1000.0):
+        cache.set("a", 1)
+    with patch('utils.cache.time.time', return_value=1030.0):
+        assert cache.get("a") == 1
+    with patch('utils.cache.time.time', return_value=1061.0):
+        assert cache.get("a") is MISSING
+    assert len(cache) == 0
+
+# --- SQLiteStore ---
+
+def test_sqlite_store_roundtrip(tmp_path):
+    store = SQLiteStore(str(tmp_path / "sub" / "cache.sqlite3")) # Parent directory is created
+    store.set("k", {"text": "Verse"})
+    assert store.get("k") == {"text": "Verse"}
+    assert store.get("missing") is MISSING
+    # A second store on the same file (another worker) sees the entry
+    assert SQLiteStore(store.path).get("k") == {"text": "Verse"}
+
+def test_sqlite_store_ttl_expiry(tmp_path):
+    store = SQLiteStore(str(tmp_path / "cache.sqlite3"), ttl=60)
+    with patch('utils.cache.time.time', return_value=1000.0):
+        store.set("k", 1)
+    with patch('utils.cache.time.time', return_value=1100.0):
+        assert store.get("k") is MISSING
+    assert len(store) == 0
+
+def test_sqlite_store_prune_max_entries(tmp_path):
+    store = SQLiteStore(str(tmp_path / "cache.sqlite3"), max_entries=3)
+    for i in range(5):
+        with patch('utils.cache.time.time', return_value=1000.0 + i):
+            store.set(f"k{i}", i)
+    store.prune()
+    assert len(store) == 3
+    assert store.get("k0") is MISSING # Oldest entries go first
+    assert store.get("k4") == 4
+
+def test_sqlite_store_errors_are_misses(tmp_path):
+    # Path is a directory, so sqlite cannot open it
+    store = SQLiteStore(str(tmp_path))
+    assert store.get("k") is MISSING
+    store.set("k", 1) # Must not raise
+
+# --- TwoTierCache ---
+
+def test_two_tier_counters_and_promotion(tmp_path):
+    disk = SQLiteStore(str(tmp_path / "cache.sqlite3"))
+    disk.set("k", "from disk")
+    cache = TwoTierCache("test", LRUCache(), disk)
+
+    assert cache.get("k") == "from disk" # Disk hit, promoted to memory
+    assert cache.get("k") == "from disk" # Memory hit
+    assert cache.get("other") is MISSING
+
+    stats = cache.stats()
+    assert stats["disk_hits"] == 1
+    assert stats["memory_hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["hit_ratio"] == pytest.approx(2 / 3)
+    assert stats["memory_entries"] == 1
+
+def test_two_tier_memory_only():
+    cache = TwoTierCache("test", LRUCache(max_bytes=1000))
+    cache.set("k", {"text": "abc"})
+    assert cache.get("k") == {"text": "abc"}
+    assert cache.stats()["memory_bytes"] > 0
+    cache.clear()
+    assert cache.get("k") is MISSING
+
+def test_track_lookups_collects_results_of_the_block(tmp_path):
+    cache = TwoTierCache("summaries", LRUCache(), SQLiteStore(str(tmp_path / "cache.sqlite3")))
+    cache.disk.set("on-disk", "A")
+    cache.get("before") # Not tracked
+    with track_lookups() as lookups:
+        cache.get("on-disk")
+        cache.get("on-disk")
+        cache.get("missing")
+        cache.set("missing", "B")
+    cache.get("after")
+    assert lookups == [("summaries", "disk_hit"), ("summaries", "memory_hit"), ("summaries", "miss")]
+
+def test_thread_connection_is_per_thread_and_in_wal_mode(tmp_path):
+    local = threading.local()
+    path = str(tmp_path / "nested" / "store.sqlite3")
+    conn = thread_connection(local, path, timeout=1, schema=("CREATE TABLE IF NOT EXISTS t (x)",))
+    assert thread_connection(local, path, timeout=1) is conn
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+    other = []
+    def use_from_another_thread():
+        other_conn = thread_connection(local, path, timeout=1)
+        other.append((other_conn is conn, other_conn.execute("SELECT COUNT(*) FROM t").fetchone()[0]))
+    worker = threading.Thread(target=use_from_another_thread)
+    worker.start()
+    worker.join()
+    assert other == [(False, 0)]
@@ -0,0 +1,149 @@
+import json
+import pytest
+from unittest.mock import patch
+from utils import bible, corpus
+from utils.cache import LRUCache, TwoTierCache
+from utils.corpus import LocalCorpus, build_packed_corpus, read_csv, read_json, read_usfm, main
+
+SAMPLE_BOOKS = {
+    "Genesis": {
+        1: {1: "In the beginning God created the heaven and the earth.", 2: "And the earth was without form, and void;"},
+        2: {1: "Thus the heavens and the earth were finished,"},
+        3: {1: "Now the serpent was more subtil than any beast of the field"},
+    },
+    "1 John": {
+        4: {8: "He that loveth not knoweth not God; for God is love."},
+    },
+}
+
+@pytest.fixture
+def packed_corpus(tmp_path):
+    path = str(tmp_path / "kjv.pack")
+    build_packed_corpus(SAMPLE_BOOKS, path)
+    corpus_view = LocalCorpus(path)
+    yield corpus_view
+    corpus_view.close()
+
+# --- Lookup ---
+
+def test_local_corpus_single_chapter(packed_corpus):
+    assert packed_corpus.get_text("Genesis", "1") == (
+        "In the beginning God created the heaven and the earth.\nAnd the earth was without form, and void;"
+    )
+    assert packed_corpus.translation == "kjv"
+
+def test_local_corpus_book_name_is_normalized(packed_corpus):
+    assert packed_corpus.get_text("  1  JOHN ", "4") == "He that loveth not knoweth not God; for God is love."
+
+def test_local_corpus_chapter_range_is_contiguous(packed_corpus):
+    text = packed_corpus.get_text("Genesis", "2-3")
+    assert text == "Thus the heavens and the earth were finished,\nNow the serpent was more subtil than any beast of the field"
+    assert packed_corpus.get_text("Genesis", "1 - 3").count("\n") == 3 # One verse per line across chapters
+
+def test_local_corpus_missing_entries(packed_corpus):
+    assert packed_corpus.get_text("Exodus", "1") is None
+    assert packed_corpus.get_text("Genesis", "4") is None
+    assert packed_corpus.get_text("Genesis", "3-4") is None # Range runs past the last chapter
+    assert packed_corpus.get_text("Genesis", "abc") is None
+
+def test_local_corpus_rejects_other_files(tmp_path):
+    path = tmp_path / "not-a-pack"
+    path.write_bytes(b"hello world")
+    with pytest.raises(ValueError):
+        LocalCorpus(str(path))
+
+# --- Ingestion ---
+
+def test_read_json_verse_records(tmp_path):
+    path = tmp_path / "kjv.json"
+    path.write_text(json.dumps({"verses": [
+        {"book_name": "Genesis", "chapter": 1, "verse": 2, "text": "Second verse."},
+        {"book_name": "Genesis", "chapter": 1, "verse": 1, "text": " First   verse. "},
+    ]}))
+    assert read_json(str(path)) == {"Genesis": {1: {1: "First verse.", 2: "Second verse."}}}
+
+def test_read_json_nested(tmp_path):
+    path = tmp_path / "kjv.json"
+    path.write_text(json.dumps({"Ruth": {"1": ["Verse one.", "Verse two."]}, "Jude": {"1": {"1": "Jude one."}}}))
+    assert read_json(str(path)) == {"Ruth": {1: {1: "Verse one.", 2: "Verse two."}}, "Jude": {1: {1: "Jude one."}}}
+
+def test_read_csv(tmp_path):
+    path = tmp_path / "kjv.csv"
+    path.write_text('Book,Chapter,Verse,Text\nJohn,3,16,"For God so loved the world, that he gave"\n')
+    assert read_csv(str(path)) == {"John": {3: {16: "For God so loved the world, that he gave"}}}
+
+def test_read_usfm(tmp_path):
+    path = tmp_path / "01-GEN.usfm"
+    path.write_text(
+        "\\id GEN King James Version\n"
+        "\\h Genesis\n"
+        "\\mt1 The First Book of Moses\n"
+        "\\c 1\n"
+        "\\s1 The Creation\n"
+        "\\p\n"
+        "\\v 1 In the \\w beginning|strong=\"H7225\"\\w* God created\\f + \\ft A note.\\f* the heaven and the earth.\n"
+        "\\v 2 And the earth was without form,\n"
+        "\\q1 and void;\n"
+        "\\c 2\n"
+        "\\v 1 Thus the heavens were finished.\n"
+    )
+    books = read_usfm(str(tmp_path)) # Directory input
+    assert books == {"Genesis": {
+        1: {1: "In the beginning God created the heaven and the earth.", 2: "And the earth was without form, and void;"},
+        2: {1: "Thus the heavens were finished."},
+    }}
+
+def test_ingest_cli(tmp_path, capsys):
+    source = tmp_path / "kjv.csv"
+    source.write_text("book,chapter,verse,text\nJohn,3,16,For God so loved the world\n")
+    output = tmp_path / "kjv.pack"
+    main([str(source), str(output)])
+    assert "1 books / 1 chapters" in capsys.readouterr().out
+    assert LocalCorpus(str(output)).get_text("john", "3") == "For God so loved the world"
+
+# --- Backend selection in utils.bible ---
+
+@pytest.fixture
+def corpus_path(tmp_path, monkeypatch):
+    path = str(tmp_path / "kjv.pack")
+    build_packed_corpus(SAMPLE_BOOKS, path)
+    monkeypatch.setattr(bible, "BIBLE_CORPUS_PATH", path)
+    monkeypatch.setattr(corpus, "_corpus", None)
+    return path
+
+@patch('utils.bible._fetch_bible_verses')
+def test_local_backend_never_calls_upstream(mock_fetch, corpus_path, monkeypatch):
+    monkeypatch.setattr(bible, "BIBLE_BACKEND", "local")
+    assert bible.get_bible_verses("Genesis", "2") == {"text": "Thus the heavens and the earth were finished,"}
+    assert bible.get_bible_verses("Exodus", "1") == {"error": "Invalid book or chapter"}
+    mock_fetch.assert_not_called()
+
+@patch('utils.bible._fetch_bible_verses')
+def test_local_then_remote_backend_falls_back(mock_fetch, corpus_path, monkeypatch):
+    monkeypatch.setattr(bible, "BIBLE_BACKEND", "local-then-remote")
+    monkeypatch.setattr(bible, "verse_cache", TwoTierCache("verses", LRUCache()))
+    mock_fetch.return_value = {"text": "Remote Exodus 1"}
+
+    assert bible.get_bible_verses("Genesis", "1-2")["text"].startswith("In the beginning")
+    mock_fetch.assert_not_called()
+    assert bible.get_bible_verses("Exodus", "1") == {"text": "Remote Exodus 1"}
+    mock_fetch.assert_called_once_with("Exodus", "1", "kjv")
+
+@patch('utils.bible._fetch_bible_verses')
+def test_local_backend_missing_corpus(mock_fetch, tmp_path, monkeypatch):
+    monkeypatch.setattr(bible, "BIBLE_BACKEND", "local")
+    monkeypatch.setattr(bible, "BIBLE_CORPUS_PATH", str(tmp_path / "missing.pack"))
+    monkeypatch.setattr(corpus, "_corpus", None)
+    assert bible.get_bible_verses("Genesis", "1") == {"error": "Invalid book or chapter"}
+    mock_fetch.assert_not_called()
+
+def test_unavailable_corpus_is_logged_once_until_it_appears(tmp_path, monkeypatch, caplog):
+    monkeypatch.setattr(corpus, "_corpus", None)
+    monkeypatch.setattr(corpus, "_failed", None)
+    path = str(tmp_path / "kjv.pack")
+    for _ in range(5):
+        assert corpus.get_local_corpus(path) is None
+    assert len([r for r in caplog.records if "corpus unavailable" in r.getMessage()]) == 1
+
+    build_packed_corpus(SAMPLE_BOOKS, path)
+    assert corpus.get_local_corpus(path).get_text("Genesis", "2") == "Thus the heavens and the earth were finished,"
@@ -0,0 +1,77 @@
+import json
+import time
+import pytest
+from utils import extractive
+from utils.extractive import build_idf, score_units, summarize_extractive
+
+CHAPTER = "\n".join([
+    "In the beginning God created the heaven and the earth.",
+    "And the earth was without form, and void; and darkness was upon the face of the deep.",
+    "And God said, Let there be light: and there was light.",
+    "And God saw the light, that it was good: and God divided the light from the darkness.",
+    "And God called the light Day, and the darkness he called Night.",
+    "And the evening and the morning were the first day.",
+    "Selah.",
+])
+
+@pytest.fixture(autouse=True)
+def no_corpus_idf(monkeypatch, tmp_path):
+    # Use the passage's own statistics unless a test provides an IDF file
+    monkeypatch.setattr(extractive, "IDF_PATH", str(tmp_path / "missing.json"))
+    monkeypatch.setattr(extractive, "_idf", None)
+    monkeypatch.setattr(extractive, "_idf_loaded", False)
+
+def test_picks_central_verses_in_reading_order():
+    summary = summarize_extractive(CHAPTER, max_words=30)
+    verses = CHAPTER.split("\n")
+    chosen = [v for v in verses if v in summary]
+
+    assert summary == " ".join(chosen) # Whole verses, in their original order
+    assert len(summary.split()) <= 30
+    assert "light" in summary # The passage is about light
+    assert "Selah." not in summary
+
+def test_scores_favor_representative_verses():
+    scores = score_units(CHAPTER.split("\n"))
+    assert scores.shape == (7,)
+    assert scores.argmax() == 3 # Light, God, darkness: closest to the centroid
+    assert scores[6] < scores[3]
+
+def test_single_paragraph_is_split_into_sentences():
+    paragraph = CHAPTER.replace("\n", " ")
+    summary = summarize_extractive(paragraph, max_words=20)
+    assert summary
+    assert summary != paragraph
+
+def test_short_and_empty_input():
+    assert summarize_extractive("Jesus wept.") == "Jesus wept."
+    assert summarize_extractive("...") == "..."
+    assert summarize_extractive("") == ""
+
+def test_always_returns_at_least_one_verse():
+    long_verse = " ".join(["word"] * 200) + "."
+    assert summarize_extractive(long_verse + "\nShort verse.", max_words=10) in (long_verse, "Short verse.")
+
+def test_corpus_idf_is_used(monkeypatch, tmp_path):
+    path = tmp_path / "idf.json"
+    # In this corpus "light" is everywhere, so it carries no weight; "darkness" is rare
+    path.write_text(json.dumps(build_idf(["light day", "light night", "light darkness"])))
+    monkeypatch.setattr(extractive, "IDF_PATH", str(path))
+
+    idf = extractive.get_idf()
+    assert idf["documents"] == 3
+    assert idf["terms"]["light"] < idf["terms"]["darkness"] < idf["unseen"]
+    assert summarize_extractive(CHAPTER, max_words=20)
+
+def test_build_idf_counts_documents_not_occurrences():
+    idf = build_idf(["the the the", "the end"])
+    assert idf["terms"]["the"] == pytest.approx(1.0)
+    assert idf["terms"]["end"] > idf["terms"]["the"]
+
+def test_chapter_takes_milliseconds():
+    chapter = "\n".join(f"{line} Verse {i}." for i, line in enumerate(CHAPTER.split("\n") * 5))
+    summarize_extractive(chapter) # Warm up NumPy
+    started = time.perf_counter()
+    for _ in range(10):
+        summarize_extractive(chapter)
+    assert (time.perf_counter() - started) / 10 < 0.05 # Loose bound; typically ~1 ms
@@ -0,0 +1,28 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from utils import forksafe
+from utils.forksafe import per_process
+
+def test_made_once_per_process(monkeypatch):
+    made = []
+    get = per_process(lambda: made.append(object()) or made[-1])
+    assert get.current() is None
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        values = list(pool.map(lambda _: get(), range(32)))
+    assert len(made) == 1
+    assert all(value is made[0] for value in values)
+    assert get.current() is made[0]
+
+    # A forked worker gets its own
+    child_pid = os.getpid() + 1
+    monkeypatch.setattr(forksafe.os, "getpid", lambda: child_pid)
+    assert get.current() is None
+    assert get() is made[1]
+
+def test_clear_makes_a_new_one():
+    get = per_process(object)
+    first = get()
+    get.clear()
+    assert get.current() is None
+    assert get() is not first
@@ -0,0 +1,103 @@
+import importlib.util
+import os
+import tempfile
+import pytest
+from unittest.mock import MagicMock, patch
+from utils import summarizer
+
+CONF_PATH = os.path.join(os.path.dirname(__file__), "..", "gunicorn.conf.py")
+
+def load_conf(monkeypatch, **env):
+    for name, value in env.items():
+        monkeypatch.setenv(name, value)
+    monkeypatch.setenv("MODEL_WARMUP", "0") # Restored afterwards; the config overrides it when preloading
+    monkeypatch.setenv("JOB_WORKERS_AUTOSTART", "0")
+    monkeypatch.setenv("METRICS_DIR", env.get("METRICS_DIR", os.path.join(tempfile.gettempdir(), "metrics-test")))
+    spec = importlib.util.spec_from_file_location("gunicorn_conf", CONF_PATH)
+    conf = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(conf)
+    return conf
+
+@pytest.fixture
+def server():
+    return MagicMock()
+
+def test_worker_threads_split_the_cores(monkeypatch):
+    monkeypatch.setattr(os, "cpu_count", lambda: 8)
+    conf = load_conf(monkeypatch, WEB_CONCURRENCY="4")
+    assert conf.workers == 4
+    assert conf.torch_threads == 2
+    assert conf.preload_app is True
+
+@patch('utils.summarizer.load_model')
+def test_model_is_loaded_in_master_before_fork(mock_load, monkeypatch, server):
+    conf = load_conf(monkeypatch)
+    monkeypatch.setattr(conf.gc, "freeze", MagicMock())
+
+    conf.when_ready(server)
+
+    mock_load.assert_called_once_with(warmup=False) # Warmup runs in the workers, after fork
+    conf.gc.freeze.assert_called_once()
+
+@patch('utils.summarizer.load_model')
+def test_onnx_backend_loads_in_each_worker(mock_load, monkeypatch, server):
+    conf = load_conf(monkeypatch)
+    monkeypatch.setattr(summarizer, "SUMMARIZER_BACKEND", "onnx")
+    conf.when_ready(server)
+    mock_load.assert_not_called()
+
+@patch('utils.summarizer.load_model')
+def test_no_preload(mock_load, monkeypatch, server):
+    conf = load_conf(monkeypatch, GUNICORN_PRELOAD="0")
+    assert conf.preload_app is False
+    conf.when_ready(server)
+    mock_load.assert_not_called()
+
+@patch('utils.jobs.start_job_workers')
+@patch('utils.summarizer.start_model_warmup')
+@patch('utils.summarizer.warm_up_model')
+@patch('utils.summarizer.model_status')
+def test_post_fork_warms_up_the_inherited_model(mock_status, mock_warm, mock_start, mock_jobs, monkeypatch, server):
+    conf = load_conf(monkeypatch)
+    mock_status.return_value = {"state": "ready"}
+    conf.post_fork(server, MagicMock(pid=123))
+    mock_warm.assert_called_once()
+    mock_start.assert_not_called()
+
+    # Not preloaded (or another backend): the worker loads its own copy in the background
+    mock_status.return_value = {"state": "not_loaded"}
+    conf.post_fork(server, MagicMock(pid=124))
+    mock_start.assert_called_once()
+
+@patch('utils.jobs.start_job_workers')
+def test_failed_warmup_does_not_kill_the_worker(mock_jobs, monkeypatch, server):
+    conf = load_conf(monkeypatch)
+    monkeypatch.setattr(summarizer, "_model_status", {"state": "ready", "error": None, "load_seconds": 1.0, "warmup_seconds": None})
+    monkeypatch.setattr(summarizer, "summarizer_pipeline", MagicMock(side_effect=RuntimeError("CUDA out of memory")))
+
+    conf.post_fork(server, MagicMock(pid=123)) # Does not raise
+
+    assert summarizer.model_status()["state"] == "failed"
+    assert summarizer.get_pipeline() is None
+    assert summarizer.effective_summary_mode("abstractive") == "extractive"
+    mock_jobs.assert_called_once()
+
+@patch('utils.jobs.start_job_workers')
+@patch('utils.summarizer.warm_up_model')
+@patch('utils.summarizer.model_status', return_value={"state": "ready"})
+def test_job_workers_start_after_fork(mock_status, mock_warm, mock_jobs, monkeypatch, server):
+    conf = load_conf(monkeypatch)
+    assert os.environ["JOB_WORKERS_AUTOSTART"] == "0" # Not in the master
+    conf.post_fork(server, MagicMock(pid=123))
+    mock_jobs.assert_called_once()
+
+def test_metrics_dir_defaults_to_a_fresh_directory(monkeypatch):
+    load_conf(monkeypatch, METRICS_DIR="")
+    assert os.path.isdir(os.environ["METRICS_DIR"]) # Shared by the workers forked from here
+    os.rmdir(os.environ["METRICS_DIR"])
+
+@patch('utils.metrics.mark_process_dead')
+def test_exited_worker_gauges_are_dropped(mock_mark_dead, monkeypatch, server):
+    conf = load_conf(monkeypatch)
+    conf.child_exit(server, MagicMock(pid=123))
+    mock_mark_dead.assert_called_once_with(123)
@@ -0,0 +1,137 @@
+import json
+import threading
+import time
+import pytest
+import requests
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+from utils import http_client, metrics
+from utils.http_client import DeadlineExceeded, connection_stats, get_with_retries
+
+# --- Local stand-in for bible-api.com ---
+
+class FakeBibleAPIHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1" # Keep-alive, so connection reuse can be observed
+
+    def do_GET(self):
+        server = self.server
+        server.hits[self.path] = server.hits.get(self.path, 0) + 1
+        if self.path.startswith("/flaky") and server.hits[self.path] <= server.failures:
+            return self._reply(503, {"error": "busy"})
+        if self.path.startswith("/slow"):
+            time.sleep(server.delay)
+        if self.path.startswith("/missing"):
+            return self._reply(404, {"error": "not found"})
+        self._reply(200, {"verses": [{"text": "In the beginning God created the heaven and the earth."}]})
+
+    def _reply(self, status, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass # Keep test output quiet
+
+
+@pytest.fixture
+def fake_api():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeBibleAPIHandler)
+    server.hits = {}
+    server.failures = 0
+    server.delay = 0
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    http_client.reset()
+    yield server, f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+    http_client.reset()
+
+@pytest.fixture
+def no_sleep():
+    with patch('utils.http_client.time.sleep') as mock_sleep:
+        yield mock_sleep
+
+def test_keep_alive_connections_are_reused(fake_api):
+    server, base_url = fake_api
+    for _ in range(3):
+        response = get_with_retries(f"{base_url}/Genesis%201")
+        assert response.status_code == 200
+        assert response.json()["verses"][0]["text"].startswith("In the beginning")
+
+    stats = connection_stats()
+    assert stats["requests"] == 3
+    assert stats["connections_opened"] == 1
+    assert stats["connections_reused"] == 2
+    # Also exported on /metrics
+    text = metrics.render()
+    assert "bible_summarizer_upstream_connections_opened_total 1" in text
+    assert "bible_summarizer_upstream_connections_reused_total 2" in text
+
+def test_retryable_status_is_retried(fake_api, no_sleep):
+    server, base_url = fake_api
+    server.failures = 2
+    response = get_with_retries(f"{base_url}/flaky")
+    assert response.status_code == 200
+    assert server.hits["/flaky"] == 3
+    assert connection_stats()["retries"] == 2
+    assert no_sleep.call_count == 2
+
+def test_retries_are_bounded(fake_api, no_sleep, monkeypatch):
+    server, base_url = fake_api
+    server.failures = 10
+    monkeypatch.setattr(http_client, "UPSTREAM_MAX_RETRIES", 1)
+    response = get_with_retries(f"{base_url}/flaky")
+    assert response.status_code == 503 # Last response is handed back once retries run out
+    assert server.hits["/flaky"] == 2
+
+def test_non_retryable_status_returned_immediately(fake_api, no_sleep):
+    server, base_url = fake_api
+    response = get_with_retries(f"{base_url}/missing")
+    assert response.status_code == 404
+    assert server.hits["/missing"] == 1
+    no_sleep.assert_not_called()
+
+def test_backoff_is_jittered_and_exponential(fake_api, no_sleep, monkeypatch):
+    server, base_url = fake_api
+    server.failures = 2
+    monkeypatch.setattr(http_client, "UPSTREAM_BACKOFF", 0.5)
+    with patch('utils.http_client.random.uniform', return_value=0.01) as mock_uniform:
+        get_with_retries(f"{base_url}/flaky")
+    assert [c.args for c in mock_uniform.call_args_list] == [(0, 0.5), (0, 1.0)]
+
+def test_read_timeout_and_deadline(fake_api, monkeypatch):
+    server, base_url = fake_api
+    server.delay = 1.0
+    monkeypatch.setattr(http_client, "UPSTREAM_BACKOFF", 0.01)
+    started = time.monotonic()
+    with pytest.raises(requests.exceptions.Timeout):
+        get_with_retries(f"{base_url}/slow", deadline=0.3)
+    # Each attempt's read timeout is capped by the remaining budget
+    assert time.monotonic() - started < 0.9
+
+def test_deadline_exceeded_is_a_request_exception(monkeypatch):
+    # app.summarize maps RequestException to a 503, so deadline failures must be one too
+    assert issubclass(DeadlineExceeded, requests.exceptions.RequestException)
+    with pytest.raises(DeadlineExceeded):
+        get_with_retries("http://127.0.0.1:9/unused", deadline=0)
+    assert connection_stats()["deadline_exceeded"] >= 1
+
+def test_connection_error_raised_after_retries(no_sleep, monkeypatch):
+    http_client.reset()
+    monkeypatch.setattr(http_client, "UPSTREAM_MAX_RETRIES", 1)
+    # Nothing listens on the discard port, so every attempt is refused
+    with pytest.raises(requests.exceptions.ConnectionError):
+        get_with_retries("http://127.0.0.1:9/Genesis%201")
+    assert connection_stats()["requests"] == 2
+
+def test_session_is_recreated_after_fork(monkeypatch):
+    http_client.reset()
+    first = http_client.get_session()
+    assert http_client.get_session() is first
+    monkeypatch.setattr(http_client.os, "getpid", lambda: -1) # Pretend we are a forked worker
+    assert http_client.get_session() is not first
+    http_client.reset()
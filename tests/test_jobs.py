@@ -0,0 +1,118 @@
+import pytest
+from unittest.mock import patch
+from utils import jobs, summarizer
+from utils.jobs import JobStore
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    store = JobStore(str(tmp_path / "jobs.sqlite3"))
+    monkeypatch.setattr(jobs, "job_store", store)
+    return store
+
+def fake_verses(book, chapter):
+    return {"text": f"{book} {chapter} text.", "reference": f"{book} {chapter}"}
+
+def fake_summary(text, mode):
+    return f"S[{text}]"
+
+# --- Job store ---
+
+def test_jobs_survive_a_restart(store):
+    job_id = store.create({"book": "Psalms", "chapter": "1-150", "mode": "abstractive"}, total=150)
+
+    job = JobStore(store.path).get(job_id) # A new process opening the same file
+    assert job["state"] == "queued"
+    assert job["params"] == {"book": "Psalms", "chapter": "1-150", "mode": "abstractive"}
+    assert job["progress"] == {"done": 0, "total": 150}
+    assert JobStore(store.path).get("missing") is None
+
+def test_claim_takes_highest_priority_then_oldest(store):
+    first = store.create({}, total=1)
+    urgent = store.create({}, total=1, priority=5)
+    second = store.create({}, total=1)
+
+    assert [store.claim()["id"] for _ in range(3)] == [urgent, first, second]
+    assert store.claim() is None # Running jobs are not claimed twice
+    assert store.counts() == {"queued": 0, "running": 3, "done": 0, "failed": 0}
+
+def test_abandoned_job_is_claimed_again(store, monkeypatch):
+    job_id = store.create({}, total=1)
+    assert store.claim()["attempts"] == 1
+    monkeypatch.setattr(jobs, "JOB_STALE_SECONDS", -1) # Its heartbeat is now too old
+    job = store.claim()
+    assert job["id"] == job_id
+    assert job["attempts"] == 2
+
+def test_prune_keeps_unfinished_jobs(store, monkeypatch):
+    done = store.create({}, total=1)
+    store.finish(done, {"summary": "S"})
+    queued = store.create({}, total=1)
+    monkeypatch.setattr(jobs, "JOB_RETENTION_SECONDS", -1)
+    store.prune()
+    assert store.get(done) is None
+    assert store.get(queued) is not None
+
+# --- Running jobs ---
+
+@patch('utils.jobs.start_job_workers')
+def test_submit_job_queues_and_wakes_the_workers(mock_start, store):
+    job_id = jobs.submit_job("Psalms", "1-3", priority=2)
+    job = store.get(job_id)
+    assert (job["state"], job["priority"], job["progress"]["total"]) == ("queued", 2, 3)
+    mock_start.assert_called_once()
+
+@patch('utils.summarizer.reduce_summaries', side_effect=lambda summaries, first_chapter, mode: "R[" + "|".join(summaries) + "]")
+@patch('utils.summarizer.summarize_text', side_effect=fake_summary)
+@patch('utils.bible.get_bible_verses', side_effect=fake_verses)
+def test_run_job_summarizes_each_chapter_then_the_range(mock_verses, mock_summarize, mock_reduce, store):
+    job_id = store.create({"book": "Psalms", "chapter": "1-3", "mode": "abstractive"}, total=3)
+    jobs.run_job(store.claim())
+
+    job = store.get(job_id)
+    assert job["state"] == "done"
+    assert job["progress"] == {"done": 3, "total": 3}
+    chapters = job["result"]["chapters"]
+    assert [c["summary"] for c in chapters] == ["S[Psalms 1 text.]", "S[Psalms 2 text.]", "S[Psalms 3 text.]"]
+    assert job["result"]["summary"] == "R[" + "|".join(c["summary"] for c in chapters) + "]"
+    mock_reduce.assert_called_once_with([c["summary"] for c in chapters], first_chapter=1, mode="abstractive")
+    assert job["result"]["summary_mode"] == "abstractive"
+
+@patch('utils.summarizer.reduce_summaries', return_value="Range summary.")
+@patch('utils.summarizer.summarize_text', side_effect=fake_summary)
+@patch('utils.bible.get_bible_verses', side_effect=fake_verses)
+def test_run_job_resumes_after_saved_chapters(mock_verses, mock_summarize, mock_reduce, store):
+    job_id = store.create({"book": "Psalms", "chapter": "1-3", "mode": "abstractive"}, total=3)
+    job = store.claim()
+    store.save_progress(job_id, {"chapters": [{"chapter": "1", "reference": "Psalms 1", "summary": "Saved."}]}, 1)
+
+    jobs.run_job({**job, "result": store.get(job_id)["result"]})
+
+    assert [c.args for c in mock_verses.call_args_list] == [("Psalms", "2"), ("Psalms", "3")]
+    assert store.get(job_id)["result"]["chapters"][0]["summary"] == "Saved."
+
+@patch('utils.summarizer.summarize_text', side_effect=fake_summary)
+@patch('utils.bible.get_bible_verses')
+def test_run_job_failure_keeps_progress(mock_verses, mock_summarize, store):
+    mock_verses.side_effect = [fake_verses("Psalms", "1"), {"error": "Upstream error"}]
+    job_id = store.create({"book": "Psalms", "chapter": "1-3", "mode": "abstractive"}, total=3)
+
+    jobs.run_job(store.claim())
+
+    job = store.get(job_id)
+    assert job["state"] == "failed"
+    assert job["error"] == "Upstream error"
+    assert job["progress"]["done"] == 1
+
+@patch('utils.summarizer.summarize_text', return_value="Error: Text summarization service is currently unavailable.")
+@patch('utils.bible.get_bible_verses', side_effect=fake_verses)
+def test_run_job_fails_on_summary_error(mock_verses, mock_summarize, store):
+    job_id = store.create({"book": "John", "chapter": "3", "mode": "abstractive"}, total=1)
+    jobs.run_job(store.claim())
+    assert store.get(job_id)["error"] == "Error: Text summarization service is currently unavailable."
+
+@patch('utils.jobs.time.sleep')
+def test_jobs_wait_for_interactive_requests(mock_sleep, store, monkeypatch):
+    depths = iter([3, 1, 0])
+    monkeypatch.setattr(summarizer.summary_scheduler, "queue_depth", lambda: next(depths))
+    jobs._yield_to_interactive(store.create({}, total=1))
+    assert mock_sleep.call_count == 2 # Until the model queue is empty
@@ -0,0 +1,119 @@
+import json
+import pytest
+from utils import metrics
+
+@pytest.fixture(autouse=True)
+def fresh_metrics(monkeypatch):
+    metrics.reset()
+    monkeypatch.setattr(metrics, "METRICS_DIR", "")
+    monkeypatch.setattr(metrics, "_collectors", [])
+    yield
+    metrics.reset()
+
+def sample_lines(text, name):
+    return [line for line in text.splitlines() if line.startswith(metrics.PREFIX + name)]
+
+def test_counters_and_gauges():
+    metrics.inc("requests_total", endpoint="/summarize", status="200")
+    metrics.inc("requests_total", endpoint="/summarize", status="200")
+    metrics.inc("requests_total", endpoint="/summarize", status="404")
+    metrics.add_gauge("in_flight_requests", 1)
+
+    text = metrics.render()
+
+    assert "# TYPE bible_summarizer_requests_total counter" in text
+    assert sample_lines(text, "requests_total") == [
+        'bible_summarizer_requests_total{endpoint="/summarize",status="200"} 2',
+        'bible_summarizer_requests_total{endpoint="/summarize",status="404"} 1',
+    ]
+    assert sample_lines(text, "in_flight_requests") == ["bible_summarizer_in_flight_requests 1"]
+    # Gauges are always exposed, unused counters are not
+    assert sample_lines(text, "model_queue_depth") == ["bible_summarizer_model_queue_depth 0"]
+    assert sample_lines(text, "upstream_responses_total") == []
+
+def test_histogram_buckets_are_cumulative():
+    metrics.observe("stage_duration_seconds", 0.003, stage="fetch")
+    metrics.observe("stage_duration_seconds", 0.2, stage="fetch")
+    metrics.observe("stage_duration_seconds", 100, stage="fetch")
+
+    lines = sample_lines(metrics.render(), "stage_duration_seconds")
+
+    assert 'bible_summarizer_stage_duration_seconds_bucket{stage="fetch",le="0.001"} 0' in lines
+    assert 'bible_summarizer_stage_duration_seconds_bucket{stage="fetch",le="0.005"} 1' in lines
+    assert 'bible_summarizer_stage_duration_seconds_bucket{stage="fetch",le="0.25"} 2' in lines
+    assert 'bible_summarizer_stage_duration_seconds_bucket{stage="fetch",le="60"} 2' in lines
+    assert 'bible_summarizer_stage_duration_seconds_bucket{stage="fetch",le="+Inf"} 3' in lines
+    assert 'bible_summarizer_stage_duration_seconds_count{stage="fetch"} 3' in lines
+    assert 'bible_summarizer_stage_duration_seconds_sum{stage="fetch"} 100.203' in lines
+
+def test_timed_observes_failures_too():
+    with pytest.raises(ValueError):
+        with metrics.timed("stage_duration_seconds", stage="generate"):
+            raise ValueError("Model failed")
+    assert 'bible_summarizer_stage_duration_seconds_count{stage="generate"} 1' in metrics.render()
+
+def test_collectors_are_read_at_scrape_time():
+    depth = {"value": 3}
+    metrics.register_collector(lambda: [("model_queue_depth", {}, depth["value"])])
+    metrics.register_collector(lambda: metrics.cache_samples("verses", {"memory_hits": 5, "disk_hits": 1, "misses": 2}))
+    def broken():
+        raise RuntimeError("Collector failed")
+    metrics.register_collector(broken)
+
+    assert "bible_summarizer_model_queue_depth 3" in metrics.render()
+    depth["value"] = 0
+    text = metrics.render()
+    assert "bible_summarizer_model_queue_depth 0" in text
+    assert 'bible_summarizer_cache_lookups_total{cache="verses",result="memory_hit"} 5' in text
+
+def test_collected_histograms_use_their_own_buckets():
+    counts = {"1": 2, "2": 0, "4": 1, "8": 0, "16": 0, "32": 0, "64": 0, "+Inf": 1}
+    metrics.register_collector(lambda: [metrics.histogram_sample("model_batch_size", counts, 101)])
+
+    lines = sample_lines(metrics.render(), "model_batch_size")
+
+    assert 'bible_summarizer_model_batch_size_bucket{le="1"} 2' in lines
+    assert 'bible_summarizer_model_batch_size_bucket{le="4"} 3' in lines
+    assert 'bible_summarizer_model_batch_size_bucket{le="64"} 3' in lines
+    assert 'bible_summarizer_model_batch_size_bucket{le="+Inf"} 4' in lines
+    assert 'bible_summarizer_model_batch_size_count 4' in lines
+    assert 'bible_summarizer_model_batch_size_sum 101' in lines
+
+def test_label_values_are_escaped():
+    metrics.inc("requests_total", endpoint='/a"b\\c\nd', status="200")
+    assert 'endpoint="/a\\"b\\\\c\\nd"' in metrics.render()
+
+def test_processes_are_added_up_through_the_directory(tmp_path, monkeypatch):
+    monkeypatch.setattr(metrics, "METRICS_DIR", str(tmp_path))
+    other_worker = {
+        "pid": 1,
+        "counters": [["requests_total", {"endpoint": "/summarize", "status": "200"}, 4]],
+        "gauges": [["in_flight_requests", {}, 2]],
+        "histograms": [["stage_duration_seconds", {"stage": "fetch"}, [1] + [0] * len(metrics.LATENCY_BUCKETS) + [0.001]]],
+    }
+    (tmp_path / "1.json").write_text(json.dumps(other_worker))
+    metrics.inc("requests_total", endpoint="/summarize", status="200")
+    metrics.add_gauge("in_flight_requests", 1)
+    metrics.observe("stage_duration_seconds", 0.001, stage="fetch")
+
+    text = metrics.render()
+    assert 'bible_summarizer_requests_total{endpoint="/summarize",status="200"} 5' in text
+    assert "bible_summarizer_in_flight_requests 3" in text
+    assert 'bible_summarizer_stage_duration_seconds_count{stage="fetch"} 2' in text
+
+    # An exited worker still counts towards totals, but no longer towards gauges
+    metrics.mark_process_dead(1)
+    text = metrics.render()
+    assert 'bible_summarizer_requests_total{endpoint="/summarize",status="200"} 5' in text
+    assert "bible_summarizer_in_flight_requests 1" in text
+
+def test_flush_writes_this_process(tmp_path, monkeypatch):
+    monkeypatch.setattr(metrics, "METRICS_DIR", str(tmp_path))
+    metrics.inc("requests_total", endpoint="/healthz", status="200")
+    metrics.flush()
+
+    files = list(tmp_path.glob("*.json"))
+    assert len(files) == 1
+    assert json.loads(files[0].read_text())["counters"] == [["requests_total", {"endpoint": "/healthz", "status": "200"}, 1]]
+    metrics.clear_dir()
+    assert list(tmp_path.glob("*.json")) == []
@@ -0,0 +1,52 @@
+import difflib
+import os
+import pytest
+
+# Parity of the ONNX engines with the PyTorch pipeline. Needs the optional dependencies and the model
+# weights (downloaded and exported on first run), so it is skipped wherever those are unavailable.
+pytest.importorskip("torch")
+pytest.importorskip("onnxruntime")
+pytest.importorskip("optimum.onnxruntime")
+
+from utils import summarizer
+from utils.onnx_backend import model_dir
+
+PASSAGES = [
+    "In the beginning God created the heaven and the earth. And the earth was without form, and void; "
+    "and darkness was upon the face of the deep. And the Spirit of God moved upon the face of the waters. "
+    "And God said, Let there be light: and there was light. And God saw the light, that it was good: "
+    "and God divided the light from the darkness.",
+    "Now there was a man of the Pharisees, named Nicodemus, a ruler of the Jews: The same came to Jesus by night, "
+    "and said unto him, Rabbi, we know that thou art a teacher come from God: for no man can do these miracles "
+    "that thou doest, except God be with him. Jesus answered and said unto him, Verily, verily, I say unto thee, "
+    "Except a man be born again, he cannot see the kingdom of God.",
+]
+
+def generate(pipe, texts):
+    outputs = pipe(texts, max_length=summarizer.SUMMARY_MAX_LENGTH, min_length=summarizer.SUMMARY_MIN_LENGTH, do_sample=False, truncation=True)
+    return [output["summary_text"] for output in outputs]
+
+def similarity(a, b):
+    return difflib.SequenceMatcher(None, a.split(), b.split()).ratio()
+
+@pytest.fixture(scope="module")
+def reference_summaries():
+    try:
+        return generate(summarizer.build_pipeline("pytorch"), PASSAGES)
+    except OSError as e:
+        pytest.skip(f"Model weights unavailable: {e}")
+
+@pytest.mark.parametrize("backend, min_similarity", [("onnx", 0.95), ("onnx-int8", 0.6)])
+def test_onnx_matches_pytorch(backend, min_similarity, reference_summaries):
+    summaries = generate(summarizer.build_pipeline(backend), PASSAGES)
+    for summary, reference in zip(summaries, reference_summaries):
+        assert summary
+        assert similarity(summary, reference) >= min_similarity, (summary, reference)
+
+def test_export_is_reused(reference_summaries):
+    summarizer.build_pipeline("onnx")
+    directory = model_dir(summarizer.MODEL_NAME)
+    before = {name: os.path.getmtime(os.path.join(directory, name)) for name in os.listdir(directory)}
+    summarizer.build_pipeline("onnx")
+    after = {name: os.path.getmtime(os.path.join(directory, name)) for name in os.listdir(directory)}
+    assert before == after # Loaded from disk, not exported again
@@ -0,0 +1,116 @@
+import json
+import sqlite3
+import pytest
+from unittest.mock import patch
+from utils import precompute
+from utils.precompute import get_precomputed, pending_chapters, run
+
+FINGERPRINT = "fingerprint-v1"
+
+@pytest.fixture(autouse=True)
+def fixed_fingerprint():
+    with patch('utils.summarizer.summary_fingerprint', return_value=FINGERPRINT) as mock_fingerprint:
+        yield mock_fingerprint
+
+@pytest.fixture
+def artifact_path(tmp_path, monkeypatch):
+    path = str(tmp_path / "precomputed.sqlite3")
+    monkeypatch.setattr(precompute, "PRECOMPUTED_PATH", path)
+    monkeypatch.setattr(precompute, "_missing_since", None)
+    monkeypatch.setattr(precompute, "_local", type(precompute._local)())
+    return path
+
+class InProcessPool:
+    """Stands in for multiprocessing.Pool so the job runs without spawning model-loading workers."""
+    def __init__(self, processes, initializer=None, initargs=()):
+        self.processes = processes
+    def __enter__(self):
+        return self
+    def __exit__(self, *exc):
+        return False
+    def imap_unordered(self, func, tasks):
+        return map(func, tasks)
+
+class InProcessContext:
+    Pool = InProcessPool
+
+def fake_process_chapter(task):
+    book_id, chapter = task
+    if (book_id, chapter) == ("RUT", 3):
+        return {"book_id": book_id, "chapter": chapter, "error": "fetch failed: boom"}
+    return {
+        "book_id": book_id, "chapter": chapter, "reference": f"{book_id} {chapter}",
+        "verses": f"Verses of {book_id} {chapter}", "summary": f"Summary of {book_id} {chapter}",
+        "proof": json.dumps("A proof"), "fingerprint": FINGERPRINT,
+    }
+
+@pytest.fixture
+def in_process_job(monkeypatch):
+    monkeypatch.setattr(precompute.multiprocessing, "get_context", lambda method: InProcessContext)
+    monkeypatch.setattr(precompute, "_process_chapter", fake_process_chapter)
+
+def test_run_writes_every_chapter_and_reports_throughput(artifact_path, in_process_job):
+    stats = run(artifact_path, workers=2, book_ids=["RUT", "JUD"])
+
+    assert stats["computed"] == 4 # Ruth 1, 2, 4 and Jude 1
+    assert stats["failed"] == 1
+    assert stats["chapters_per_minute"] > 0
+    rows = sqlite3.connect(artifact_path).execute("SELECT book_id, chapter FROM summaries ORDER BY book_id, chapter").fetchall()
+    assert rows == [("JUD", 1), ("RUT", 1), ("RUT", 2), ("RUT", 4)]
+
+def test_run_is_incremental(artifact_path, in_process_job, fixed_fingerprint):
+    run(artifact_path, workers=1, book_ids=["JUD"])
+    assert run(artifact_path, workers=1, book_ids=["JUD"])["computed"] == 0 # Already up to date
+
+    # A new model or parameter set changes the fingerprint and makes every entry stale
+    fixed_fingerprint.return_value = "fingerprint-v2"
+    conn = sqlite3.connect(artifact_path)
+    assert pending_chapters(conn, "fingerprint-v2", ["JUD"]) == [("JUD", 1)]
+    assert pending_chapters(conn, FINGERPRINT, ["JUD"]) == []
+    assert pending_chapters(conn, FINGERPRINT, ["JUD"], force=True) == [("JUD", 1)]
+
+def test_pending_covers_whole_canon(tmp_path):
+    conn = sqlite3.connect(str(tmp_path / "empty.sqlite3"))
+    conn.execute(precompute._SCHEMA)
+    assert len(pending_chapters(conn, FINGERPRINT)) == 1189
+
+def test_get_precomputed(artifact_path, in_process_job):
+    run(artifact_path, workers=1, book_ids=["RUT"])
+
+    entry = get_precomputed("ruth", 2)
+    assert entry == {"reference": "RUT 2", "verses": "Verses of RUT 2", "summary": "Summary of RUT 2", "proof": "A proof"}
+    assert get_precomputed("Ruth", "3") is None # Failed chapter
+    assert get_precomputed("Ruth", "1-2") is None # Ranges are never precomputed
+    assert get_precomputed("NotABook", "1") is None
+
+def test_get_precomputed_ignores_stale_fingerprint(artifact_path, in_process_job, fixed_fingerprint):
+    run(artifact_path, workers=1, book_ids=["JUD"])
+    fixed_fingerprint.return_value = "fingerprint-v2"
+    assert get_precomputed("Jude", "1") is None
+
+def test_get_precomputed_without_artifact(artifact_path):
+    assert get_precomputed("Ruth", "1") is None
+    with patch('utils.precompute.os.path.exists') as mock_exists:
+        assert get_precomputed("Ruth", "1") is None # Missing file is not re-checked on every request
+    mock_exists.assert_not_called()
+
+@patch('utils.summarizer.summarize_text', return_value="A summary.")
+@patch('utils.bible.get_bible_verses', return_value={"text": "Verse text."})
+@patch('utils.archaeology.get_archeological_proof', return_value=["Proof A"])
+def test_process_chapter(mock_proof, mock_verses, mock_summarize):
+    result = precompute._process_chapter(("1KI", 9))
+    assert result["reference"] == "1 Kings 9"
+    assert result["summary"] == "A summary."
+    assert json.loads(result["proof"]) == ["Proof A"]
+    assert result["fingerprint"] == FINGERPRINT
+    mock_verses.assert_called_once_with("1 Kings", "9")
+
+@patch('utils.summarizer.summarize_text', return_value="Error: Could not summarize text due to an internal issue.")
+@patch('utils.bible.get_bible_verses', return_value={"text": "Verse text."})
+def test_process_chapter_summary_error(mock_verses, mock_summarize):
+    assert "error" in precompute._process_chapter(("RUT", 1))
+
+def test_main_rejects_unknown_books(capsys):
+    with pytest.raises(SystemExit):
+        precompute.main(["--books", "Hezekiah"])
+    assert "Unknown book(s): Hezekiah" in capsys.readouterr().err
@@ -0,0 +1,57 @@
+import time
+from concurrent.futures import Future
+from utils import metrics, profiling, summarizer
+from utils.batching import BatchScheduler
+
+def test_record_is_a_no_op_without_a_profile():
+    profiling.record("fetch", 0.1)
+    assert profiling.current() is None
+
+def test_server_timing_numbers_repeated_stages():
+    token = profiling.start("timing")
+    try:
+        with metrics.timed("stage_duration_seconds", stage="fetch"):
+            pass
+        profiling.record("generate", 0.25, "chunk 1 of 2 - batch of 2 - queued 1.0 ms")
+        profiling.record("generate", 0.5, "chunk 2 of 2 - batch of 2 - queued 1.0 ms")
+        header = profiling.server_timing(profiling.current())
+    finally:
+        profiling.stop(token)
+
+    entries = header.split(", ")
+    assert entries[0].startswith("fetch;dur=")
+    assert entries[1] == 'generate-1;dur=250.0;desc="chunk 1 of 2 - batch of 2 - queued 1.0 ms"'
+    assert entries[2] == 'generate-2;dur=500.0;desc="chunk 2 of 2 - batch of 2 - queued 1.0 ms"'
+    assert entries[3].startswith("total;dur=")
+    assert profiling.current() is None
+
+def test_requested_mode(monkeypatch):
+    assert profiling.requested_mode("1") is None # PROFILING_ENABLED is off by default
+    monkeypatch.setattr(profiling, "PROFILING_ENABLED", True)
+    assert profiling.requested_mode("1") == "timing"
+    assert profiling.requested_mode("cprofile") == "cprofile"
+    assert profiling.requested_mode("flamegraph") is None
+    assert profiling.requested_mode(None) is None
+
+def test_batch_futures_report_queue_and_run_time():
+    def run(items):
+        time.sleep(0.02)
+        return items
+    futures = BatchScheduler("test", run, max_wait_ms=0).submit_many([1, 2])
+    assert [f.result(timeout=5) for f in futures] == [1, 2]
+    assert futures[0].batch_size == 2
+    assert futures[0].run_seconds >= 0.02
+    assert futures[0].queued_seconds >= 0
+
+def test_each_model_call_is_a_stage():
+    future = Future()
+    future.set_result("Summary.")
+    future.run_seconds, future.queued_seconds, future.batch_size = 0.3, 0.002, 4
+
+    token = profiling.start("timing")
+    try:
+        assert summarizer._model_result(future, "chunk 2 of 3") == "Summary."
+        stages = profiling.current().stages
+    finally:
+        profiling.stop(token)
+    assert stages == [("generate", 0.3, "chunk 2 of 3 - batch of 4 - queued 2.0 ms")]
@@ -0,0 +1,52 @@
+import json
+import pytest
+from utils import metrics, request_log
+
+@pytest.fixture
+def log_path(tmp_path, monkeypatch):
+    path = tmp_path / "requests.jsonl"
+    monkeypatch.setattr(request_log, "REQUEST_LOG_PATH", str(path))
+    return path
+
+def test_records_are_appended_as_json_lines(log_path):
+    request_log.log_request("John", 3, "abstractive", 1700000000.1234, 0.25, 200, "miss")
+    request_log.log_request("Psalms", "1-3", "extractive", 1700000001.0, 0.01, 200, "uncached")
+    request_log.flush()
+
+    lines = [json.loads(line) for line in log_path.read_text().splitlines()]
+    assert lines == [
+        {"book": "John", "chapter": "3", "mode": "abstractive", "timestamp": 1700000000.123, "latency_ms": 250.0, "status": 200, "cache_status": "miss"},
+        {"book": "Psalms", "chapter": "1-3", "mode": "extractive", "timestamp": 1700000001.0, "latency_ms": 10.0, "status": 200, "cache_status": "uncached"},
+    ]
+
+def test_full_queue_drops_instead_of_blocking(log_path, monkeypatch):
+    metrics.reset()
+    full = request_log.queue.Queue(maxsize=1)
+    full.put({})
+    monkeypatch.setattr(request_log, "_writer", lambda: full)
+
+    request_log.log_request("John", 3, "abstractive", 0, 0.1, 200, "miss")
+
+    assert "bible_summarizer_request_log_dropped_total 1" in metrics.render()
+
+def test_sampling(monkeypatch):
+    monkeypatch.setattr(request_log, "REQUEST_LOG_SAMPLE_RATE", 0)
+    assert not request_log.sampled()
+    monkeypatch.setattr(request_log, "REQUEST_LOG_SAMPLE_RATE", 1)
+    assert request_log.sampled()
+
+def test_cache_status_is_the_least_cached_summary_lookup():
+    assert request_log.cache_status([("verses", "miss"), ("summaries", "memory_hit")]) == "memory_hit"
+    assert request_log.cache_status([("summaries", "memory_hit"), ("summaries", "disk_hit")]) == "disk_hit"
+    assert request_log.cache_status([("summaries", "memory_hit"), ("summaries", "miss")]) == "miss"
+    assert request_log.cache_status([("verses", "miss")]) == "uncached"
+
+def test_read_requests_sorts_and_skips_bad_lines(tmp_path):
+    path = tmp_path / "capture.jsonl"
+    path.write_text(
+        '{"book": "John", "chapter": "3", "timestamp": 2}\n'
+        'not json\n'
+        '{"book": "Genesis"}\n'
+        '{"book": "Ruth", "chapter": "1", "timestamp": 1}\n'
+    )
+    assert [r["book"] for r in request_log.read_requests(str(path))] == ["Ruth", "John"]
@@ -0,0 +1,88 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from utils import metrics
+from utils.singleflight import SingleFlight
+
+def slow(calls, result="done", delay=0.2, error=None):
+    def function(*args):
+        calls.append(args)
+        time.sleep(delay)
+        if error:
+            raise error
+        return result
+    return function
+
+def test_concurrent_calls_share_one_run():
+    metrics.reset()
+    group, calls = SingleFlight("fetch"), []
+    with ThreadPoolExecutor(max_workers=5) as pool:
+        results = list(pool.map(lambda _: group.do("kjv:JHN:3", slow(calls), "John 3"), range(5)))
+
+    assert results == ["done"] * 5
+    assert calls == [("John 3",)]
+    assert 'bible_summarizer_singleflight_coalesced_total{call="fetch"} 4' in metrics.render()
+    assert group.in_flight() == 0
+
+def test_followers_get_the_leaders_exception():
+    group, calls = SingleFlight("fetch"), []
+    error = ConnectionError("Upstream down")
+    outcomes = []
+
+    def call(_):
+        try:
+            group.do("key", slow(calls, error=error))
+        except ConnectionError as e:
+            outcomes.append(e)
+
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        list(pool.map(call, range(3)))
+
+    assert len(calls) == 1
+    assert outcomes == [error] * 3
+
+def test_key_is_released_when_the_leader_finishes():
+    group, calls = SingleFlight("summarize"), []
+    group.do("key", slow(calls, delay=0))
+    group.do("key", slow(calls, delay=0))
+    # Nothing was in flight the second time, so it ran again (callers check their cache first)
+    assert len(calls) == 2
+
+def test_different_keys_run_independently():
+    group, calls = SingleFlight("fetch"), []
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        list(pool.map(lambda key: group.do(key, slow(calls), key), ["a", "b"]))
+    assert sorted(calls) == [("a",), ("b",)]
+
+def test_async_and_thread_callers_share_a_run():
+    group, calls = SingleFlight("fetch"), []
+    leader_started = threading.Event()
+
+    async def fetch():
+        calls.append("async")
+        leader_started.set()
+        await asyncio.sleep(0.2)
+        return "done"
+
+    async def run():
+        loop = asyncio.get_running_loop()
+        leader = asyncio.ensure_future(group.do_async("key", fetch))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(group.do_async("key", fetch))
+        # A request thread (e.g. one passed to the Flask app) joining the same flight
+        thread = loop.run_in_executor(None, group.do, "key", slow(calls))
+        return await asyncio.gather(leader, follower, thread)
+
+    assert asyncio.run(run()) == ["done"] * 3
+    assert calls == ["async"]
+
+def test_claim_and_finish_for_batched_callers():
+    group = SingleFlight("summarize")
+    future, leader = group.claim("key")
+    follower, is_leader = group.claim("key")
+    assert (leader, is_leader, follower is future) == (True, False, True)
+
+    group.finish("key", future, "summary")
+    assert follower.result(timeout=1) == "summary"
+    assert group.claim("key")[1] # Released
@@ -1,7 +1,22 @@
+from concurrent.futures import ThreadPoolExecutor
+import subprocess
+import sys
+import threading
+import types
 import pytest
 from unittest.mock import patch, MagicMock
+from utils import summarizer
+from utils.cache import LRUCache, SQLiteStore, TwoTierCache
 from utils.summarizer import summarize_text, MODEL_MAX_INPUT_LENGTH, SUMMARY_MAX_LENGTH, SUMMARY_MIN_LENGTH
 
+# Give every test a fresh, memory-only summary cache so results never leak between tests
+# and the shared on-disk cache is never touched.
+@pytest.fixture(autouse=True)
+def fresh_summary_cache(monkeypatch):
+    cache = TwoTierCache("summaries", LRUCache(max_bytes=1024 * 1024))
+    monkeypatch.setattr(summarizer, "summary_cache", cache)
+    return cache
+
 # Mock the Hugging Face pipeline
 @pytest.fixture(scope="module") # Use module scope if pipeline loading is expensive
 def mock_summarizer_pipeline():
@@ -9,15 +24,35 @@ def mock_summarizer_pipeline():
     # This mock will be used by the @patch decorator in tests
     mock_pipeline_instance = MagicMock()
     
-    def side_effect_func(text, max_length, min_length, do_sample, truncation):
+    def side_effect_func(text, max_length, min_length, do_sample, truncation, batch_size=None):
         # Simple mock: return a fixed summary or part of the input
         # Ensure the output format matches what the summarizer pipeline returns (a list of dicts)
         # Forcing a slightly different output to differentiate from input
-        return [{'summary_text': f"Summary of: {text[:max_length-15]}"}]
+        # A list of texts (batched call) gets one summary per text, like the real pipeline
+        texts = text if isinstance(text, list) else [text]
+        return [{'summary_text': f"Summary of: {t[:max_length-15]}"} for t in texts]
 
     mock_pipeline_instance.side_effect = side_effect_func
     return mock_pipeline_instance
 
+@pytest.fixture
+def fresh_model_state(monkeypatch):
+    """A model loader that has not loaded anything yet."""
+    status = {"state": "not_loaded", "error": None, "load_seconds": None, "warmup_seconds": None}
+    monkeypatch.setattr(summarizer, "_model_status", status)
+    monkeypatch.setattr(summarizer, "_model_done", threading.Event())
+    monkeypatch.setattr(summarizer, "_warmup_thread", None)
+    monkeypatch.setattr(summarizer, "summarizer_pipeline", None)
+    return status
+
+@pytest.fixture
+def fake_transformers():
+    """Replaces the transformers package so load_model builds a mock pipeline."""
+    module = types.ModuleType("transformers")
+    module.pipeline = MagicMock(return_value=MagicMock(return_value=[{'summary_text': "Warm."}]))
+    with patch.dict(sys.modules, {"transformers": module}):
+        yield module
+
 @patch('utils.summarizer.summarizer_pipeline') # Patch the loaded pipeline instance
 def test_summarize_short_text(mock_pipeline_instance_func, mock_summarizer_pipeline):
     # Configure the mock_pipeline_instance_func (the one patched in utils.summarizer)
@@ -39,82 +74,99 @@ def test_summarize_short_text(mock_pipeline_instance_func, mock_summarizer_pipel
         truncation=True
     )
 
+class WordTokenizer:
+    """Stand-in for the model tokenizer: one token per whitespace-separated word."""
+    def encode(self, text, add_special_tokens=True):
+        return text.split()
+
+def verse(n_words, tag="w"):
+    return " ".join(f"{tag}{i}" for i in range(n_words)) + "."
+
 @patch('utils.summarizer.summarizer_pipeline')
 def test_summarize_long_text_chunking(mock_pipeline_instance_func, mock_summarizer_pipeline):
     mock_pipeline_instance_func.side_effect = mock_summarizer_pipeline.side_effect
+    mock_pipeline_instance_func.tokenizer = WordTokenizer()
 
-    # Create text longer than MODEL_MAX_INPUT_LENGTH
-    # MODEL_MAX_INPUT_LENGTH is 1024. SUMMARY_MAX_LENGTH is 150.
-    # num_chunks = (text_len // (MODEL_MAX_INPUT_LENGTH - SUMMARY_MAX_LENGTH)) + 1
-    # If text_len is 1200, num_chunks = (1200 // (1024 - 150)) + 1 = (1200 // 874) + 1 = 1 + 1 = 2
-    long_text_part = "This is a segment of a very long text. " * 30 # Approx 30*38 = 1140 chars
-    long_text = long_text_part * 2 # Approx 2280 chars to ensure multiple chunks and potential recursive summary
-
-    # Expected number of calls depends on the chunking logic in summarize_text
-    # Current logic:
-    # text_len = 2280
-    # num_chunks = (2280 // (1024 - 150)) + 1 = (2280 // 874) + 1 = 2 + 1 = 3
-    # chunk_size = 2280 // 3 = 760
-    # So, 3 chunks.
-    # If combined summary is long, one more call for recursive summarization.
-    # Let's assume the combined summary of 3 chunks will be long enough for a recursive call.
-
+    # Three 600-token verses: budget is 1024 - 2 special tokens, so each verse gets its own chunk
+    long_text = "\n".join(verse(600, tag=t) for t in "abc")
     summary = summarize_text(long_text)
 
-    assert "Summary of:" in summary # Check if summarization happened
-
-    # Expect 3 calls for chunks + 1 call for the combined summary if it's too long.
-    # The mock_summarizer_pipeline returns "Summary of: {chunk_text}"
-    # Chunk summary max length for 3 chunks: max(40, 150 // 3) = max(40, 50) = 50
-    # Each chunk summary: "Summary of: {text_of_length_approx_50-15}" -> length approx 13 + 35 = 48
-    # Combined summary of 3 chunks: approx 3 * 48 = 144 chars.
-    # This is less than SUMMARY_MAX_LENGTH * 1.5 (150 * 1.5 = 225).
-    # So, it seems it might NOT trigger the recursive summarization in this specific case.
-    # Let's re-evaluate:
-    # If each chunk summary is "Summary of: This is a segment of a very long text. This is a segme" (length 50)
-    # Combined: 3 * 50 = 150. This is NOT > 150 * 1.5. So, 3 calls.
-
-    # Let's make the text even longer to ensure recursive summarization
-    very_long_text = long_text_part * 3 # Approx 3420 chars
-    # text_len = 3420
-    # num_chunks = (3420 // 874) + 1 = 3 + 1 = 4
-    # chunk_size = 3420 // 4 = 855
-    # 4 chunks. Each summary approx 50 chars. Combined 200 chars.
-    # 200 > 150 * 1.5 (225) is FALSE. Still no recursive.
-    # The issue is `chunk_summary_max_length` for each chunk is `max(SUMMARY_MIN_LENGTH, SUMMARY_MAX_LENGTH // len(chunks))`
-    # For 4 chunks: max(40, 150 // 4) = max(40, 37) = 40.
-    # Each chunk summary length is 40. "Summary of: {text_of_length_40-15=25}". Total length approx 13 + 25 = 38.
-    # Combined summary of 4 chunks: 4 * 38 = 152.
-    # 152 > 225 is FALSE.
-
-    # Let's simplify: assume the chunking leads to N calls, and then potentially one more.
-    # For the `long_text` (2280 chars, 3 chunks):
-    # chunk_summary_max_length = max(40, 150 // 3) = 50.
-    # Each summary is "Summary of: {chunk_text[:35]}". Length is 13 + 35 = 48.
-    # Combined: 3 * 48 = 144. Not > 225. So 3 calls are expected.
-
-    summary_long = summarize_text(long_text) # Should make 3 calls
-    assert mock_pipeline_instance_func.call_count == 3 
-
-    # To test recursive, we need the sum of chunk summaries to exceed SUMMARY_MAX_LENGTH * 1.5 = 225
-    # Let's use 6 chunks. chunk_summary_max_length = max(40, 150/6) = max(40, 25) = 40
-    # Each summary length ~38. Combined 6 * 38 = 228. This IS > 225.
-    # So, 6 chunk calls + 1 final call = 7 calls.
-    mock_pipeline_instance_func.reset_mock() # Reset call count
-    super_long_text = long_text_part * 5 # Approx 5700 chars
-    # text_len = 5700
-    # num_chunks = (5700 // 874) + 1 = 6 + 1 = 7
-    # chunk_size = 5700 // 7 = 814
-    # 7 chunks. chunk_summary_max_length = max(40, 150 // 7) = max(40, 21) = 40.
-    # Each summary length ~38. Combined 7 * 38 = 266. This IS > 225.
-    # So, 7 chunk calls + 1 final call = 8 calls.
-
-    summary_super_long = summarize_text(super_long_text)
-    assert mock_pipeline_instance_func.call_count == (7 + 1)
+    assert "Summary of:" in summary
+    # All chunks go through the model in one batched call; chunk summaries are short so no second pass
+    mock_pipeline_instance_func.assert_called_once()
+    args, kwargs = mock_pipeline_instance_func.call_args
+    assert args[0] == long_text.split("\n") # Verses are never cut in half
+    assert kwargs.get('batch_size') == summarizer.SUMMARY_BATCH_SIZE
+    assert kwargs.get('max_length') == max(SUMMARY_MIN_LENGTH, SUMMARY_MAX_LENGTH // 3)
+    assert kwargs.get('min_length') == max(10, SUMMARY_MIN_LENGTH // 3)
+    # Summaries are joined in reading order
+    assert summary.index("a0") < summary.index("b0") < summary.index("c0")
+
+    # Same text again is a cache hit
+    summarize_text(long_text)
+    mock_pipeline_instance_func.assert_called_once()
+
+@patch('utils.summarizer.summarizer_pipeline')
+def test_summarize_long_text_second_pass(mock_pipeline_instance_func):
+    # Each summary is as long as allowed, so seven chunk summaries exceed SUMMARY_MAX_LENGTH tokens
+    mock_pipeline_instance_func.side_effect = lambda text, max_length, min_length, do_sample, truncation, batch_size=None: [
+        {'summary_text': " ".join(["word"] * max_length)} for _ in (text if isinstance(text, list) else [text])
+    ]
+    mock_pipeline_instance_func.tokenizer = WordTokenizer()
+
+    summarize_text("\n".join(verse(1000, tag=str(i)) for i in range(7)))
+
+    assert mock_pipeline_instance_func.call_count == 1 + 1 # One batched call for the chunks, then the second pass
+    assert len(mock_pipeline_instance_func.call_args_list[0].args[0]) == 7
+    last_call = mock_pipeline_instance_func.call_args_list[-1]
+    assert last_call.kwargs.get('max_length') == SUMMARY_MAX_LENGTH # Should use the main summary lengths
+    assert last_call.kwargs.get('min_length') == SUMMARY_MIN_LENGTH
+    assert last_call.args[0].split() == ["word"] * (40 * 7) # The combined chunk summaries
+
+@patch('utils.summarizer.summarizer_pipeline')
+def test_stream_reports_each_chunk_then_the_summary(mock_pipeline_instance_func, mock_summarizer_pipeline):
+    mock_pipeline_instance_func.side_effect = mock_summarizer_pipeline.side_effect
+    mock_pipeline_instance_func.tokenizer = WordTokenizer()
+    long_text = "\n".join(verse(600, tag=t) for t in "abc")
+
+    events = list(summarizer.summarize_text_stream(long_text))
 
+    assert [e["event"] for e in events] == ["chunk", "chunk", "chunk", "summary"]
+    assert [(e["index"], e["total"]) for e in events[:3]] == [(0, 3), (1, 3), (2, 3)]
+    assert events[0]["summary"].startswith("Summary of: a0")
+    # The final summary is what summarize_text returns, and it is cached like one
+    assert events[-1]["summary"] == summarize_text(long_text)
+    mock_pipeline_instance_func.assert_called_once()
+
+@patch('utils.summarizer.summarizer_pipeline')
+def test_stream_of_cached_or_short_text_is_just_the_summary(mock_pipeline_instance_func, mock_summarizer_pipeline):
+    mock_pipeline_instance_func.side_effect = mock_summarizer_pipeline.side_effect
+    events = list(summarizer.summarize_text_stream("A short text."))
+    assert events == [{"event": "summary", "summary": "Summary of: A short text."}]
+    assert list(summarizer.summarize_text_stream("A short text.")) == events # Cache hit
+    mock_pipeline_instance_func.assert_called_once()
+
+@patch('utils.summarizer.summarizer_pipeline')
+def test_stream_ends_with_error_event(mock_pipeline_instance_func):
+    mock_pipeline_instance_func.side_effect = Exception("Model failed")
+    events = list(summarizer.summarize_text_stream("Some text that will cause an error."))
+    assert events == [{"event": "error", "error": "Error: Could not summarize text due to an internal issue."}]
+
+@patch('utils.summarizer.summarizer_pipeline')
+def test_typical_chapter_is_a_single_pass(mock_pipeline_instance_func, mock_summarizer_pipeline):
+    # ~4,000 characters used to be split into 5 chunks by the character heuristic;
+    # at ~800 tokens it fits the model in one pass
+    mock_pipeline_instance_func.side_effect = mock_summarizer_pipeline.side_effect
+    mock_pipeline_instance_func.tokenizer = WordTokenizer()
+    chapter = "\n".join(verse(25, tag=f"v{i}_") for i in range(32))
+    assert len(chapter) > 4 * MODEL_MAX_INPUT_LENGTH
+
+    summarize_text(chapter)
+    mock_pipeline_instance_func.assert_called_once()
 
 @patch('utils.summarizer.summarizer_pipeline', new=None) # Simulate pipeline failed to load
-def test_summarize_text_pipeline_not_available():
+def test_summarize_text_pipeline_not_available(fresh_model_state):
+    fresh_model_state["state"] = "failed"
     summary = summarize_text("Test text.")
     assert summary == "Error: Text summarization service is currently unavailable."
 
@@ -135,145 +187,392 @@ def test_summarize_text_pipeline_exception(mock_pipeline_instance_func):
 @patch('utils.summarizer.summarizer_pipeline')
 def test_summarize_text_chunk_too_short(mock_pipeline_instance_func, mock_summarizer_pipeline):
     mock_pipeline_instance_func.side_effect = mock_summarizer_pipeline.side_effect
-    
-    # MODEL_MAX_INPUT_LENGTH = 1024, SUMMARY_MAX_LENGTH = 150
-    # Create text slightly longer than MODEL_MAX_INPUT_LENGTH to make two chunks
-    # One long, one very short.
-    # num_chunks = (text_len // (MODEL_MAX_INPUT_LENGTH - SUMMARY_MAX_LENGTH)) + 1
-    # text_len = 1050. num_chunks = (1050 // 874) + 1 = 1 + 1 = 2
-    # chunk_size = 1050 // 2 = 525
-    # chunks = [text[0:525], text[525:1050]]
-    # chunk_summary_max_length = max(SUMMARY_MIN_LENGTH, SUMMARY_MAX_LENGTH // 2) = max(40, 75) = 75
-    # chunk_summary_min_length = max(10, SUMMARY_MIN_LENGTH // 2) = max(10, 40 // 2) = 20
-    # Condition: len(chunk) < chunk_summary_min_length * 2 (i.e. < 40 chars)
-    
-    # To force a short chunk:
-    # Let text_len be just over MODEL_MAX_INPUT_LENGTH, e.g., 1030
-    # num_chunks = (1030 // 874) + 1 = 2
-    # chunk_size = 1030 // 2 = 515
-    # Chunks: text[0:515], text[515:1030] - both are long enough.
-
-    # Let's manually craft the chunks in the test for this specific scenario
-    # by mocking the chunking process itself, or by designing input text carefully.
-    # The current chunking: `chunks = [text[i:i + chunk_size] for i in range(0, text_len, chunk_size)]`
-    # If text_len = 1025. num_chunks = 2. chunk_size = 512.
-    # chunks = [text[0:512], text[512:1024], text[1024:1025]] -> 3 chunks. Last one is 1 char.
-    text_one_char_last_chunk = "A" * (MODEL_MAX_INPUT_LENGTH -1) + "B" # Length 1024
-    text_one_char_last_chunk = "A" * (MODEL_MAX_INPUT_LENGTH - 50) # Length 974
-    # Add text to make it slightly longer, leading to a tiny last chunk
-    # text_len = MODEL_MAX_INPUT_LENGTH + 10 = 1034
-    # num_chunks = (1034 // (1024-150)) + 1 = (1034 // 874) + 1 = 1+1 = 2
-    # chunk_size = 1034 // 2 = 517
-    # chunks = [text[0:517], text[517:1034]] - both are fine.
-
-    # The code's chunking `(text_len // (MODEL_MAX_INPUT_LENGTH - SUMMARY_MAX_LENGTH)) + 1`
-    # and then `chunk_size = text_len // num_chunks` makes it hard to create a tiny last chunk
-    # reliably without very specific lengths.
-    # The warning `if len(chunk) < chunk_summary_min_length * 2:` is for when a chunk itself is too short.
-    # `chunk_summary_min_length` can be as low as 10. So chunk length < 20.
-
-    # Let's test this by ensuring one chunk is very small.
-    # e.g. text = "A" * (MODEL_MAX_INPUT_LENGTH - 10) + " B" * 5 # Length 1024 characters
-    # This will be one chunk.
-    
-    # To test the "chunk too short" logic, we need to ensure the chunking results in a small chunk.
-    # This happens if `text_len` is small, but still > `MODEL_MAX_INPUT_LENGTH`.
-    # This scenario is unlikely because if `text_len > MODEL_MAX_INPUT_LENGTH`, `num_chunks` will be at least 2.
-    # And `chunk_size = text_len // num_chunks` will likely be substantial.
-    # The specific line `if len(chunk) < chunk_summary_min_length * 2:` might be hard to hit with the current chunking logic
-    # unless `SUMMARY_MIN_LENGTH // len(chunks)` becomes very small, meaning many chunks.
-
-    # Consider a case where `text` itself is very short, but longer than `MODEL_MAX_INPUT_LENGTH` is not possible.
-    # The "chunk too short" part of the code is:
-    # `chunk_summary_min_length = max(10, SUMMARY_MIN_LENGTH // len(chunks))`
-    # `if len(chunk) < chunk_summary_min_length * 2:`
-    # If we have many chunks, `len(chunks)` is large, `SUMMARY_MIN_LENGTH // len(chunks)` can be small.
-    # e.g. 10 chunks. `chunk_summary_min_length = max(10, 40 // 10) = max(10, 4) = 10`.
-    # We need `len(chunk) < 20`.
-    # If we have 10 chunks, `text_len` must be roughly `10 * (MODEL_MAX_INPUT_LENGTH - SUMMARY_MAX_LENGTH)`
-    # which is `10 * 874 = 8740`. Then `chunk_size` is `8740 / 10 = 874`. This is not < 20.
-
-    # It seems the specific `if len(chunk) < chunk_summary_min_length * 2:` condition
-    # might only be hit if a chunk is genuinely tiny due to unusual text or splitting.
-    # The current chunking `[text[i:i + chunk_size] for i in range(0, text_len, chunk_size)]`
-    # will make the last chunk smaller if `text_len` is not a multiple of `chunk_size`.
-    # Example: `text_len = 100`, `chunk_size = 30`. Chunks: `text[0:30], text[30:60], text[60:90], text[90:100]` (last is 10).
-    # Let text_len = (MODEL_MAX_INPUT_LENGTH - SUMMARY_MAX_LENGTH) * 2 + 15  = 874 * 2 + 15 = 1748 + 15 = 1763
-    # num_chunks = (1763 // 874) + 1 = 2 + 1 = 3
-    # chunk_size = 1763 // 3 = 587
-    # Chunks: text[0:587], text[587:1174], text[1174:1761] (last is 1763-1174 = 589, but should be 1761 from loop)
-    # range(0, 1763, 587) -> 0, 587, 1174.
-    # chunk1: text[0:587] (len 587)
-    # chunk2: text[587:1174] (len 587)
-    # chunk3: text[1174:1761] (len 587) -> No, text[1174:1763] (len 589)
-    # The last chunk will be `text[1174:1763]`. Length = 1763-1174 = 589.
-    # All chunks are large.
-
-    # Let's try to make the last chunk small:
-    # text_len = chunk_size * (num_chunks -1) + small_amount
-    # Say num_chunks = 3. chunk_size = 500.
-    # text_len = 500 * 2 + 15 = 1015.
-    # For this text_len, the summarizer calculates:
-    # num_chunks = (1015 // 874) + 1 = 1 + 1 = 2
-    # chunk_size = 1015 // 2 = 507
-    # Chunks: text[0:507], text[507:1014] (last one: text[507:1015] len 508)
-    # Still doesn't produce a tiny chunk.
-
-    # The only way to get a very small chunk with the current logic is if `chunk_size` itself is very small.
-    # This means `text_len / num_chunks` is small.
-    # This implies `text_len` is small, but then it wouldn't trigger chunking in the first place.
-    # Or `num_chunks` is very large.
-    # This specific path `len(chunk) < chunk_summary_min_length * 2` seems hard to test
-    # without directly manipulating the chunks list or using a text that naturally creates such a scenario,
-    # which the current chunking algorithm might prevent.
-    # However, if it does occur, the code logs a warning and appends the chunk as is.
-    # We can assume this part of the code is defensive.
-
-    # Test that truncation=True is passed
+    mock_pipeline_instance_func.tokenizer = WordTokenizer()
+
+    # The short last verse does not fit next to the long one, so it becomes a tiny chunk of its own:
+    # 2 chunks, chunk_summary_min_length = max(10, 40 // 2) = 20, and 6 tokens < 20 * 2
+    short_verse = "Jesus wept and the Jews marvelled."
+    summary = summarize_text(verse(1018) + "\n" + short_verse)
+
+    mock_pipeline_instance_func.assert_called_once() # Only the long chunk goes through the model
+    assert mock_pipeline_instance_func.call_args.args[0] == verse(1018)
+    assert summary.endswith(short_verse) # The short chunk is used as is
+
+    # Test that truncation=True, do_sample=False and the summary lengths are passed for short text
     mock_pipeline_instance_func.reset_mock()
     summarize_text("Short text.")
     args, kwargs = mock_pipeline_instance_func.call_args
     assert kwargs.get('truncation') is True
-
-    # Test that do_sample=False is passed
     assert kwargs.get('do_sample') is False
-
-    # Test that max_length and min_length are passed correctly
     assert kwargs.get('max_length') == SUMMARY_MAX_LENGTH
     assert kwargs.get('min_length') == SUMMARY_MIN_LENGTH
 
-    # Test the chunk summary length calculations for long text
-    mock_pipeline_instance_func.reset_mock()
-    # Use `very_long_text` (3420 chars) which creates 4 chunks
-    # chunk_summary_max_length = max(40, 150 // 4) = 40
-    # chunk_summary_min_length = max(10, 40 // 4) = 10
-    summarize_text(very_long_text) # 4 chunks + 1 final = 5 calls
-    
-    # Check args for one of the chunk calls (e.g., the first one)
-    first_chunk_call_args, first_chunk_call_kwargs = mock_pipeline_instance_func.call_args_list[0]
-    assert first_chunk_call_kwargs.get('max_length') == 40 # SUMMARY_MAX_LENGTH // 4
-    assert first_chunk_call_kwargs.get('min_length') == 10 # SUMMARY_MIN_LENGTH // 4
-
-    # Check args for the final recursive call (if it happened, it would be the last call)
-    # For `very_long_text`, it was 4 chunks. Summaries ~38 chars each. Combined = 152.
-    # 152 is not > 1.5 * 150 (225). So no recursive call. Total 4 calls.
-    assert mock_pipeline_instance_func.call_count == 4
-
-    # Let's re-run `super_long_text` which should trigger recursive.
-    # 5700 chars, 7 chunks.
-    # chunk_max_len = max(40, 150/7) = 40. chunk_min_len = max(10, 40/7) = 10.
-    # Summaries ~38 chars. Combined 7*38 = 266.
-    # 266 > 225. So recursive call happens. Total 7+1 = 8 calls.
+
+@patch('utils.summarizer.summarizer_pipeline')
+def test_summarize_batch_sorts_by_length_and_restores_order(mock_pipeline_instance_func, mock_summarizer_pipeline):
+    mock_pipeline_instance_func.side_effect = mock_summarizer_pipeline.side_effect
+    mock_pipeline_instance_func.tokenizer = WordTokenizer()
+    texts = [verse(5, "short"), verse(50, "long"), verse(20, "mid")]
+
+    summaries = summarizer.summarize_batch(texts, max_length=100, min_length=10)
+
+    # Longest first, so each padded batch holds similar lengths
+    assert mock_pipeline_instance_func.call_args.args[0] == [texts[1], texts[2], texts[0]]
+    assert summaries == [f"Summary of: {t[:85]}" for t in texts]
+
+
+@patch('utils.summarizer.summarizer_pipeline')
+def test_concurrent_requests_share_a_model_call(mock_pipeline_instance_func, mock_summarizer_pipeline, monkeypatch):
+    mock_pipeline_instance_func.side_effect = mock_summarizer_pipeline.side_effect
+    monkeypatch.setattr(summarizer.summary_scheduler, "max_wait_ms", 200)
+    texts = [f"Verse number {i} of the chapter." for i in range(4)]
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        summaries = list(pool.map(summarize_text, texts))
+
+    assert summaries == [f"Summary of: {t}" for t in texts]
+    # Requests that arrive within the wait window are summarized in one padded batch
+    assert mock_pipeline_instance_func.call_count < len(texts)
+    assert sum(len(c.args[0]) if isinstance(c.args[0], list) else 1 for c in mock_pipeline_instance_func.call_args_list) == len(texts)
+
+
+@patch('utils.summarizer.summarizer_pipeline')
+def test_concurrent_requests_for_one_text_share_one_inference(mock_pipeline_instance_func, mock_summarizer_pipeline, monkeypatch):
+    mock_pipeline_instance_func.side_effect = mock_summarizer_pipeline.side_effect
+    monkeypatch.setattr(summarizer.summary_scheduler, "max_wait_ms", 200)
+    text = "In the beginning was the Word."
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        summaries = list(pool.map(lambda _: summarize_text(text), range(4)))
+
+    assert summaries == [f"Summary of: {text}"] * 4
+    assert count_model_inputs(mock_pipeline_instance_func) == 1
+
+@patch('utils.summarizer.summarizer_pipeline')
+def test_concurrent_requests_share_the_error_without_caching_it(mock_pipeline_instance_func, monkeypatch, fresh_summary_cache):
+    mock_pipeline_instance_func.side_effect = Exception("Model failed")
+    monkeypatch.setattr(summarizer.summary_scheduler, "max_wait_ms", 200)
+
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        summaries = list(pool.map(lambda _: summarize_text("One."), range(3)))
+
+    assert summaries == ["Error: Could not summarize text due to an internal issue."] * 3
+    assert mock_pipeline_instance_func.call_count == 1
+    assert fresh_summary_cache.stats()["sets"] == 0
+
+@patch('utils.summarizer.summarizer_pipeline')
+def test_overlapping_batches_summarize_shared_texts_once(mock_pipeline_instance_func, mock_summarizer_pipeline, monkeypatch):
+    mock_pipeline_instance_func.side_effect = mock_summarizer_pipeline.side_effect
+    monkeypatch.setattr(summarizer.summary_scheduler, "max_wait_ms", 200)
+    batches = [["Chapter 1.", "Chapter 2.", "Chapter 3."], ["Chapter 2.", "Chapter 3.", "Chapter 4."]]
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        results = list(pool.map(summarizer.summarize_texts, batches))
+
+    assert results == [[f"Summary of: {t}" for t in texts] for texts in batches]
+    assert count_model_inputs(mock_pipeline_instance_func) == 4
+
+@patch('utils.summarizer.summarizer_pipeline')
+def test_failed_batch_releases_its_flights_to_followers(mock_pipeline_instance_func, mock_summarizer_pipeline, monkeypatch):
+    mock_pipeline_instance_func.side_effect = mock_summarizer_pipeline.side_effect
+    submitted = threading.Event()
+    release = threading.Event()
+
+    def failing_submit(items):
+        submitted.set()
+        release.wait(timeout=5)
+        raise RuntimeError("Scheduler stopped")
+    monkeypatch.setattr(summarizer.summary_scheduler, "submit_many", failing_submit)
+    followed = threading.Event()
+    claim = summarizer._summaries.claim
+    def watched_claim(key):
+        future, leader = claim(key)
+        if not leader:
+            followed.set()
+        return future, leader
+    monkeypatch.setattr(summarizer._summaries, "claim", watched_claim)
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        leader = pool.submit(summarizer.summarize_texts, ["Chapter 1.", "Chapter 2."])
+        assert submitted.wait(timeout=5)
+        # Arrives while the batch holds the flight for "Chapter 2."
+        follower = pool.submit(summarize_text, "Chapter 2.")
+        assert followed.wait(timeout=5)
+        release.set()
+        with pytest.raises(RuntimeError, match="Scheduler stopped"):
+            leader.result(timeout=5)
+        with pytest.raises(RuntimeError, match="Scheduler stopped"):
+            follower.result(timeout=5)
+    assert summarizer._summaries.in_flight() == 0
+
+@patch('utils.summarizer.summarizer_pipeline')
+def test_summarize_texts_batches_single_pass_texts(mock_pipeline_instance_func, mock_summarizer_pipeline, fresh_summary_cache):
+    mock_pipeline_instance_func.side_effect = mock_summarizer_pipeline.side_effect
+    mock_pipeline_instance_func.tokenizer = WordTokenizer()
+    summarize_text("Cached text.")
+    long_text = "\n".join(verse(600, tag=t) for t in "ab")
+
+    results = summarizer.summarize_texts(["First text.", "Cached text.", long_text, "", "Second text."])
+
+    assert results[0] == "Summary of: First text."
+    assert results[1] == "Summary of: Cached text."
+    assert results[2].startswith("Summary of: a0")
+    assert results[3] == "Error: No text provided for summarization."
+    assert results[4] == "Summary of: Second text."
+    # One call for the cached text, one for the long text's chunks, one for both short texts together
+    assert mock_pipeline_instance_func.call_count == 3
+    assert ["First text.", "Second text."] in [c.args[0] for c in mock_pipeline_instance_func.call_args_list]
+    assert summarize_text("Second text.") == results[4] # Cached
+    assert mock_pipeline_instance_func.call_count == 3
+
+@patch('utils.summarizer.summarizer_pipeline')
+def test_summarize_texts_errors_are_per_text_and_not_cached(mock_pipeline_instance_func, fresh_summary_cache):
+    mock_pipeline_instance_func.side_effect = Exception("Model failed")
+    results = summarizer.summarize_texts(["One.", "Two."])
+    assert results == ["Error: Could not summarize text due to an internal issue."] * 2
+    assert fresh_summary_cache.stats()["sets"] == 0
+
+@patch('utils.summarizer.get_pipeline', return_value=None)
+def test_summarize_texts_waits_for_the_model_once(mock_get_pipeline, fresh_summary_cache):
+    results = summarizer.summarize_texts(["One.", "Two.", "Three."])
+    assert results == ["Error: Text summarization service is currently unavailable."] * 3
+    # A model still loading would otherwise cost MODEL_LOAD_TIMEOUT per text
+    assert mock_get_pipeline.call_count == 1
+
+
+# --- Chapter ranges ---
+
+def count_model_inputs(mock_pipeline):
+    return sum(len(c.args[0]) if isinstance(c.args[0], list) else 1 for c in mock_pipeline.call_args_list)
+
+def test_reduce_summaries_builds_an_aligned_tree(monkeypatch):
+    calls = []
+    def fake_summarize_texts(texts, mode):
+        calls.append(texts)
+        return ["(" + "+".join(text.split("\n")) + ")" for text in texts]
+    monkeypatch.setattr(summarizer, "summarize_texts", fake_summarize_texts)
+    monkeypatch.setattr(summarizer, "SUMMARY_REDUCE_FANOUT", 2)
+
+    assert summarizer.reduce_summaries(["S1", "S2", "S3", "S4"]) == "((S1+S2)+(S3+S4))"
+    assert calls == [["S1\nS2", "S3\nS4"], ["(S1+S2)\n(S3+S4)"]] # One batched call per level
+    # Nodes are aligned to chapter numbers, not to the start of the range
+    assert summarizer.reduce_summaries(["S2", "S3", "S4"], first_chapter=2) == "(S2+(S3+S4))"
+    assert summarizer.reduce_summaries(["S7"], first_chapter=7) == "S7"
+
+@patch('utils.summarizer.summarizer_pipeline')
+def test_overlapping_ranges_reuse_cached_nodes(mock_pipeline_instance_func, mock_summarizer_pipeline, monkeypatch):
+    mock_pipeline_instance_func.side_effect = mock_summarizer_pipeline.side_effect
+    monkeypatch.setattr(summarizer, "SUMMARY_REDUCE_FANOUT", 2)
+    chapters = [f"Chapter {c} text." for c in range(1, 9)]
+
+    summarizer.summarize_range(chapters[:4])
+    assert count_model_inputs(mock_pipeline_instance_func) == 4 + 2 + 1 # Leaves, then two levels
+
     mock_pipeline_instance_func.reset_mock()
-    summarize_text(super_long_text)
-    assert mock_pipeline_instance_func.call_count == 8
-    
-    last_call_args, last_call_kwargs = mock_pipeline_instance_func.call_args_list[-1] # The recursive call
-    assert last_call_kwargs.get('max_length') == SUMMARY_MAX_LENGTH # Should use the main summary lengths
-    assert last_call_kwargs.get('min_length') == SUMMARY_MIN_LENGTH
-    # The input to this last call should be the combined summary of the chunks
-    expected_input_to_recursive_summary = " ".join([f"Summary of: {chunk[:40-15]}" for chunk in ["dummy"]*7]) # Approximating structure
-    actual_input_to_recursive_summary = last_call_args[0]
-    assert "Summary of:" in actual_input_to_recursive_summary
-    assert len(actual_input_to_recursive_summary) > SUMMARY_MAX_LENGTH # Because it triggered recursive
-    assert len(actual_input_to_recursive_summary) <= (40 * 7) # Max possible length of combined chunk summaries
+    summarizer.summarize_range(chapters[:5])
+    # Only chapter 5 and the new root; chapters 1-4 and the nodes above them come from the cache
+    assert count_model_inputs(mock_pipeline_instance_func) == 2
+
+@patch('utils.summarizer.summarizer_pipeline')
+def test_range_stream_reports_each_chapter(mock_pipeline_instance_func, mock_summarizer_pipeline):
+    mock_pipeline_instance_func.side_effect = mock_summarizer_pipeline.side_effect
+    events = list(summarizer.summarize_range_stream(["First.", "Second."], first_chapter=1))
+    assert [(e["event"], e.get("index")) for e in events] == [("chunk", 0), ("chunk", 1), ("summary", None)]
+    assert events[0]["summary"] == "Summary of: First."
+    assert events[-1]["summary"] == "Summary of: Summary of: First.\nSummary of: Second."
+
+@patch('utils.summarizer.summarizer_pipeline')
+def test_range_error_is_reported(mock_pipeline_instance_func):
+    mock_pipeline_instance_func.side_effect = Exception("Model failed")
+    assert summarizer.summarize_range(["First.", "Second."]) == "Error: Could not summarize text due to an internal issue."
+    assert summarizer.summarize_range([]) == "Error: No text provided for summarization."
+
+# --- Summary modes ---
+
+@patch('utils.summarizer.summarizer_pipeline')
+def test_extractive_mode_never_touches_the_model(mock_pipeline_instance_func, fresh_summary_cache):
+    text = "And God said, Let there be light: and there was light.\nAnd God saw the light, that it was good."
+    summary = summarize_text(text, mode="extractive")
+    assert summary and "light" in summary
+    mock_pipeline_instance_func.assert_not_called()
+    assert fresh_summary_cache.stats()["sets"] == 0 # Not cached
+
+def test_unknown_mode():
+    assert summarize_text("Some text.", mode="poetic") == "Error: Unknown summarization mode 'poetic'."
+
+def test_effective_mode_degrades_when_queue_is_saturated(fresh_model_state, monkeypatch):
+    fresh_model_state["state"] = "ready"
+    monkeypatch.setattr(summarizer, "SUMMARY_DEGRADE_QUEUE_DEPTH", 4)
+    monkeypatch.setattr(summarizer.summary_scheduler, "queue_depth", lambda: 3)
+    assert summarizer.effective_summary_mode("abstractive") == "abstractive"
+    monkeypatch.setattr(summarizer.summary_scheduler, "queue_depth", lambda: 4)
+    assert summarizer.effective_summary_mode("abstractive") == "extractive"
+    assert summarizer.effective_summary_mode("extractive") == "extractive"
+    monkeypatch.setattr(summarizer, "SUMMARY_DEGRADE_QUEUE_DEPTH", 0) # Disabled
+    assert summarizer.effective_summary_mode("abstractive") == "abstractive"
+
+def test_effective_mode_degrades_when_model_failed(fresh_model_state):
+    fresh_model_state["state"] = "failed"
+    assert summarizer.effective_summary_mode() == "extractive"
+
+
+# --- Token-aware chunking ---
+
+@pytest.fixture
+def word_tokenizer():
+    with patch('utils.summarizer.summarizer_pipeline') as mock_pipeline:
+        mock_pipeline.tokenizer = WordTokenizer()
+        yield mock_pipeline
+
+def test_chunk_text_packs_whole_verses_up_to_budget(word_tokenizer):
+    verses = [verse(n, tag=f"v{i}_") for i, n in enumerate([4, 4, 4, 4, 4])]
+    chunks = summarizer.chunk_text("\n".join(verses), max_tokens=12)
+
+    # Each verse costs 4 tokens + 1 for the separator, so two verses fit in a 12-token chunk
+    assert chunks == ["\n".join(verses[0:2]), "\n".join(verses[2:4]), verses[4]]
+    assert all(summarizer.count_tokens(c) <= 12 for c in chunks)
+
+def test_chunk_text_overlap(word_tokenizer):
+    verses = [verse(3, tag=f"v{i}_") for i in range(4)]
+    chunks = summarizer.chunk_text("\n".join(verses), max_tokens=8, overlap=1)
+    # The last verse of each chunk is repeated at the start of the next
+    assert chunks == ["\n".join(verses[0:2]), "\n".join(verses[1:3]), "\n".join(verses[2:4])]
+
+def test_chunk_text_splits_oversized_verse_at_sentences(word_tokenizer):
+    long_verse = "One two three. Four five six seven. Eight nine."
+    assert summarizer.chunk_text(long_verse, max_tokens=5) == ["One two three.", "Four five six seven.", "Eight nine."]
+    # A sentence that alone exceeds the budget falls back to word boundaries
+    assert summarizer.chunk_text("a b c d e f g", max_tokens=3) == ["a b c", "d e f", "g"]
+
+def test_chunk_text_skips_blank_lines(word_tokenizer):
+    assert summarizer.chunk_text("First verse.\n\n  \nSecond verse.", max_tokens=100) == ["First verse.\nSecond verse."]
+
+def test_count_tokens_without_tokenizer():
+    with patch('utils.summarizer.summarizer_pipeline', new=None):
+        assert summarizer.count_tokens("x" * 400) == 101 # Character-based estimate
+
+# --- Model loading ---
+
+def test_importing_the_module_does_not_load_the_model():
+    code = "import sys, utils.summarizer; print('transformers' in sys.modules, utils.summarizer.summarizer_pipeline)"
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, cwd=summarizer._BASE_DIR + "/..")
+    assert result.stdout.split() == ["False", "None"]
+
+def test_load_model_builds_and_warms_up_once(fresh_model_state, fake_transformers):
+    assert summarizer.load_model() is True
+    assert summarizer.load_model() is True
+
+    fake_transformers.pipeline.assert_called_once_with("summarization", model=summarizer.MODEL_NAME, tokenizer=summarizer.MODEL_NAME)
+    loaded = fake_transformers.pipeline.return_value
+    loaded.assert_called_once() # The warmup generation
+    assert loaded.call_args.args[0] == summarizer.WARMUP_TEXT
+    assert summarizer.summarizer_pipeline is loaded
+    status = summarizer.model_status()
+    assert status["state"] == "ready"
+    assert status["load_seconds"] is not None and status["warmup_seconds"] is not None
+
+def test_load_model_failure_is_reported(fresh_model_state, fake_transformers):
+    fake_transformers.pipeline.side_effect = OSError("no network")
+
+    assert summarizer.load_model() is False
+    assert summarizer.model_status()["state"] == "failed"
+    assert "no network" in summarizer.model_status()["error"]
+    # Requests fail fast instead of waiting for a model that will never arrive
+    assert summarize_text("Test text.") == "Error: Text summarization service is currently unavailable."
+
+def test_summarize_waits_for_background_warmup(fresh_model_state, fake_transformers):
+    summarizer.start_model_warmup()
+    summarizer.start_model_warmup() # Only one warmup thread
+    warmup_thread = summarizer._warmup_thread
+
+    assert summarize_text("Jesus wept.") == "Warm."
+    warmup_thread.join(timeout=5)
+    fake_transformers.pipeline.assert_called_once()
+
+def test_load_model_uses_configured_backend(fresh_model_state, monkeypatch):
+    engine = MagicMock(return_value=[{'summary_text': "Warm."}])
+    build = MagicMock(return_value=engine)
+    monkeypatch.setattr(summarizer, "build_pipeline", build)
+    monkeypatch.setattr(summarizer, "SUMMARIZER_BACKEND", "onnx-int8")
+
+    assert summarizer.load_model() is True
+    assert summarizer.summarizer_pipeline is engine
+    build.assert_called_once_with()
+
+def test_onnx_backend_requested_without_optimum(monkeypatch):
+    # The optional dependency is imported only when that backend is built
+    monkeypatch.setitem(sys.modules, "optimum", None)
+    monkeypatch.setitem(sys.modules, "optimum.onnxruntime", None)
+    with pytest.raises(ImportError):
+        summarizer.build_pipeline("onnx")
+    with pytest.raises(ValueError):
+        summarizer.build_pipeline("tensorflow")
+
+def test_backend_is_part_of_the_fingerprint(monkeypatch):
+    fingerprint = summarizer.summary_fingerprint()
+    monkeypatch.setattr(summarizer, "SUMMARIZER_BACKEND", "onnx-int8")
+    assert summarizer.summary_fingerprint() != fingerprint
+
+def test_summarize_gives_up_if_model_is_still_loading(fresh_model_state, monkeypatch):
+    fresh_model_state["state"] = "loading" # Someone else is loading and has not finished
+    monkeypatch.setattr(summarizer, "MODEL_LOAD_TIMEOUT", 0.01)
+    assert summarize_text("Test text.") == "Error: Text summarization service is currently unavailable."
+
+
+# --- Summary cache ---
+
+@patch('utils.summarizer.summarizer_pipeline')
+def test_repeated_text_is_served_from_cache(mock_pipeline_instance_func, mock_summarizer_pipeline, fresh_summary_cache):
+    mock_pipeline_instance_func.side_effect = mock_summarizer_pipeline.side_effect
+
+    first = summarize_text("In the beginning God created the heaven and the earth.")
+    second = summarize_text("In the beginning God created the heaven and the earth.")
+
+    assert first == second
+    mock_pipeline_instance_func.assert_called_once()
+    assert fresh_summary_cache.stats()["memory_hits"] == 1
+
+@patch('utils.summarizer.summarizer_pipeline')
+def test_changing_params_or_model_invalidates_cache(mock_pipeline_instance_func, mock_summarizer_pipeline, monkeypatch):
+    mock_pipeline_instance_func.side_effect = mock_summarizer_pipeline.side_effect
+    text = "And God said, Let there be light: and there was light."
+
+    summarize_text(text)
+    monkeypatch.setattr(summarizer, "SUMMARY_MAX_LENGTH", 120)
+    summarize_text(text)
+    monkeypatch.setattr(summarizer, "MODEL_NAME", "another/model")
+    summarize_text(text)
+
+    assert mock_pipeline_instance_func.call_count == 3
+
+@patch('utils.summarizer.summarizer_pipeline')
+def test_errors_are_not_cached(mock_pipeline_instance_func):
+    mock_pipeline_instance_func.side_effect = Exception("Test pipeline error")
+    summarize_text("Some text.")
+    summarize_text("Some text.")
+    assert mock_pipeline_instance_func.call_count == 2
+
+def test_cached_summary_served_when_pipeline_unavailable(fresh_summary_cache):
+    fresh_summary_cache.set(summarizer.summary_cache_key("Cached text."), "Cached summary.")
+    with patch('utils.summarizer.summarizer_pipeline', new=None):
+        assert summarize_text("Cached text.") == "Cached summary."
+
+@patch('utils.summarizer.summarizer_pipeline')
+def test_disk_tier_survives_restart(mock_pipeline_instance_func, mock_summarizer_pipeline, tmp_path, monkeypatch):
+    mock_pipeline_instance_func.side_effect = mock_summarizer_pipeline.side_effect
+    path = str(tmp_path / "summaries.sqlite3")
+
+    monkeypatch.setattr(summarizer, "summary_cache", TwoTierCache("summaries", LRUCache(), SQLiteStore(path)))
+    summary = summarize_text("Jesus wept.")
+    # A new process starts with an empty in-memory tier but the same file
+    monkeypatch.setattr(summarizer, "summary_cache", TwoTierCache("summaries", LRUCache(), SQLiteStore(path)))
+    assert summarize_text("Jesus wept.") == summary
+    mock_pipeline_instance_func.assert_called_once()
+
+def test_cache_key_depends_on_text_and_fingerprint(monkeypatch):
+    key = summarizer.summary_cache_key("Text A")
+    assert key != summarizer.summary_cache_key("Text B")
+    fingerprint = summarizer.summary_fingerprint()
+    monkeypatch.setattr(summarizer, "SUMMARY_MIN_LENGTH", 10)
+    assert summarizer.summary_fingerprint() != fingerprint
+    assert summarizer.summary_cache_key("Text A") != key
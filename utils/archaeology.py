@@ -1,52 +1,173 @@
 import json
 import os
+import re
+import threading
+import time
+from types import MappingProxyType
+from typing import NamedTuple
+from utils.books import book_key
+
+# Construct path relative to this file's directory for robustness
+# __file__ is utils/archaeology.py, so ../data/ goes to project_root/data/
+_BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+PROOFS_PATH = os.environ.get("ARCHAEOLOGY_DATA_PATH", os.path.join(_BASE_DIR, "..", "data", "archaeological_proofs.json"))
+# Minimum seconds between stat() checks of the data file for changes
+PROOFS_RELOAD_INTERVAL = float(os.environ.get("ARCHAEOLOGY_RELOAD_INTERVAL", 2.0))
+
+MISSING_FILE_ERROR = {"error": "Archaeological data file is missing. Please contact administrator."}
+CORRUPTED_FILE_ERROR = {"error": "Archaeological data file is corrupted. Please contact administrator."}
+UNEXPECTED_ERROR = {"error": "An error occurred while fetching archaeological proof. Please contact administrator."}
+
+# Chapter part of a dataset key: "9" or a range such as "10-12"
+_CHAPTER_KEY = re.compile(r"\d+(-\d+)?")
+
+
+class _ProofState(NamedTuple):
+    index: MappingProxyType | None  # Immutable {(book key, chapter or None): proof}, None if it could not be loaded
+    error: dict | None  # Returned to callers while no index is available
+    signature: tuple | None  # (path, mtime_ns, size) of the file the index was built from
+
+
+# Readers only ever take a reference to the current state; reloads build a new state and swap it in.
+_state = None
+_last_check = 0.0
+_reload_lock = threading.Lock()
+_stats = {"loads": 0, "reloads": 0, "load_errors": 0, "last_load_seconds": 0.0, "loaded_at": None, "entries": 0}
+
 
 def get_archeological_proof(book: str, chapter: str) -> str | list[str] | dict:
     """
     Retrieves archaeological proof(s) for a given Bible book and chapter.
     The proof can be a string, a list of strings (multiple proofs), or a dictionary for more structured data.
     """
-    # Normalize book name for consistency (e.g., "1 Kings" vs "1kings")
-    normalized_book = book.lower().replace(" ", "").replace("1", "1st").replace("2", "2nd").replace("3", "3rd")
-    
+    state = _current_state()
+    if state.index is None:
+        return dict(state.error)
+
+    # "1 Kings", "1st kings" and "I Kgs" all resolve to the same canonical book key
+    normalized_book = book_key(book)
+
     # Ensure chapter is treated as a string, as it might come as an int from app.py
-    chapter_str = str(chapter)
+    chapter_str = "".join(str(chapter).split())
 
-    # Key for chapter-specific proof
-    specific_key = f"{normalized_book}_{chapter_str}"
-    # Key for book-level general proof (fallback)
-    general_book_key = normalized_book
+    # Try chapter-specific key first
+    proof = state.index.get((normalized_book, chapter_str))
+    if proof is not None:
+        return proof
 
-    # Construct path relative to this file's directory for robustness
-    # __file__ is utils/archaeology.py, so ../data/ goes to project_root/data/
-    base_dir = os.path.dirname(os.path.abspath(__file__))
-    path = os.path.join(base_dir, "..", "data", "archaeological_proofs.json")
+    # Fallback to book-level general proof if chapter-specific one is not found
+    general_proof = state.index.get((normalized_book, None))
+    if general_proof is not None:
+        return general_proof
+
+    return "No specific archaeological proof found for this passage or book."
+
+
+def load_proofs() -> bool:
+    """
+    (Re)loads the dataset from PROOFS_PATH and swaps it in. Called at startup; afterwards
+    changes to the file are picked up automatically. Returns True if a valid index is loaded.
+    """
+    global _last_check
+    with _reload_lock:
+        _last_check = time.monotonic()
+        _reload(_file_signature())
+    return _state.index is not None
 
-    if not os.path.exists(path):
-        # Log this error for server-side visibility (consider using a proper logger)
-        print(f"CRITICAL: Archaeological data file not found at {path}")
-        return {"error": "Archaeological data file is missing. Please contact administrator."}
 
+def proofs_index_stats() -> dict:
+    """Load/reload counters and timings for monitoring."""
+    return dict(_stats)
+
+
+def _current_state() -> _ProofState:
+    global _last_check
+    if _state is not None and time.monotonic() - _last_check < PROOFS_RELOAD_INTERVAL:
+        return _state
+
+    # Only one thread checks the file; everyone else keeps reading the current index.
+    # With no index yet there is nothing to serve, so the first callers wait for the initial load.
+    if not _reload_lock.acquire(blocking=_state is None):
+        return _state
+    try:
+        if _state is None or time.monotonic() - _last_check >= PROOFS_RELOAD_INTERVAL:
+            _last_check = time.monotonic()
+            signature = _file_signature()
+            if _state is None or signature != _state.signature:
+                _reload(signature)
+        return _state
+    finally:
+        _reload_lock.release()
+
+
+def build_proof_index(data: dict) -> dict:
+    """
+    Maps dataset keys to (book key, chapter) pairs: "1stkings_9" -> ("1KI", "9") and
+    "genesis_general" or "genesis" -> ("GEN", None) for book-level proofs. A bare book key
+    takes precedence over "<book>_general" when a dataset has both.
+    """
+    index = {}
+    general = {}
+    for key, proof in data.items():
+        book_part, _, chapter_part = key.rpartition("_")
+        if chapter_part == "general":
+            general[book_key(book_part)] = proof
+        elif book_part and _CHAPTER_KEY.fullmatch(chapter_part):
+            index[(book_key(book_part), chapter_part)] = proof
+        else:
+            index[(book_key(key), None)] = proof  # e.g. "mark" or "song_of_solomon"
+    for book, proof in general.items():
+        index.setdefault((book, None), proof)
+    return index
+
+
+def _file_signature() -> tuple | None:
     try:
-        with open(path, "r", encoding="utf-8") as f: # Specify encoding
-            data = json.load(f)
-        
-        # Try chapter-specific key first
-        proof = data.get(specific_key)
-        
-        if proof is not None:
-            return proof
-        
-        # Fallback to book-level general proof if chapter-specific one is not found
-        general_proof = data.get(general_book_key)
-        if general_proof is not None:
-            return general_proof
-            
-        return "No specific archaeological proof found for this passage or book."
-
-    except json.JSONDecodeError:
-        print(f"ERROR: Failed to decode JSON from {path}")
-        return {"error": "Archaeological data file is corrupted. Please contact administrator."}
-    except Exception as e:
-        print(f"ERROR: An unexpected error occurred while fetching archaeological proof: {str(e)}")
-        return {"error": "An error occurred while fetching archaeological proof. Please contact administrator."}
+        stat = os.stat(PROOFS_PATH)
+    except OSError:
+        return None
+    return (PROOFS_PATH, stat.st_mtime_ns, stat.st_size)
+
+
+def _reload(signature: tuple | None) -> None:
+    """Builds a new state from disk. Must be called with _reload_lock held."""
+    global _state
+    started = time.perf_counter()
+    error = None
+    data = None
+
+    if signature is None:
+        # Log this error for server-side visibility (consider using a proper logger)
+        print(f"CRITICAL: Archaeological data file not found at {PROOFS_PATH}")
+        error = MISSING_FILE_ERROR
+    else:
+        try:
+            with open(PROOFS_PATH, "r", encoding="utf-8") as f:  # Specify encoding
+                data = json.load(f)
+            if not isinstance(data, dict):
+                raise json.JSONDecodeError("Top-level value must be an object", "", 0)
+        except json.JSONDecodeError:
+            print(f"ERROR: Failed to decode JSON from {PROOFS_PATH}")
+            error = CORRUPTED_FILE_ERROR
+        except Exception as e:
+            print(f"ERROR: An unexpected error occurred while loading archaeological proofs: {str(e)}")
+            error = UNEXPECTED_ERROR
+
+    if error is not None:
+        _stats["load_errors"] += 1
+        if _state is not None and _state.index is not None:
+            # Keep serving the last good index; remember the bad signature so it is not re-read every check
+            print("WARNING: Keeping previously loaded archaeological proofs")
+            _state = _ProofState(_state.index, None, signature)
+        else:
+            _state = _ProofState(None, error, signature)
+        return
+
+    had_index = _state is not None and _state.index is not None
+    _state = _ProofState(MappingProxyType(build_proof_index(data)), None, signature)
+    _stats["loads"] += 1
+    if had_index:
+        _stats["reloads"] += 1
+    _stats["last_load_seconds"] = time.perf_counter() - started
+    _stats["loaded_at"] = time.time()
+    _stats["entries"] = len(data)
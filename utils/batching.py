@@ -0,0 +1,152 @@
+"""
+Dynamic micro-batching in front of a batch-capable function (the summarization model).
+
+Request threads submit work and get futures back. A single scheduler thread per process takes
+whatever is queued, waits up to `max_wait_ms` for more to arrive (or until `max_batch_size`
+items are collected), runs everything as one call and resolves the futures. Concurrent requests
+therefore share one padded forward pass instead of contending for the same torch threads.
+"""
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from utils.forksafe import per_process
+
+# Upper bounds of the histogram buckets; anything larger is counted under "+Inf"
+HISTOGRAM_BUCKETS = (1, 2, 4, 8, 16, 32, 64)
+
+
+def _empty_histogram() -> dict:
+    return {**{str(bound): 0 for bound in HISTOGRAM_BUCKETS}, "+Inf": 0}
+
+
+def _observe(histogram: dict, value: int) -> None:
+    for bound in HISTOGRAM_BUCKETS:
+        if value <= bound:
+            histogram[str(bound)] += 1
+            return
+    histogram["+Inf"] += 1
+
+
+class BatchFuture(Future):
+    """A Future that also tells how long its item waited in the queue and how long its batch ran."""
+
+    def __init__(self):
+        super().__init__()
+        self.submitted_at = time.perf_counter()
+        self.queued_seconds = None
+        self.run_seconds = None
+        self.batch_size = None
+
+
+class BatchScheduler:
+    """
+    Coalesces calls to `run_batch(items) -> results` (one result per item, same order) across
+    threads. Items submitted together with submit_many always end up in the same call.
+    """
+
+    def __init__(self, name: str, run_batch, max_batch_size: int = 8, max_wait_ms: float = 5.0):
+        self.name = name
+        self.run_batch = run_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self._lock = threading.Lock()
+        self._worker = per_process(self._start_worker)
+        self._pending = 0
+        self._stats = {"batches": 0, "items": 0, "errors": 0, "max_queue_depth": 0}
+        self._batch_sizes = _empty_histogram()
+        self._queue_depths = _empty_histogram()
+
+    def submit(self, item) -> BatchFuture:
+        return self.submit_many([item])[0]
+
+    def submit_many(self, items: list) -> list[BatchFuture]:
+        futures = [BatchFuture() for _ in items]
+        if not items:
+            return futures
+        work_queue = self._worker()
+        with self._lock:
+            self._pending += len(items)
+            self._stats["max_queue_depth"] = max(self._stats["max_queue_depth"], self._pending)
+        work_queue.put(list(zip(items, futures)))
+        return futures
+
+    def queue_depth(self) -> int:
+        """Items submitted but not yet picked up by a batch."""
+        return self._pending
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                **self._stats,
+                "queue_depth": self._pending,
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": self.max_wait_ms,
+                "batch_size_histogram": dict(self._batch_sizes),
+                "queue_depth_histogram": dict(self._queue_depths),
+            }
+
+    def reset_stats(self) -> None:
+        with self._lock:
+            for name in self._stats:
+                self._stats[name] = 0
+            self._batch_sizes = _empty_histogram()
+            self._queue_depths = _empty_histogram()
+
+    def _start_worker(self) -> queue.Queue:
+        work_queue = queue.Queue()
+        with self._lock:
+            # Work queued in the parent process is not coming to this one
+            self._pending = 0
+        threading.Thread(target=self._run, args=(work_queue,), name=f"{self.name}-batcher", daemon=True).start()
+        return work_queue
+
+    def _collect(self, work_queue: queue.Queue) -> list:
+        batch = work_queue.get()
+        deadline = time.monotonic() + self.max_wait_ms / 1000
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                batch.extend(work_queue.get(timeout=remaining) if remaining > 0 else work_queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self, work_queue: queue.Queue) -> None:
+        while True:
+            batch = self._collect(work_queue)
+            with self._lock:
+                # Depth seen by this batch: what it took plus what is still waiting behind it
+                _observe(self._queue_depths, self._pending)
+                _observe(self._batch_sizes, len(batch))
+                self._pending -= len(batch)
+                self._stats["batches"] += 1
+                self._stats["items"] += len(batch)
+
+            items = [item for item, _ in batch]
+            started = time.perf_counter()
+            try:
+                results = self.run_batch(items)
+                if len(results) != len(items):
+                    raise RuntimeError(f"{self.name} batch returned {len(results)} results for {len(items)} items")
+            except Exception as e:
+                self._stamp(batch, started)
+                logging.error(f"Batch of {len(items)} {self.name} item(s) failed: {e}")
+                with self._lock:
+                    self._stats["errors"] += 1
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            self._stamp(batch, started)
+            for (_, future), result in zip(batch, results):
+                future.set_result(result)
+
+    @staticmethod
+    def _stamp(batch: list, started: float) -> None:
+        # Set before the futures resolve, so whoever waits on one can read them right away
+        run_seconds = time.perf_counter() - started
+        for _, future in batch:
+            future.queued_seconds = started - future.submitted_at
+            future.run_seconds = run_seconds
+            future.batch_size = len(batch)
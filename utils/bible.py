@@ -1,9 +1,213 @@
-import requests
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote
+from utils import metrics
+from utils.books import book_key, resolve_book
+from utils.cache import MISSING, LRUCache, SQLiteStore, TwoTierCache
+from utils.corpus import get_local_corpus
+from utils.forksafe import per_process
+from utils.http_client import aget_with_retries, get_with_retries
+from utils.singleflight import SingleFlight
 
-def get_bible_verses(book: str, chapter: str) -> dict:
-    url = f"https://bible-api.com/{book}%20{chapter}?translation=kjv"
-    response = requests.get(url)
+DEFAULT_TRANSLATION = "kjv"
 
+# Where verses come from:
+#   "remote"            - bible-api.com (default)
+#   "local"             - the packed corpus at BIBLE_CORPUS_PATH only, no HTTP at all
+#   "local-then-remote" - the packed corpus, falling back to bible-api.com for anything it lacks
+BIBLE_BACKENDS = ("remote", "local", "local-then-remote")
+BIBLE_BACKEND = os.environ.get("BIBLE_BACKEND", "remote").lower()
+# Base URL of the remote backend; benchmarks point it at a local stand-in (benchmarks.fake_bible_api)
+BIBLE_API_URL = os.environ.get("BIBLE_API_URL", "https://bible-api.com").rstrip("/")
+
+# Verse cache settings. The KJV text never changes, so entries can live for a long time.
+# Set VERSE_CACHE_PATH to an empty string to disable the shared on-disk tier.
+_BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+VERSE_CACHE_TTL = float(os.environ.get("VERSE_CACHE_TTL", 30 * 24 * 3600))  # Seconds
+VERSE_CACHE_MAX_ENTRIES = int(os.environ.get("VERSE_CACHE_MAX_ENTRIES", 2048))  # In-process LRU
+VERSE_CACHE_DISK_MAX_ENTRIES = int(os.environ.get("VERSE_CACHE_DISK_MAX_ENTRIES", 50000))
+VERSE_CACHE_PATH = os.environ.get("VERSE_CACHE_PATH", os.path.join(_BASE_DIR, "..", "data", "cache", "verses.sqlite3"))
+BIBLE_CORPUS_PATH = os.environ.get("BIBLE_CORPUS_PATH", os.path.join(_BASE_DIR, "..", "data", "kjv.pack"))
+# Chapter ranges are fetched one chapter per task on a bounded pool shared by all request threads
+CHAPTER_FETCH_WORKERS = int(os.environ.get("CHAPTER_FETCH_WORKERS", 8))
+
+if BIBLE_BACKEND not in BIBLE_BACKENDS:
+    raise ValueError(f"BIBLE_BACKEND must be one of {', '.join(BIBLE_BACKENDS)}, got '{BIBLE_BACKEND}'")
+
+verse_cache = TwoTierCache(
+    "verses",
+    LRUCache(max_entries=VERSE_CACHE_MAX_ENTRIES, ttl=VERSE_CACHE_TTL),
+    SQLiteStore(VERSE_CACHE_PATH, ttl=VERSE_CACHE_TTL, max_entries=VERSE_CACHE_DISK_MAX_ENTRIES) if VERSE_CACHE_PATH else None,
+)
+# Upstream fetches in flight, by verse cache key
+_fetches = SingleFlight("fetch")
+
+
+def verse_cache_key(book: str, chapter: str, translation: str = DEFAULT_TRANSLATION) -> str:
+    # "1 John", "1st john" and "I Jn" all share a key (1JN); "3 - 5" and "3-5" do too
+    normalized_chapter = "".join(str(chapter).split())
+    return f"{translation.lower()}:{book_key(book)}:{normalized_chapter}"
+
+
+def get_bible_verses(book: str, chapter: str, translation: str = DEFAULT_TRANSLATION) -> dict:
+    # Unknown books and chapters past the end of a book are rejected without any upstream call
+    if not passage_exists(book, chapter):
+        return {"error": f"Book or chapter not found: {book} {chapter}"}
+    book = resolve_book(book).name
+    chapters = expand_chapter_range(chapter)
+    local = _get_local_passage(book, chapter, chapters, translation)
+    if local is not None:
+        return local
+
+    if len(chapters) == 1:
+        return _get_chapter(book, chapters[0], translation)
+
+    # Fetch each chapter concurrently (and cache it on its own), then reassemble in order.
+    # Iterating the results re-raises the first RequestException, which app.py turns into a 503.
+    results = list(_fetch_pool().map(lambda c: _get_chapter(book, c, translation), chapters))
+    return _join_chapters(chapters, results)
+
+
+async def get_bible_verses_async(book: str, chapter: str, translation: str = DEFAULT_TRANSLATION) -> dict:
+    """get_bible_verses for the ASGI app: chapters are fetched on the shared async client, without a thread each."""
+    if not passage_exists(book, chapter):
+        return {"error": f"Book or chapter not found: {book} {chapter}"}
+    book = resolve_book(book).name
+    chapters = expand_chapter_range(chapter)
+    local = _get_local_passage(book, chapter, chapters, translation)
+    if local is not None:
+        return local
+
+    if len(chapters) == 1:
+        return await _get_chapter_async(book, chapters[0], translation)
+    # Concurrency is bounded by the client's connection pool (UPSTREAM_POOL_SIZE)
+    results = await asyncio.gather(*(_get_chapter_async(book, c, translation) for c in chapters))
+    return _join_chapters(chapters, results)
+
+
+def passage_exists(book: str, chapter: str) -> bool:
+    """Whether `book` is a known book and every chapter of `chapter` (a chapter or a range) is within it."""
+    resolved = resolve_book(book)
+    chapters = expand_chapter_range(chapter)
+    return resolved is not None and all(1 <= int(c) <= resolved.chapters for c in chapters if c.isdigit())
+
+
+def expand_chapter_range(chapter: str) -> list[str]:
+    """
+    "3-5" -> ["3", "4", "5"]. Single chapters and anything that is not a well-formed
+    ascending range are returned unchanged as a one-element list.
+    """
+    chapter = "".join(str(chapter).split())
+    start, separator, end = chapter.partition("-")
+    if separator and start.isdigit() and end.isdigit() and int(start) <= int(end):
+        return [str(c) for c in range(int(start), int(end) + 1)]
+    return [chapter]
+
+
+def verse_cache_stats() -> dict:
+    return verse_cache.stats()
+
+
+metrics.register_collector(lambda: metrics.cache_samples("verses", verse_cache.stats()))
+
+
+def _get_local_passage(book: str, chapter: str, chapters: list[str], translation: str) -> dict | None:
+    """The passage from the packed corpus, an error if the corpus is the only backend, or None to fetch it remotely."""
+    if BIBLE_BACKEND == "remote":
+        return None
+    # The packed corpus serves a whole range as one contiguous slice
+    text = _get_local_text(book, chapter, translation)
+    if text is not None:
+        if len(chapters) == 1:
+            return {"text": text}
+        return {"text": text, "chapters": [{"chapter": c, "text": _get_local_text(book, c, translation)} for c in chapters]}
+    if BIBLE_BACKEND == "local":
+        return {"error": "Invalid book or chapter"}
+    return None
+
+
+def _join_chapters(chapters: list[str], results: list[dict]) -> dict:
+    for result in results:
+        if "error" in result:
+            return result
+    # Chapters are kept apart too, so ranges can be summarized chapter by chapter
+    texts = [{"chapter": c, "text": result["text"]} for c, result in zip(chapters, results) if result.get("text")]
+    return {"text": "\n".join(c["text"] for c in texts), "chapters": texts}
+
+
+def _get_stored_chapter(book: str, chapter: str, translation: str) -> dict | None:
+    if BIBLE_BACKEND == "local-then-remote":
+        # A range may be only partly present in the corpus; serve what it has chapter by chapter
+        text = _get_local_text(book, chapter, translation)
+        if text is not None:
+            return {"text": text}
+    cached = verse_cache.get(verse_cache_key(book, chapter, translation))
+    return cached if cached is not MISSING else None
+
+
+def _store_chapter(book: str, chapter: str, translation: str, result: dict) -> dict:
+    # Only successful lookups are cached; errors and empty chapters are retried next time
+    if "error" not in result and result.get("text"):
+        verse_cache.set(verse_cache_key(book, chapter, translation), result)
+    return result
+
+
+def _get_chapter(book: str, chapter: str, translation: str) -> dict:
+    stored = _get_stored_chapter(book, chapter, translation)
+    if stored is not None:
+        return stored
+    # Concurrent misses for the same chapter share one upstream call
+    return _fetches.do(verse_cache_key(book, chapter, translation), _fetch_chapter, book, chapter, translation)
+
+
+async def _get_chapter_async(book: str, chapter: str, translation: str) -> dict:
+    # The stores are SQLite (and may wait on a lock), so they are read and written off the event loop
+    stored = await asyncio.get_running_loop().run_in_executor(_fetch_pool(), _get_stored_chapter, book, chapter, translation)
+    if stored is not None:
+        return stored
+    return await _fetches.do_async(verse_cache_key(book, chapter, translation), _fetch_chapter_async, book, chapter, translation)
+
+
+def _fetch_chapter(book: str, chapter: str, translation: str) -> dict:
+    # A flight that finished between our cache miss and taking the lead has already stored it
+    # (in memory, which is checked without counting a second lookup)
+    stored = verse_cache.memory.get(verse_cache_key(book, chapter, translation))
+    if stored is not MISSING:
+        return stored
+    return _store_chapter(book, chapter, translation, _fetch_bible_verses(book, chapter, translation))
+
+
+async def _fetch_chapter_async(book: str, chapter: str, translation: str) -> dict:
+    stored = verse_cache.memory.get(verse_cache_key(book, chapter, translation))
+    if stored is not MISSING:
+        return stored
+    response = await aget_with_retries(_chapter_url(book, chapter, translation))
+    result = _verses_from_response(response)
+    return await asyncio.get_running_loop().run_in_executor(_fetch_pool(), _store_chapter, book, chapter, translation, result)
+
+
+_fetch_pool = per_process(lambda: ThreadPoolExecutor(max_workers=CHAPTER_FETCH_WORKERS, thread_name_prefix="chapter-fetch"))
+
+
+def _get_local_text(book: str, chapter: str, translation: str) -> str | None:
+    # Local lookups are a slice of a memory-mapped file, so they bypass the verse cache
+    corpus = get_local_corpus(BIBLE_CORPUS_PATH)
+    if corpus is None or corpus.translation != translation.lower():
+        return None
+    return corpus.get_text(book, chapter)
+
+
+def _chapter_url(book: str, chapter: str, translation: str) -> str:
+    return f"{BIBLE_API_URL}/{quote(book)}%20{chapter}?translation={translation}"
+
+
+def _fetch_bible_verses(book: str, chapter: str, translation: str) -> dict:
+    return _verses_from_response(get_with_retries(_chapter_url(book, chapter, translation)))
+
+
+def _verses_from_response(response) -> dict:
+    # requests and httpx responses alike
     if response.status_code != 200:
         return {"error": "Invalid book or chapter"}
 
@@ -0,0 +1,140 @@
+"""
+Canonical Bible book names.
+
+Every way a caller might spell a book ("1 Kings", "1st kings", "I Kgs", "1KI", "first kings")
+is reduced to an alias key and looked up in a table built once at import, so resolution is
+O(len(name)). Books are identified by their USFM code (GEN, 1KI, JHN, ...), which is what the
+verse cache, the local corpus and the archaeology index use as their key.
+"""
+import re
+from typing import NamedTuple
+
+
+class Book(NamedTuple):
+    id: str  # USFM book code, e.g. "1KI"
+    name: str  # Display name, also what bible-api.com expects, e.g. "1 Kings"
+    chapters: int
+
+
+# (id, name, chapter count, extra aliases). The name and id are always aliases too.
+_BOOK_TABLE = (
+    ("GEN", "Genesis", 50, ("gen", "ge", "gn", "genisis", "gensis")),
+    ("EXO", "Exodus", 40, ("exod", "exo", "ex", "exodos")),
+    ("LEV", "Leviticus", 27, ("lev", "le", "lv", "leviticas")),
+    ("NUM", "Numbers", 36, ("num", "nu", "nm", "nb", "number")),
+    ("DEU", "Deuteronomy", 34, ("deut", "de", "dt", "deutronomy", "deuteronomey")),
+    ("JOS", "Joshua", 24, ("josh", "jos", "jsh")),
+    ("JDG", "Judges", 21, ("judg", "jdg", "jg", "jdgs", "judge")),
+    ("RUT", "Ruth", 4, ("ru", "rth")),
+    ("1SA", "1 Samuel", 31, ("1 sam", "1 sa", "1 sm", "1 samual")),
+    ("2SA", "2 Samuel", 24, ("2 sam", "2 sa", "2 sm", "2 samual")),
+    ("1KI", "1 Kings", 22, ("1 kgs", "1 ki", "1 kin", "1 king")),
+    ("2KI", "2 Kings", 25, ("2 kgs", "2 ki", "2 kin", "2 king")),
+    ("1CH", "1 Chronicles", 29, ("1 chr", "1 ch", "1 chron", "1 chronicle")),
+    ("2CH", "2 Chronicles", 36, ("2 chr", "2 ch", "2 chron", "2 chronicle")),
+    ("EZR", "Ezra", 10, ("ezr",)),
+    ("NEH", "Nehemiah", 13, ("neh", "ne", "nehemia")),
+    ("EST", "Esther", 10, ("esth", "est", "es", "ester")),
+    ("JOB", "Job", 42, ("jb",)),
+    ("PSA", "Psalms", 150, ("ps", "psa", "psalm", "pss", "psm", "pslm", "palms", "salms")),
+    ("PRO", "Proverbs", 31, ("prov", "pro", "prv", "pr", "proverb")),
+    ("ECC", "Ecclesiastes", 12, ("eccl", "ecc", "ec", "eccles", "qoh", "qoheleth", "ecclesiates", "ecclesiastics")),
+    ("SNG", "Song of Solomon", 8, ("song", "sos", "so", "song of songs", "canticles", "canticle of canticles", "songs")),
+    ("ISA", "Isaiah", 66, ("isa", "is", "isiah", "isaih")),
+    ("JER", "Jeremiah", 52, ("jer", "je", "jr", "jeremia")),
+    ("LAM", "Lamentations", 5, ("lam", "la", "lamentation")),
+    ("EZK", "Ezekiel", 48, ("ezek", "eze", "ezk", "ezekial")),
+    ("DAN", "Daniel", 12, ("dan", "da", "dn")),
+    ("HOS", "Hosea", 14, ("hos", "ho")),
+    ("JOL", "Joel", 3, ("jl",)),
+    ("AMO", "Amos", 9, ("am",)),
+    ("OBA", "Obadiah", 1, ("obad", "ob", "obadia")),
+    ("JON", "Jonah", 4, ("jnh", "jona")),
+    ("MIC", "Micah", 7, ("mc", "mica")),
+    ("NAM", "Nahum", 3, ("nah", "na")),
+    ("HAB", "Habakkuk", 3, ("hab", "hb", "habbakuk", "habakuk", "habbakkuk")),
+    ("ZEP", "Zephaniah", 3, ("zeph", "zep", "zp", "zepheniah")),
+    ("HAG", "Haggai", 2, ("hag", "hg", "hagai")),
+    ("ZEC", "Zechariah", 14, ("zech", "zec", "zc", "zachariah", "zecharia")),
+    ("MAL", "Malachi", 4, ("mal", "ml")),
+    ("MAT", "Matthew", 28, ("matt", "mt", "mat", "mathew")),
+    ("MRK", "Mark", 16, ("mrk", "mk", "mr")),
+    ("LUK", "Luke", 24, ("luk", "lk")),
+    ("JHN", "John", 21, ("jn", "jhn", "joh")),
+    ("ACT", "Acts", 28, ("act", "ac", "acts of the apostles")),
+    ("ROM", "Romans", 16, ("rom", "ro", "rm", "roman")),
+    ("1CO", "1 Corinthians", 16, ("1 cor", "1 co", "1 corinthian")),
+    ("2CO", "2 Corinthians", 13, ("2 cor", "2 co", "2 corinthian")),
+    ("GAL", "Galatians", 6, ("gal", "ga", "galations")),
+    ("EPH", "Ephesians", 6, ("eph", "ephes", "ephesian")),
+    ("PHP", "Philippians", 4, ("phil", "php", "pp", "phillipians", "philipians", "phillippians")),
+    ("COL", "Colossians", 4, ("col", "colosians", "collosians")),
+    ("1TH", "1 Thessalonians", 5, ("1 thess", "1 thes", "1 th", "1 thessalonian")),
+    ("2TH", "2 Thessalonians", 3, ("2 thess", "2 thes", "2 th", "2 thessalonian")),
+    ("1TI", "1 Timothy", 6, ("1 tim", "1 ti", "1 timothey")),
+    ("2TI", "2 Timothy", 4, ("2 tim", "2 ti", "2 timothey")),
+    ("TIT", "Titus", 3, ("tit", "ti")),
+    ("PHM", "Philemon", 1, ("philem", "phm", "pm", "phile")),
+    ("HEB", "Hebrews", 13, ("heb", "hebrew")),
+    ("JAS", "James", 5, ("jas", "jm", "jms")),
+    ("1PE", "1 Peter", 5, ("1 pet", "1 pe", "1 pt")),
+    ("2PE", "2 Peter", 3, ("2 pet", "2 pe", "2 pt")),
+    ("1JN", "1 John", 5, ("1 jn", "1 jo", "1 jhn", "1 joh")),
+    ("2JN", "2 John", 1, ("2 jn", "2 jo", "2 jhn", "2 joh")),
+    ("3JN", "3 John", 1, ("3 jn", "3 jo", "3 jhn", "3 joh")),
+    ("JUD", "Jude", 1, ("jud", "jd")),
+    ("REV", "Revelation", 22, ("rev", "re", "revelations", "the revelation", "apocalypse", "revalation")),
+)
+
+BOOKS = tuple(Book(book_id, name, chapters) for book_id, name, chapters, _ in _BOOK_TABLE)
+BOOKS_BY_ID = {book.id: book for book in BOOKS}
+
+# Leading ordinal: digits may be glued to the name ("1kings", "1stkings"); Roman numerals and
+# words must be followed by a space so that "isaiah" is not read as "I saiah".
+_ORDINAL_PREFIX = re.compile(r"^(?:([123])(?:st|nd|rd)?|(iii|ii|i|first|second|third)(?= ))\s*")
+_ORDINAL_VALUES = {"i": "1", "first": "1", "ii": "2", "second": "2", "iii": "3", "third": "3"}
+_NON_ALNUM = re.compile(r"[^0-9a-z]+")
+
+
+def alias_key(name: str) -> str:
+    """
+    Reduces a book name to its lookup key: lowercase, punctuation and spaces removed and a
+    leading ordinal turned into a digit. "1st Kings", "I Kings" and "1kings" all become "1kings".
+    """
+    text = _NON_ALNUM.sub(" ", str(name).lower()).strip()
+    match = _ORDINAL_PREFIX.match(text)
+    if match:
+        number = match.group(1) or _ORDINAL_VALUES[match.group(2)]
+        text = number + text[match.end():]
+    return text.replace(" ", "")
+
+
+def _build_alias_index() -> dict:
+    index = {}
+    for book_id, name, _, aliases in _BOOK_TABLE:
+        for alias in (book_id, name, *aliases):
+            key = alias_key(alias)
+            existing = index.get(key)
+            if existing is not None and existing.id != book_id:
+                raise ValueError(f"Book alias '{alias}' is ambiguous between {existing.id} and {book_id}")
+            index[key] = BOOKS_BY_ID[book_id]
+    return index
+
+
+_ALIASES = _build_alias_index()
+
+
+def resolve_book(name: str) -> Book | None:
+    """Returns the canonical Book for any recognized spelling of `name`, or None."""
+    if not isinstance(name, str):
+        return None
+    return _ALIASES.get(alias_key(name))
+
+
+def book_key(name: str) -> str:
+    """
+    Stable key for data keyed by book: the canonical id when the book is recognized, otherwise
+    the alias key, so datasets with non-canonical entries still match themselves consistently.
+    """
+    book = resolve_book(name)
+    return book.id if book is not None else alias_key(name)
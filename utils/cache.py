@@ -0,0 +1,240 @@
+import contextvars
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+# Sentinel returned on a cache miss so that falsy values (e.g. "") can still be cached.
+MISSING = object()
+
+# Lookups of the current request, while it is inside track_lookups()
+_LOOKUP_RESULTS = {"memory_hits": "memory_hit", "disk_hits": "disk_hit", "misses": "miss"}
+_tracked_lookups = contextvars.ContextVar("tracked_lookups", default=None)
+
+
+@contextmanager
+def track_lookups():
+    """Collects (cache name, "memory_hit" | "disk_hit" | "miss") for every TwoTierCache lookup made in the block."""
+    lookups = []
+    token = _tracked_lookups.set(lookups)
+    try:
+        yield lookups
+    finally:
+        _tracked_lookups.reset(token)
+
+
+def thread_connection(local: threading.local, path: str, timeout: float, schema: tuple[str, ...] = (), row_factory=None) -> sqlite3.Connection:
+    """
+    This thread's connection to the SQLite file at `path`, kept on `local`. The first call in a
+    thread creates the file's directory, opens it in WAL mode (so every process on the host can
+    share it) in autocommit and runs the `schema` statements.
+    """
+    conn = getattr(local, "conn", None)
+    if conn is None:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(path, timeout=timeout, isolation_level=None)
+        conn.row_factory = row_factory
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        for statement in schema:
+            conn.execute(statement)
+        local.conn = conn
+    return conn
+
+
+class LRUCache:
+    """
+    Thread-safe in-process LRU cache.
+    Entries expire after `ttl` seconds (None disables expiry). The cache is bounded by
+    `max_entries` and, optionally, by `max_bytes` using the size passed to `set`.
+    """
+
+    def __init__(self, max_entries: int = 1024, max_bytes: int | None = None, ttl: float | None = None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._data = OrderedDict()  # key -> (value, size, stored_at)
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return MISSING
+            value, size, stored_at = entry
+            if self.ttl and time.time() - stored_at > self.ttl:
+                self._remove(key)
+                return MISSING
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value, size: int = 0) -> None:
+        if self.max_bytes is not None and size > self.max_bytes:
+            return  # Would evict everything else and still not fit
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+            self._data[key] = (value, size, time.time())
+            self._bytes += size
+            while len(self._data) > self.max_entries or (self.max_bytes is not None and self._bytes > self.max_bytes):
+                self._remove(next(iter(self._data)))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    @property
+    def size_bytes(self) -> int:
+        return self._bytes
+
+    def _remove(self, key: str) -> None:
+        _, size, _ = self._data.pop(key)
+        self._bytes -= size
+
+
+class SQLiteStore:
+    """
+    Persistent key/value store backed by a single SQLite file.
+    WAL mode lets every gunicorn worker on the host read and write the same file.
+    Values are stored as JSON text. Storage errors are logged and treated as misses,
+    so a broken cache file never fails a request.
+    """
+
+    # Prune the table every N writes rather than on every write
+    PRUNE_EVERY = 100
+
+    def __init__(self, path: str, ttl: float | None = None, max_entries: int | None = None):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._local = threading.local()
+        self._writes = 0
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        return thread_connection(self._local, self.path, timeout=5, schema=(
+            "CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value TEXT NOT NULL, stored_at REAL NOT NULL)",
+        ))
+
+    def get(self, key: str):
+        try:
+            row = self._connect().execute("SELECT value, stored_at FROM cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return MISSING
+            value, stored_at = row
+            if self.ttl and time.time() - stored_at > self.ttl:
+                self._connect().execute("DELETE FROM cache WHERE key = ?", (key,))
+                return MISSING
+            return json.loads(value)
+        except (sqlite3.Error, ValueError) as e:
+            logging.warning(f"Cache store {self.path} read failed: {e}")
+            return MISSING
+
+    def set(self, key: str, value) -> None:
+        try:
+            conn = self._connect()
+            conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, stored_at) VALUES (?, ?, ?)",
+                (key, json.dumps(value), time.time()),
+            )
+            with self._lock:
+                self._writes += 1
+                should_prune = self._writes % self.PRUNE_EVERY == 0
+            if should_prune:
+                self.prune()
+        except (sqlite3.Error, TypeError, ValueError) as e:
+            logging.warning(f"Cache store {self.path} write failed: {e}")
+
+    def prune(self) -> None:
+        """Drops expired entries, then the oldest entries beyond `max_entries`."""
+        conn = self._connect()
+        if self.ttl:
+            conn.execute("DELETE FROM cache WHERE stored_at < ?", (time.time() - self.ttl,))
+        if self.max_entries:
+            conn.execute(
+                "DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY stored_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+
+    def clear(self) -> None:
+        try:
+            self._connect().execute("DELETE FROM cache")
+        except sqlite3.Error as e:
+            logging.warning(f"Cache store {self.path} clear failed: {e}")
+
+    def __len__(self) -> int:
+        try:
+            return self._connect().execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+        except sqlite3.Error:
+            return 0
+
+
+class TwoTierCache:
+    """
+    In-process LRU in front of an optional shared SQLiteStore.
+    Disk hits are promoted into memory. Hit/miss counters are available via `stats()`.
+    """
+
+    def __init__(self, name: str, memory: LRUCache, disk: SQLiteStore | None = None):
+        self.name = name
+        self.memory = memory
+        self.disk = disk
+        self._counters = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "sets": 0}
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        value = self.memory.get(key)
+        if value is not MISSING:
+            self._count("memory_hits")
+            return value
+        if self.disk is not None:
+            value = self.disk.get(key)
+            if value is not MISSING:
+                self.memory.set(key, value, self._size_of(value))
+                self._count("disk_hits")
+                return value
+        self._count("misses")
+        return MISSING
+
+    def set(self, key: str, value) -> None:
+        self.memory.set(key, value, self._size_of(value))
+        if self.disk is not None:
+            self.disk.set(key, value)
+        self._count("sets")
+
+    def clear(self) -> None:
+        self.memory.clear()
+        if self.disk is not None:
+            self.disk.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._counters)
+        lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_ratio"] = (stats["memory_hits"] + stats["disk_hits"]) / lookups if lookups else 0.0
+        stats["memory_entries"] = len(self.memory)
+        stats["memory_bytes"] = self.memory.size_bytes
+        return stats
+
+    def _count(self, counter: str) -> None:
+        with self._lock:
+            self._counters[counter] += 1
+        lookups = _tracked_lookups.get()
+        if lookups is not None and counter in _LOOKUP_RESULTS:
+            lookups.append((self.name, _LOOKUP_RESULTS[counter]))
+
+    def _size_of(self, value) -> int:
+        if self.memory.max_bytes is None:
+            return 0
+        return len(json.dumps(value).encode("utf-8"))
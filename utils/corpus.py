@@ -0,0 +1,249 @@
+"""
+Local Bible corpus backend.
+
+A KJV dump (JSON, CSV or USFM) is ingested once into a packed file:
+
+    MAGIC | index length (8 bytes, little endian) | JSON index | UTF-8 chapter text
+
+Each book's chapters are written back to back, one verse per line, so a chapter range
+such as "1-3" is a single contiguous slice of the memory-mapped text. The index maps
+canonical book id (see utils.books) -> chapter -> [offset, length] relative to the start
+of the text block.
+
+Build a packed file with:
+    python -m utils.corpus path/to/kjv.json data/kjv.pack
+"""
+import argparse
+import csv
+import json
+import logging
+import mmap
+import os
+import re
+import struct
+import threading
+from utils.books import book_key
+
+MAGIC = b"BIBLPK1\n"
+_HEADER = struct.Struct("<Q")
+
+
+# --- Ingestion ---
+
+def _add_verse(books: dict, book: str, chapter, verse, text: str) -> None:
+    chapters = books.setdefault(str(book).strip(), {})
+    chapters.setdefault(int(chapter), {})[int(verse)] = " ".join(str(text).split())
+
+
+def read_json(path: str) -> dict:
+    """
+    Accepts either a flat list of verse records ({"book_name"|"book", "chapter", "verse", "text"},
+    optionally wrapped in {"verses": [...]}) or a nested {book: {chapter: {verse: text}}} mapping,
+    where a chapter may also be a plain list of verse texts.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    if isinstance(data, dict) and isinstance(data.get("verses"), list):
+        data = data["verses"]
+
+    books = {}
+    if isinstance(data, list):
+        for record in data:
+            book = record.get("book_name") or record.get("book")
+            _add_verse(books, book, record["chapter"], record["verse"], record["text"])
+    elif isinstance(data, dict):
+        for book, chapters in data.items():
+            for chapter, verses in chapters.items():
+                if isinstance(verses, list):
+                    verses = {i: text for i, text in enumerate(verses, start=1)}
+                for verse, text in verses.items():
+                    _add_verse(books, book, chapter, verse, text)
+    else:
+        raise ValueError(f"Unrecognized JSON layout in {path}")
+    return books
+
+
+def read_csv(path: str) -> dict:
+    """Expects a header row with book (or book_name), chapter, verse and text columns."""
+    books = {}
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        for row in csv.DictReader(f):
+            row = {k.strip().lower(): v for k, v in row.items() if k}
+            book = row.get("book_name") or row.get("book")
+            _add_verse(books, book, row["chapter"], row["verse"], row["text"])
+    return books
+
+
+# Footnotes and cross references are dropped, \w word|attrs\w* keeps the word, and lines
+# holding headings or metadata are removed before verses are split out.
+_USFM_NOTE = re.compile(r"\\(f|x|fe)\s.*?\\\1\*", re.DOTALL)
+_USFM_WORD_ATTRS = re.compile(r"\|[^\\]*")
+_USFM_MARKER = re.compile(r"\\\+?[a-z]+[0-9]*\*?")
+_USFM_NON_TEXT_LINE = re.compile(r"^\\(?:id|ide|h|toc\d*|mt\d*|ms\d*|mr|s\d*|r|d|rem|sts|cl|cp|sp)\b.*$", re.MULTILINE)
+_USFM_STRUCTURE = re.compile(r"\\(c|v)\s+")
+
+
+def read_usfm(path: str) -> dict:
+    """Reads a single .usfm file or a directory of .usfm/.sfm files (one book per file)."""
+    if os.path.isdir(path):
+        files = sorted(os.path.join(path, name) for name in os.listdir(path) if name.lower().endswith((".usfm", ".sfm")))
+    else:
+        files = [path]
+
+    books = {}
+    for file_path in files:
+        with open(file_path, "r", encoding="utf-8-sig") as f:
+            content = f.read()
+        # Prefer the running header (\h Genesis) and fall back to the book code (\id GEN)
+        header = re.search(r"^\\h\s+(.+)$", content, re.MULTILINE) or re.search(r"^\\id\s+(\S+)", content, re.MULTILINE)
+        if header is None:
+            raise ValueError(f"{file_path} has no \\h or \\id marker")
+        book = header.group(1).strip()
+
+        content = _USFM_NON_TEXT_LINE.sub("", _USFM_NOTE.sub("", content))
+        parts = _USFM_STRUCTURE.split(content)
+        chapter = None
+        # parts is [preamble, marker, body, marker, body, ...]
+        for marker, body in zip(parts[1::2], parts[2::2]):
+            number, text = (body.split(None, 1) + [""])[:2]
+            if marker == "c":
+                chapter = int(number)
+            elif chapter is not None:
+                verse = int(re.match(r"\d+", number).group())
+                _add_verse(books, book, chapter, verse, _USFM_MARKER.sub("", _USFM_WORD_ATTRS.sub("", text)))
+    return books
+
+
+READERS = {"json": read_json, "csv": read_csv, "usfm": read_usfm}
+
+
+def detect_format(path: str) -> str:
+    if os.path.isdir(path):
+        return "usfm"
+    extension = os.path.splitext(path)[1].lower().lstrip(".")
+    return "usfm" if extension == "sfm" else extension
+
+
+def build_packed_corpus(books: dict, output_path: str, translation: str = "kjv") -> dict:
+    """Writes `books` ({book: {chapter: {verse: text}}}) to `output_path` and returns the index."""
+    text_parts = []
+    offset = 0
+    index_books = {}
+    for book, chapters in books.items():
+        entry = {"name": book, "chapters": {}}
+        for chapter in sorted(chapters):
+            verses = chapters[chapter]
+            encoded = "\n".join(verses[v] for v in sorted(verses)).encode("utf-8")
+            entry["chapters"][str(chapter)] = [offset, len(encoded)]
+            # Newline separator between chapters so that range slices keep one verse per line
+            text_parts.append(encoded + b"\n")
+            offset += len(encoded) + 1
+        index_books[book_key(book)] = entry
+
+    index = {"translation": translation.lower(), "books": index_books}
+    index_bytes = json.dumps(index, separators=(",", ":")).encode("utf-8")
+    tmp_path = f"{output_path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(MAGIC)
+        f.write(_HEADER.pack(len(index_bytes)))
+        f.write(index_bytes)
+        for part in text_parts:
+            f.write(part)
+    os.replace(tmp_path, output_path)  # Readers never see a half-written file
+    return index
+
+
+# --- Lookup ---
+
+class LocalCorpus:
+    """Read-only view over a packed corpus file, served from a memory-mapped buffer."""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self._buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._buffer[:len(MAGIC)] != MAGIC:
+            self._buffer.close()
+            raise ValueError(f"{path} is not a packed Bible corpus")
+        (index_length,) = _HEADER.unpack_from(self._buffer, len(MAGIC))
+        index_start = len(MAGIC) + _HEADER.size
+        index = json.loads(self._buffer[index_start:index_start + index_length])
+        self.translation = index["translation"]
+        self.books = index["books"]
+        self._data_start = index_start + index_length
+
+    def get_text(self, book: str, chapter: str) -> str | None:
+        """Returns the text of a chapter or an inclusive chapter range ("1-3"), or None if not present."""
+        entry = self.books.get(book_key(book))
+        if entry is None:
+            return None
+        chapter = "".join(str(chapter).split())
+        start_chapter, _, end_chapter = chapter.partition("-")
+        end_chapter = end_chapter or start_chapter
+        if not (start_chapter.isdigit() and end_chapter.isdigit()):
+            return None
+
+        chapters = entry["chapters"]
+        span = [chapters.get(str(c)) for c in range(int(start_chapter), int(end_chapter) + 1)]
+        if not span or None in span:
+            return None
+        start = self._data_start + span[0][0]
+        end = self._data_start + span[-1][0] + span[-1][1]
+        return self._buffer[start:end].decode("utf-8")
+
+    def close(self) -> None:
+        self._buffer.close()
+
+
+_corpus = None
+_corpus_lock = threading.Lock()
+# (path, mtime or None if missing) of the last file that could not be opened
+_failed = None
+
+
+def get_local_corpus(path: str) -> LocalCorpus | None:
+    """
+    Opens the packed corpus at `path` once per process. Returns None if it is missing or invalid;
+    that is logged once, and the file is only tried again once it appears or changes.
+    """
+    global _corpus, _failed
+    if _corpus is not None and _corpus.path == path:
+        return _corpus
+    try:
+        signature = (path, os.stat(path).st_mtime)
+    except OSError:
+        signature = (path, None)
+    if _failed == signature:
+        return None
+    with _corpus_lock:
+        if _corpus is None or _corpus.path != path:
+            try:
+                _corpus = LocalCorpus(path)
+            except (OSError, ValueError) as e:
+                if _failed != signature:
+                    logging.error(f"Local Bible corpus unavailable at {path}: {e}")
+                _failed = signature
+                return None
+            _failed = None
+    return _corpus
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Ingest a Bible dump into a packed corpus file.")
+    parser.add_argument("source", help="JSON/CSV file, USFM file or directory of USFM files")
+    parser.add_argument("output", help="Path of the packed corpus to write (e.g. data/kjv.pack)")
+    parser.add_argument("--format", choices=sorted(READERS), help="Input format (default: from file extension)")
+    parser.add_argument("--translation", default="kjv", help="Translation id stored in the corpus (default: kjv)")
+    args = parser.parse_args(argv)
+
+    source_format = args.format or detect_format(args.source)
+    if source_format not in READERS:
+        parser.error(f"Cannot infer input format from {args.source}; pass --format")
+    books = READERS[source_format](args.source)
+    index = build_packed_corpus(books, args.output, args.translation)
+    chapter_count = sum(len(entry["chapters"]) for entry in index["books"].values())
+    print(f"Wrote {len(index['books'])} books / {chapter_count} chapters to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""
+Extractive summarization: picks the most representative verses instead of generating text.
+
+Each verse is a TF-IDF vector (sublinear term frequency times inverse document frequency). The
+summary is the verses closest to the passage's centroid, up to EXTRACTIVE_MAX_WORDS, in reading
+order. The scoring is done over the non-zero (verse, term) entries with NumPy, so a chapter takes
+a few milliseconds and never touches the transformer.
+
+IDF statistics come from the whole corpus when IDF_PATH exists (chapters are the documents):
+
+    python -m utils.extractive --corpus data/kjv.pack --output data/idf.json
+
+Without that file the passage's own verses are used as the documents.
+"""
+import argparse
+import json
+import logging
+import math
+import os
+import re
+import threading
+import numpy as np
+from utils.books import BOOKS
+
+_BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+IDF_PATH = os.environ.get("EXTRACTIVE_IDF_PATH", os.path.join(_BASE_DIR, "..", "data", "idf.json"))
+# Roughly the length of an abstractive summary (SUMMARY_MAX_LENGTH tokens)
+EXTRACTIVE_MAX_WORDS = int(os.environ.get("EXTRACTIVE_MAX_WORDS", 110))
+
+_WORD = re.compile(r"[a-z]+(?:'[a-z]+)?")
+_SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?;:])\s+")
+
+_idf = None
+_idf_loaded = False
+_idf_lock = threading.Lock()
+
+
+def summarize_extractive(text: str, max_words: int | None = None) -> str:
+    """Returns the highest-scoring verses of `text`, at most `max_words` words, in their original order."""
+    max_words = EXTRACTIVE_MAX_WORDS if max_words is None else max_words
+    units = [line.strip() for line in text.splitlines() if line.strip()]
+    if len(units) == 1:
+        # A single paragraph: score its sentences instead
+        units = [sentence for sentence in _SENTENCE_BOUNDARY.split(units[0]) if sentence]
+    if len(units) <= 1:
+        return " ".join(units)
+
+    scores = score_units(units)
+    chosen = []
+    words = 0
+    for i in np.argsort(-scores, kind="stable"):
+        length = len(units[i].split())
+        if chosen and words + length > max_words:
+            break  # Filling the budget with lower-ranked short verses would dilute the summary
+        chosen.append(i)
+        words += length
+    return " ".join(units[i] for i in sorted(chosen))
+
+
+def score_units(units: list[str]) -> np.ndarray:
+    """Cosine similarity of each unit's TF-IDF vector to the centroid of all of them."""
+    vocabulary = {}
+    rows = []
+    cols = []
+    for row, unit in enumerate(units):
+        for word in _WORD.findall(unit.lower()):
+            rows.append(row)
+            cols.append(vocabulary.setdefault(word, len(vocabulary)))
+    n_units, n_terms = len(units), len(vocabulary)
+    if not n_terms:
+        return np.zeros(n_units)
+
+    # Sparse (row, term) -> count, as parallel arrays of the non-zero entries
+    keys, counts = np.unique(np.asarray(rows, dtype=np.int64) * n_terms + np.asarray(cols, dtype=np.int64), return_counts=True)
+    entry_rows = keys // n_terms
+    entry_cols = keys % n_terms
+
+    idf = _idf_vector(vocabulary, entry_cols, n_units)
+    weights = (1.0 + np.log(counts)) * idf[entry_cols]
+    norms = np.sqrt(np.bincount(entry_rows, weights * weights, minlength=n_units))
+    norms[norms == 0] = 1.0
+    weights /= norms[entry_rows]
+    centroid = np.bincount(entry_cols, weights, minlength=n_terms)
+    return np.bincount(entry_rows, weights * centroid[entry_cols], minlength=n_units)
+
+
+def _idf_vector(vocabulary: dict, entry_cols: np.ndarray, n_units: int) -> np.ndarray:
+    corpus_idf = get_idf()
+    if corpus_idf is not None:
+        unseen = corpus_idf["unseen"]
+        terms = corpus_idf["terms"]
+        return np.fromiter((terms.get(word, unseen) for word in vocabulary), dtype=np.float64, count=len(vocabulary))
+    # No corpus statistics: document frequency over the passage's own units
+    document_frequency = np.bincount(entry_cols, minlength=len(vocabulary))
+    return np.log((1.0 + n_units) / (1.0 + document_frequency)) + 1.0
+
+
+def get_idf() -> dict | None:
+    """The corpus IDF table {"documents", "unseen", "terms": {word: idf}}, loaded once; None if there is none."""
+    global _idf, _idf_loaded
+    if not _idf_loaded:
+        with _idf_lock:
+            if not _idf_loaded:
+                if os.path.exists(IDF_PATH):
+                    try:
+                        with open(IDF_PATH, "r", encoding="utf-8") as f:
+                            _idf = json.load(f)
+                    except (OSError, ValueError) as e:
+                        logging.warning(f"Could not load IDF statistics from {IDF_PATH}: {e}")
+                _idf_loaded = True
+    return _idf
+
+
+def build_idf(documents) -> dict:
+    """IDF over `documents` (an iterable of texts): log((1 + N) / (1 + df)) + 1. Unseen terms get df = 0."""
+    document_frequency = {}
+    n_documents = 0
+    for text in documents:
+        n_documents += 1
+        for word in set(_WORD.findall(text.lower())):
+            document_frequency[word] = document_frequency.get(word, 0) + 1
+    return {
+        "documents": n_documents,
+        "unseen": math.log(1 + n_documents) + 1,
+        "terms": {word: math.log((1 + n_documents) / (1 + df)) + 1 for word, df in sorted(document_frequency.items())},
+    }
+
+
+def main(argv=None) -> None:
+    from utils.bible import BIBLE_CORPUS_PATH
+    from utils.corpus import LocalCorpus
+
+    parser = argparse.ArgumentParser(description="Precompute corpus IDF statistics for extractive summaries.")
+    parser.add_argument("--corpus", default=BIBLE_CORPUS_PATH, help=f"Packed corpus (default: {BIBLE_CORPUS_PATH})")
+    parser.add_argument("--output", default=IDF_PATH, help=f"IDF file to write (default: {IDF_PATH})")
+    args = parser.parse_args(argv)
+
+    corpus = LocalCorpus(args.corpus)
+    chapters = (corpus.get_text(book.id, str(chapter)) for book in BOOKS for chapter in range(1, book.chapters + 1))
+    idf = build_idf(text for text in chapters if text)
+    corpus.close()
+
+    tmp_path = f"{args.output}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(idf, f)
+    os.replace(tmp_path, args.output)
+    print(f"Wrote IDF for {len(idf['terms'])} terms over {idf['documents']} chapters to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+"""
+Per-process lazy state for thread pools, background threads and connection pools.
+
+Threads do not survive fork(), so anything owning one has to be created again in each gunicorn
+worker rather than inherited from the preloading master. per_process(factory) returns a callable
+that makes factory() on its first call in each process and returns that same object afterwards:
+
+    _fetch_pool = per_process(lambda: ThreadPoolExecutor(max_workers=8))
+    _fetch_pool().map(...)
+"""
+import os
+import threading
+
+
+class PerProcess:
+    def __init__(self, factory):
+        self._factory = factory
+        self._value = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def __call__(self):
+        pid = os.getpid()
+        if self._pid != pid:
+            with self._lock:
+                if self._pid != pid:
+                    self._value = self._factory()
+                    self._pid = pid
+        return self._value
+
+    def current(self):
+        """The object made in this process, or None if it has not been made here yet."""
+        return self._value if self._pid == os.getpid() else None
+
+    def clear(self) -> None:
+        """Forgets the object, so the next call makes a new one."""
+        with self._lock:
+            self._value, self._pid = None, None
+
+
+def per_process(factory) -> PerProcess:
+    return PerProcess(factory)
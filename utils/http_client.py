@@ -0,0 +1,233 @@
+"""
+Shared HTTP client for upstream calls (bible-api.com).
+
+Each worker process keeps one pooled keep-alive `requests.Session`, so repeated calls reuse
+TCP+TLS connections instead of handshaking every time. Every call has connect/read timeouts,
+a bounded number of retries with jittered exponential backoff, and an overall deadline, so a
+stalled upstream cannot pin a gunicorn thread indefinitely.
+
+The ASGI app (asgi.py) makes the same calls with aget_with_retries() on one pooled
+httpx.AsyncClient per event loop, from the optional `httpx` package.
+"""
+import asyncio
+import logging
+import os
+import random
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from utils import metrics
+from utils.forksafe import per_process
+
+# Pool size should match the number of threads that can call upstream at once in one worker
+# (utils.bible.CHAPTER_FETCH_WORKERS). Extra concurrent callers open short-lived connections instead of blocking.
+UPSTREAM_POOL_SIZE = int(os.environ.get("UPSTREAM_POOL_SIZE", 8))
+# Connections of the async client. Waiting requests hold no thread there, so the whole worker shares one larger pool.
+UPSTREAM_ASYNC_POOL_SIZE = int(os.environ.get("UPSTREAM_ASYNC_POOL_SIZE", 100))
+UPSTREAM_CONNECT_TIMEOUT = float(os.environ.get("UPSTREAM_CONNECT_TIMEOUT", 3.05))  # Seconds
+UPSTREAM_READ_TIMEOUT = float(os.environ.get("UPSTREAM_READ_TIMEOUT", 10))  # Seconds
+UPSTREAM_MAX_RETRIES = int(os.environ.get("UPSTREAM_MAX_RETRIES", 2))  # Retries after the first attempt
+UPSTREAM_BACKOFF = float(os.environ.get("UPSTREAM_BACKOFF", 0.25))  # Base backoff in seconds
+UPSTREAM_DEADLINE = float(os.environ.get("UPSTREAM_DEADLINE", 15))  # Total budget per call, retries included
+
+# Upstream statuses that are worth retrying; anything else is returned to the caller as-is
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+_async_client = None
+_async_client_loop = None
+_counters = {"requests": 0, "retries": 0, "deadline_exceeded": 0}
+_counters_lock = threading.Lock()
+
+
+class DeadlineExceeded(requests.exceptions.Timeout):
+    """Raised when retries run out of the per-call time budget."""
+
+
+def _new_session() -> requests.Session:
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=UPSTREAM_POOL_SIZE, max_retries=0)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+# This process's pooled session, made on first use (and again after a fork)
+get_session = per_process(_new_session)
+
+
+def get_with_retries(url: str, deadline: float | None = None, **kwargs) -> requests.Response:
+    """
+    GETs `url` on the shared session. Connection errors, timeouts and RETRY_STATUSES are retried
+    up to UPSTREAM_MAX_RETRIES times with full-jitter backoff, as long as the `deadline` budget
+    (seconds, default UPSTREAM_DEADLINE) allows. Raises requests.exceptions.RequestException if
+    every attempt fails; otherwise returns the last response.
+    """
+    budget = UPSTREAM_DEADLINE if deadline is None else deadline
+    expires_at = time.monotonic() + budget
+    session = get_session()
+    attempt = 0
+    while True:
+        remaining = expires_at - time.monotonic()
+        if remaining <= 0:
+            _count("deadline_exceeded")
+            raise DeadlineExceeded(f"Upstream deadline of {budget}s exceeded for {url}")
+
+        _count("requests")
+        error = None
+        response = None
+        try:
+            response = session.get(
+                url,
+                timeout=(min(UPSTREAM_CONNECT_TIMEOUT, remaining), min(UPSTREAM_READ_TIMEOUT, remaining)),
+                **kwargs,
+            )
+            metrics.inc("upstream_responses_total", status=str(response.status_code))
+            if response.status_code not in RETRY_STATUSES:
+                return response
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+            metrics.inc("upstream_responses_total", status="error")
+            error = e
+
+        if attempt >= UPSTREAM_MAX_RETRIES:
+            if error is not None:
+                raise error
+            return response
+
+        delay = random.uniform(0, UPSTREAM_BACKOFF * (2 ** attempt))
+        if time.monotonic() + delay >= expires_at:
+            # Not enough budget left for another attempt
+            if error is not None:
+                _count("deadline_exceeded")
+                raise DeadlineExceeded(f"Upstream deadline of {budget}s exceeded for {url}") from error
+            return response
+        if response is not None:
+            response.close()  # Release the connection back to the pool before sleeping
+        logging.warning(
+            f"Upstream GET {url} failed ({error or response.status_code}), retry {attempt + 1}/{UPSTREAM_MAX_RETRIES} in {delay:.2f}s"
+        )
+        time.sleep(delay)
+        attempt += 1
+        _count("retries")
+
+
+def get_async_client():
+    """Returns the running event loop's pooled httpx.AsyncClient, creating it on first use."""
+    global _async_client, _async_client_loop
+    loop = asyncio.get_running_loop()
+    if _async_client is None or _async_client_loop is not loop:
+        import httpx # Optional: only the ASGI app needs it
+
+        limits = httpx.Limits(max_connections=UPSTREAM_ASYNC_POOL_SIZE, max_keepalive_connections=UPSTREAM_ASYNC_POOL_SIZE)
+        _async_client, _async_client_loop = httpx.AsyncClient(limits=limits), loop
+    return _async_client
+
+
+async def aclose_async_client() -> None:
+    global _async_client, _async_client_loop
+    if _async_client is not None:
+        await _async_client.aclose()
+    _async_client, _async_client_loop = None, None
+
+
+async def aget_with_retries(url: str, deadline: float | None = None, **kwargs):
+    """
+    get_with_retries on the shared async client, with the same retries, backoff and deadline.
+    Connection errors and timeouts are raised as the requests exceptions get_with_retries raises,
+    so callers handle both the same way. Returns the last httpx.Response otherwise.
+    """
+    import httpx
+
+    budget = UPSTREAM_DEADLINE if deadline is None else deadline
+    expires_at = time.monotonic() + budget
+    client = get_async_client()
+    attempt = 0
+    while True:
+        remaining = expires_at - time.monotonic()
+        if remaining <= 0:
+            _count("deadline_exceeded")
+            raise DeadlineExceeded(f"Upstream deadline of {budget}s exceeded for {url}")
+
+        _count("requests")
+        error = None
+        response = None
+        try:
+            # Waiting for a pooled connection counts against the deadline too
+            timeout = httpx.Timeout(min(UPSTREAM_READ_TIMEOUT, remaining), connect=min(UPSTREAM_CONNECT_TIMEOUT, remaining), pool=remaining)
+            response = await client.get(url, timeout=timeout, **kwargs)
+            metrics.inc("upstream_responses_total", status=str(response.status_code))
+            if response.status_code not in RETRY_STATUSES:
+                return response
+        except httpx.TimeoutException as e:
+            metrics.inc("upstream_responses_total", status="error")
+            error = requests.exceptions.Timeout(f"{type(e).__name__}: {e}")
+        except httpx.TransportError as e:
+            metrics.inc("upstream_responses_total", status="error")
+            error = requests.exceptions.ConnectionError(f"{type(e).__name__}: {e}")
+
+        if attempt >= UPSTREAM_MAX_RETRIES:
+            if error is not None:
+                raise error
+            return response
+
+        delay = random.uniform(0, UPSTREAM_BACKOFF * (2 ** attempt))
+        if time.monotonic() + delay >= expires_at:
+            if error is not None:
+                _count("deadline_exceeded")
+                raise DeadlineExceeded(f"Upstream deadline of {budget}s exceeded for {url}") from error
+            return response
+        logging.warning(
+            f"Upstream GET {url} failed ({error or response.status_code}), retry {attempt + 1}/{UPSTREAM_MAX_RETRIES} in {delay:.2f}s"
+        )
+        await asyncio.sleep(delay)
+        attempt += 1
+        _count("retries")
+
+
+def connection_stats() -> dict:
+    """Request/retry counters plus how many requests reused a pooled connection."""
+    with _counters_lock:
+        stats = dict(_counters)
+    opened = 0
+    sent = 0
+    session = get_session.current()
+    if session is not None:
+        for adapter in set(session.adapters.values()):
+            pools = adapter.poolmanager.pools
+            for key in list(pools.keys()):
+                pool = pools.get(key)
+                if pool is not None:
+                    opened += pool.num_connections
+                    sent += pool.num_requests
+    stats["connections_opened"] = opened
+    stats["connections_reused"] = max(sent - opened, 0)
+    return stats
+
+
+def _collect_metrics() -> list[tuple]:
+    stats = connection_stats()
+    return [
+        ("upstream_retries_total", {}, stats["retries"]),
+        ("upstream_deadline_exceeded_total", {}, stats["deadline_exceeded"]),
+        ("upstream_connections_opened_total", {}, stats["connections_opened"]),
+        ("upstream_connections_reused_total", {}, stats["connections_reused"]),
+    ]
+
+
+metrics.register_collector(_collect_metrics)
+
+
+def reset() -> None:
+    """Closes the shared session and zeroes the counters (used by tests)."""
+    session = get_session.current()
+    if session is not None:
+        session.close()
+    get_session.clear()
+    with _counters_lock:
+        for name in _counters:
+            _counters[name] = 0
+
+
+def _count(counter: str) -> None:
+    with _counters_lock:
+        _counters[counter] += 1
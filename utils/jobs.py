@@ -0,0 +1,236 @@
+"""
+Asynchronous summarization jobs for passages too long to summarize within one request.
+
+POST /jobs stores the job in an SQLite file (JOBS_DB_PATH) and returns its id right away. Worker
+threads in each server process claim queued jobs, highest priority first, and summarize them
+chapter by chapter. Each chapter's summary is saved as soon as it is done, and that is also the
+progress GET /jobs/<id> reports. A job whose process dies is picked up again by any process once
+its heartbeat is JOB_STALE_SECONDS old, and it resumes after the last saved chapter.
+
+Jobs share the model with interactive requests. Before each chapter a job waits while the model
+queue holds JOB_YIELD_QUEUE_DEPTH or more items, so /summarize traffic always goes first.
+"""
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from utils import bible, summarizer
+from utils.cache import thread_connection
+from utils.forksafe import per_process
+
+_BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+JOBS_DB_PATH = os.environ.get("JOBS_DB_PATH", os.path.join(_BASE_DIR, "..", "data", "jobs.sqlite3"))
+# Job threads per server process, i.e. jobs one process runs at the same time
+JOB_WORKERS = int(os.environ.get("JOB_WORKERS", 1))
+# Seconds without progress after which a running job is considered abandoned and requeued
+JOB_STALE_SECONDS = float(os.environ.get("JOB_STALE_SECONDS", 300))
+# Jobs hold back while at least this many interactive items wait for the model
+JOB_YIELD_QUEUE_DEPTH = int(os.environ.get("JOB_YIELD_QUEUE_DEPTH", 1))
+# Finished jobs are deleted after this many seconds
+JOB_RETENTION_SECONDS = float(os.environ.get("JOB_RETENTION_SECONDS", 7 * 24 * 3600))
+# Idle workers check the database for jobs submitted by other processes this often
+JOB_POLL_SECONDS = 1.0
+
+JOB_STATES = ("queued", "running", "done", "failed")
+
+
+class JobError(Exception):
+    """A job cannot complete (unknown passage, upstream or model error)."""
+
+
+class JobStore:
+    """
+    Job records in a single SQLite file, shared by every server process on the host (WAL mode).
+    Claiming is a single write transaction, so each job runs in one place at a time.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+
+    def _connect(self) -> sqlite3.Connection:
+        return thread_connection(self._local, self.path, timeout=10, row_factory=sqlite3.Row, schema=(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "id TEXT PRIMARY KEY, params TEXT NOT NULL, priority INTEGER NOT NULL, state TEXT NOT NULL, "
+            "done INTEGER NOT NULL DEFAULT 0, total INTEGER NOT NULL, result TEXT, error TEXT, "
+            "attempts INTEGER NOT NULL DEFAULT 0, created_at REAL NOT NULL, started_at REAL, "
+            "heartbeat_at REAL, finished_at REAL)",
+            "CREATE INDEX IF NOT EXISTS jobs_queue ON jobs (state, priority DESC, created_at)",
+        ))
+
+    def create(self, params: dict, total: int, priority: int = 0) -> str:
+        job_id = uuid.uuid4().hex
+        self._connect().execute(
+            "INSERT INTO jobs (id, params, priority, state, total, created_at) VALUES (?, ?, ?, 'queued', ?, ?)",
+            (job_id, json.dumps(params), priority, total, time.time()),
+        )
+        return job_id
+
+    def get(self, job_id: str) -> dict | None:
+        row = self._connect().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return _to_job(row) if row is not None else None
+
+    def claim(self) -> dict | None:
+        """Marks the next job as running and returns it: queued or abandoned, highest priority, oldest first."""
+        conn = self._connect()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT * FROM jobs WHERE state = 'queued' OR (state = 'running' AND heartbeat_at < ?) "
+                "ORDER BY priority DESC, created_at LIMIT 1",
+                (now - JOB_STALE_SECONDS,),
+            ).fetchone()
+            if row is not None:
+                conn.execute(
+                    "UPDATE jobs SET state = 'running', started_at = COALESCE(started_at, ?), heartbeat_at = ?, "
+                    "attempts = attempts + 1 WHERE id = ?",
+                    (now, now, row["id"]),
+                )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        if row is None:
+            return None
+        return {**_to_job(row), "state": "running", "attempts": row["attempts"] + 1}
+
+    def save_progress(self, job_id: str, partial: dict, done: int) -> None:
+        self._connect().execute(
+            "UPDATE jobs SET result = ?, done = ?, heartbeat_at = ? WHERE id = ?",
+            (json.dumps(partial), done, time.time(), job_id),
+        )
+
+    def heartbeat(self, job_id: str) -> None:
+        self._connect().execute("UPDATE jobs SET heartbeat_at = ? WHERE id = ?", (time.time(), job_id))
+
+    def finish(self, job_id: str, result: dict) -> None:
+        self._connect().execute(
+            "UPDATE jobs SET state = 'done', result = ?, done = total, finished_at = ? WHERE id = ?",
+            (json.dumps(result), time.time(), job_id),
+        )
+
+    def fail(self, job_id: str, error: str) -> None:
+        self._connect().execute(
+            "UPDATE jobs SET state = 'failed', error = ?, finished_at = ? WHERE id = ?", (error, time.time(), job_id)
+        )
+
+    def prune(self) -> None:
+        """Deletes finished jobs older than JOB_RETENTION_SECONDS."""
+        self._connect().execute(
+            "DELETE FROM jobs WHERE state IN ('done', 'failed') AND finished_at < ?",
+            (time.time() - JOB_RETENTION_SECONDS,),
+        )
+
+    def counts(self) -> dict:
+        rows = self._connect().execute("SELECT state, COUNT(*) FROM jobs GROUP BY state").fetchall()
+        return {**{state: 0 for state in JOB_STATES}, **{state: count for state, count in rows}}
+
+
+def _to_job(row: sqlite3.Row) -> dict:
+    return {
+        "id": row["id"],
+        "params": json.loads(row["params"]),
+        "priority": row["priority"],
+        "state": row["state"],
+        "progress": {"done": row["done"], "total": row["total"]},
+        "result": json.loads(row["result"]) if row["result"] else None,
+        "error": row["error"],
+        "attempts": row["attempts"],
+        "created_at": row["created_at"],
+        "started_at": row["started_at"],
+        "finished_at": row["finished_at"],
+    }
+
+
+job_store = JobStore(JOBS_DB_PATH)
+
+_wake = threading.Event()
+
+
+def submit_job(book: str, chapter, mode: str = summarizer.DEFAULT_SUMMARY_MODE, priority: int = 0) -> str:
+    """Queues a summarization of `book` `chapter` (a chapter or a range) and returns the job id."""
+    chapters = bible.expand_chapter_range(str(chapter))
+    job_id = job_store.create({"book": book, "chapter": str(chapter), "mode": mode}, total=len(chapters), priority=priority)
+    job_store.prune()
+    start_job_workers()
+    _wake.set()
+    return job_id
+
+
+def get_job(job_id: str) -> dict | None:
+    return job_store.get(job_id)
+
+
+def start_job_workers() -> None:
+    """Starts JOB_WORKERS threads in this process, once per process (threads do not survive fork())."""
+    _workers()
+
+
+def _start_workers() -> list[threading.Thread]:
+    workers = [threading.Thread(target=_work, name=f"job-worker-{i}", daemon=True) for i in range(JOB_WORKERS)]
+    for worker in workers:
+        worker.start()
+    return workers
+
+
+_workers = per_process(_start_workers)
+
+
+def _work() -> None:
+    while True:
+        try:
+            job = job_store.claim()
+        except sqlite3.Error as e:
+            logging.error(f"Could not claim a job from {job_store.path}: {e}")
+            job = None
+        if job is None:
+            _wake.wait(JOB_POLL_SECONDS)
+            _wake.clear()
+            continue
+        run_job(job)
+
+
+def run_job(job: dict) -> None:
+    """Summarizes a claimed job chapter by chapter, resuming after the chapters it already saved."""
+    job_id = job["id"]
+    params = job["params"]
+    book, mode = params["book"], params["mode"]
+    chapters = bible.expand_chapter_range(params["chapter"])
+    done = (job["result"] or {}).get("chapters", [])
+    logging.info(f"Job {job_id}: {book} {params['chapter']}, {len(chapters) - len(done)} of {len(chapters)} chapter(s) left")
+    try:
+        for chapter in chapters[len(done):]:
+            _yield_to_interactive(job_id)
+            verses = bible.get_bible_verses(book, chapter)
+            if "error" in verses or not verses.get("text"):
+                raise JobError(verses.get("error") or f"No verses found for {book} {chapter}")
+            summary = summarizer.summarize_text(verses["text"], mode=mode)
+            if summary.startswith("Error:"):
+                raise JobError(summary)
+            done.append({"chapter": chapter, "reference": verses.get("reference", f"{book} {chapter}"), "summary": summary})
+            job_store.save_progress(job_id, {"chapters": done}, len(done))
+
+        _yield_to_interactive(job_id)
+        # Reduced in the same tree as /summarize ranges, so the two share cached nodes
+        summary = summarizer.reduce_summaries([c["summary"] for c in done], first_chapter=int(chapters[0]), mode=mode)
+        if summary.startswith("Error:"):
+            raise JobError(summary)
+        job_store.finish(job_id, {"book": book, "chapter": params["chapter"], "summary": summary, "summary_mode": mode, "chapters": done})
+        logging.info(f"Job {job_id} done")
+    except Exception as e:
+        logging.error(f"Job {job_id} failed: {e}")
+        job_store.fail(job_id, str(e))
+
+
+def _yield_to_interactive(job_id: str) -> None:
+    # Interactive requests and jobs share the model queue; let the queue drain before adding to it
+    last_heartbeat = time.monotonic()
+    while JOB_YIELD_QUEUE_DEPTH and summarizer.summary_scheduler.queue_depth() >= JOB_YIELD_QUEUE_DEPTH:
+        if time.monotonic() - last_heartbeat > 1:
+            job_store.heartbeat(job_id)
+            last_heartbeat = time.monotonic()
+        time.sleep(0.05)
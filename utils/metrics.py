@@ -0,0 +1,299 @@
+"""
+Prometheus metrics for /metrics, kept in plain dicts instead of a client library.
+
+Updates are a dict operation under one lock, cheap enough for every request and every stage.
+Collectors registered with register_collector() are read at scrape time for values that other
+modules already count themselves (cache hits, model queue depth).
+
+Gunicorn workers are separate processes. With METRICS_DIR set, each process also writes its
+samples to <METRICS_DIR>/<pid>.json, from a background thread at most every
+METRICS_FLUSH_SECONDS. render() adds up the files of all processes, so any worker can answer a
+scrape for all of them. Counters and histograms of workers that have exited are kept, so totals
+never go backwards. Their gauges are dropped (see mark_process_dead).
+"""
+import glob
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from utils import batching, profiling
+from utils.forksafe import per_process
+
+METRICS_DIR = os.environ.get("METRICS_DIR", "")
+METRICS_FLUSH_SECONDS = float(os.environ.get("METRICS_FLUSH_SECONDS", 1))
+
+PREFIX = "bible_summarizer_"
+# Seconds; upper bounds of the latency histogram buckets ("+Inf" is implied)
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+# Bucket bounds of histograms that are not latencies
+BUCKETS = {
+    "model_batch_size": batching.HISTOGRAM_BUCKETS,
+}
+
+# name (without PREFIX) -> (type, help)
+METRICS = {
+    "requests_total": ("counter", "HTTP requests by endpoint and status code."),
+    "request_duration_seconds": ("histogram", "HTTP request latency by endpoint."),
+    "in_flight_requests": ("gauge", "HTTP requests being served."),
+    "stage_duration_seconds": ("histogram", "Time spent in each stage of a summarize request."),
+    "upstream_responses_total": ("counter", "Responses from bible-api.com by status code (\"error\" for connection errors and timeouts)."),
+    "upstream_retries_total": ("counter", "Retried bible-api.com requests."),
+    "upstream_deadline_exceeded_total": ("counter", "bible-api.com calls that ran out of their time budget."),
+    "upstream_connections_opened_total": ("counter", "Connections opened to bible-api.com by the pooled session."),
+    "upstream_connections_reused_total": ("counter", "bible-api.com requests sent on a pooled connection that was already open."),
+    "cache_lookups_total": ("counter", "Cache lookups by cache and result (memory_hit, disk_hit or miss)."),
+    "model_queue_depth": ("gauge", "Inputs waiting for the summarization model."),
+    "model_batches_total": ("counter", "Model calls made by the batching scheduler."),
+    "model_batch_items_total": ("counter", "Inputs summarized by the batching scheduler."),
+    "model_batch_size": ("histogram", "Inputs per model call made by the batching scheduler."),
+    "singleflight_coalesced_total": ("counter", "Calls that waited for an identical call in flight instead of repeating it, by call (fetch or summarize)."),
+    "request_log_dropped_total": ("counter", "Sampled /summarize records not written to the request log (queue full or write error)."),
+}
+
+_lock = threading.Lock()
+_pid = os.getpid()
+_counters = {}  # (name, labels) -> value, labels being a sorted tuple of (label, value)
+_gauges = {}
+_histograms = {}  # (name, labels) -> [bucket counts..., +Inf count, sum]
+_collectors = []
+_dirty = False
+
+
+def inc(name: str, value: float = 1, **labels) -> None:
+    global _dirty
+    key = (name, tuple(sorted(labels.items())))
+    with _lock:
+        _reset_after_fork()
+        _counters[key] = _counters.get(key, 0) + value
+        _dirty = True
+    _ensure_flusher()
+
+
+def add_gauge(name: str, value: float, **labels) -> None:
+    """Adds `value` (possibly negative) to a gauge kept by this module, such as in-flight requests."""
+    global _dirty
+    key = (name, tuple(sorted(labels.items())))
+    with _lock:
+        _reset_after_fork()
+        _gauges[key] = _gauges.get(key, 0) + value
+        _dirty = True
+    _ensure_flusher()
+
+
+def observe(name: str, seconds: float, **labels) -> None:
+    global _dirty
+    key = (name, tuple(sorted(labels.items())))
+    with _lock:
+        _reset_after_fork()
+        histogram = _histograms.get(key)
+        if histogram is None:
+            histogram = _histograms[key] = [0] * (len(LATENCY_BUCKETS) + 2)
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if seconds <= bound:
+                histogram[i] += 1
+                break
+        else:
+            histogram[len(LATENCY_BUCKETS)] += 1
+        histogram[-1] += seconds
+        _dirty = True
+    _ensure_flusher()
+
+
+@contextmanager
+def timed(name: str, **labels):
+    """
+    Observes the duration of the block in histogram `name`, also when it raises. Blocks with a
+    `stage` label are also recorded in the profile of the current request, if it is profiled.
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - started
+        observe(name, seconds, **labels)
+        if "stage" in labels:
+            profiling.record(labels["stage"], seconds)
+
+
+def register_collector(collect) -> None:
+    """
+    `collect()` returns [(name, labels dict, value)] for this process, read on every scrape and
+    flush. Histogram values are [bucket counts..., +Inf count, sum], see histogram_sample().
+    """
+    _collectors.append(collect)
+
+
+def cache_samples(cache: str, stats: dict) -> list[tuple]:
+    """cache_lookups_total samples from a TwoTierCache.stats() dict."""
+    return [
+        ("cache_lookups_total", {"cache": cache, "result": "memory_hit"}, stats["memory_hits"]),
+        ("cache_lookups_total", {"cache": cache, "result": "disk_hit"}, stats["disk_hits"]),
+        ("cache_lookups_total", {"cache": cache, "result": "miss"}, stats["misses"]),
+    ]
+
+
+def histogram_sample(name: str, counts: dict, total: float, **labels) -> tuple:
+    """A histogram sample from non-cumulative counts keyed by str(bound) and "+Inf" (as BatchScheduler.stats() has them)."""
+    return (name, labels, [*(counts[str(bound)] for bound in BUCKETS[name]), counts["+Inf"], total])
+
+
+def snapshot() -> dict:
+    """This process's samples, including collectors, in the format of the METRICS_DIR files."""
+    collected = {"counter": {}, "gauge": {}, "histogram": {}}
+    for collect in _collectors:
+        try:
+            for name, labels, value in collect():
+                collected[METRICS[name][0]][(name, tuple(sorted(labels.items())))] = value
+        except Exception as e:
+            logging.warning(f"Metrics collector {collect.__name__} failed: {e}")
+    with _lock:
+        _reset_after_fork()
+        counters = {**_counters, **collected["counter"]}
+        gauges = {**_gauges, **collected["gauge"]}
+        histograms = {**{key: list(values) for key, values in _histograms.items()}, **collected["histogram"]}
+    return {
+        "pid": os.getpid(),
+        "counters": [[name, dict(labels), value] for (name, labels), value in counters.items()],
+        "gauges": [[name, dict(labels), value] for (name, labels), value in gauges.items()],
+        "histograms": [[name, dict(labels), values] for (name, labels), values in histograms.items()],
+    }
+
+
+def flush() -> None:
+    """Writes this process's samples to METRICS_DIR (atomically), if it is set."""
+    global _dirty
+    if not METRICS_DIR:
+        return
+    _dirty = False
+    path = os.path.join(METRICS_DIR, f"{os.getpid()}.json")
+    try:
+        os.makedirs(METRICS_DIR, exist_ok=True)
+        with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+            json.dump(snapshot(), f)
+        os.replace(f"{path}.tmp", path)
+    except OSError as e:
+        logging.warning(f"Could not write metrics to {path}: {e}")
+
+
+def mark_process_dead(pid: int) -> None:
+    """Drops an exited process's gauges from METRICS_DIR and keeps its counters and histograms."""
+    path = os.path.join(METRICS_DIR, f"{pid}.json")
+    if not METRICS_DIR or not os.path.exists(path):
+        return
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            samples = json.load(f)
+        samples["gauges"] = []
+        with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+            json.dump(samples, f)
+        os.replace(f"{path}.tmp", path)
+    except (OSError, ValueError) as e:
+        logging.warning(f"Could not update metrics of exited process {pid}: {e}")
+
+
+def clear_dir() -> None:
+    """Removes every process's file from METRICS_DIR, for a fresh start of the server."""
+    for path in glob.glob(os.path.join(METRICS_DIR, "*.json")) if METRICS_DIR else []:
+        os.remove(path)
+
+
+def render() -> str:
+    """All processes' samples in the Prometheus text exposition format (version 0.0.4)."""
+    processes = [snapshot()]
+    if METRICS_DIR:
+        own = os.path.join(METRICS_DIR, f"{os.getpid()}.json")
+        for path in glob.glob(os.path.join(METRICS_DIR, "*.json")):
+            if path == own:
+                continue
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    processes.append(json.load(f))
+            except (OSError, ValueError) as e:
+                logging.warning(f"Skipping unreadable metrics file {path}: {e}")
+
+    totals = {}
+    for samples in processes:
+        for kind in ("counters", "gauges"):
+            for name, labels, value in samples[kind]:
+                key = (name, tuple(sorted(labels.items())))
+                totals[key] = totals.get(key, 0) + value
+        for name, labels, values in samples["histograms"]:
+            key = (name, tuple(sorted(labels.items())))
+            total = totals.setdefault(key, [0] * len(values))
+            totals[key] = [a + b for a, b in zip(total, values)]
+
+    lines = []
+    for name, (kind, help_text) in METRICS.items():
+        series = sorted((labels, value) for (sample_name, labels), value in totals.items() if sample_name == name)
+        if not series and kind != "gauge":
+            continue
+        lines.append(f"# HELP {PREFIX}{name} {help_text}")
+        lines.append(f"# TYPE {PREFIX}{name} {kind}")
+        if kind == "gauge" and not series:
+            series = [((), 0)]
+        for labels, value in series:
+            if kind != "histogram":
+                lines.append(f"{PREFIX}{name}{_labels(labels)} {_number(value)}")
+                continue
+            cumulative = 0
+            for bound, count in zip([*BUCKETS.get(name, LATENCY_BUCKETS), "+Inf"], value[:-1]):
+                cumulative += count
+                lines.append(f"{PREFIX}{name}_bucket{_labels(labels + (('le', str(bound)),))} {_number(cumulative)}")
+            lines.append(f"{PREFIX}{name}_sum{_labels(labels)} {_number(value[-1])}")
+            lines.append(f"{PREFIX}{name}_count{_labels(labels)} {_number(cumulative)}")
+    return "\n".join(lines) + "\n"
+
+
+def reset() -> None:
+    """Zeroes this process's samples (used by tests)."""
+    global _dirty
+    with _lock:
+        _counters.clear()
+        _gauges.clear()
+        _histograms.clear()
+        _dirty = False
+
+
+def _labels(labels: tuple) -> str:
+    if not labels:
+        return ""
+    escaped = (f'{k}="{str(v).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34)).replace(chr(10), chr(92) + "n")}"' for k, v in labels)
+    return "{" + ",".join(escaped) + "}"
+
+
+def _number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def _reset_after_fork() -> None:
+    # Called with _lock held. A forked worker starts counting from zero instead of from the
+    # master's values, which the master's own file (if any) already accounts for
+    global _pid
+    if _pid != os.getpid():
+        _pid = os.getpid()
+        _counters.clear()
+        _gauges.clear()
+        _histograms.clear()
+
+
+def _ensure_flusher() -> None:
+    if METRICS_DIR:
+        _flusher()
+
+
+def _start_flusher() -> threading.Thread:
+    flusher = threading.Thread(target=_flush_periodically, name="metrics-flusher", daemon=True)
+    flusher.start()
+    return flusher
+
+
+def _flush_periodically() -> None:
+    while True:
+        time.sleep(METRICS_FLUSH_SECONDS)
+        if _dirty:
+            flush()
+
+
+_flusher = per_process(_start_flusher)
@@ -0,0 +1,112 @@
+"""
+ONNX Runtime engine for the summarization model (SUMMARIZER_BACKEND=onnx or onnx-int8).
+
+The model is exported to ONNX once, with an encoder graph, a decoder graph and a decoder-with-past
+graph so generation reuses the attention key/value cache instead of re-running the decoder over
+the whole prefix at every step, and saved under ONNX_MODEL_DIR. Later loads only open the saved
+graphs. With quantize=True every graph's weights are dynamically quantized to int8.
+
+Requires the optional `pip install optimum[onnxruntime]`. Export ahead of deploying with:
+
+    python -m utils.onnx_backend --quantize
+"""
+import argparse
+import logging
+import os
+import platform
+import shutil
+
+_BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+ONNX_MODEL_DIR = os.environ.get("ONNX_MODEL_DIR", os.path.join(_BASE_DIR, "..", "data", "onnx"))
+# ONNX Runtime threads per session; 0 lets it use every physical core
+ONNX_INTRA_OP_THREADS = int(os.environ.get("ONNX_INTRA_OP_THREADS", 0))
+
+
+def model_dir(model_name: str, quantize: bool = False) -> str:
+    return os.path.join(ONNX_MODEL_DIR, model_name.replace("/", "--") + ("-int8" if quantize else ""))
+
+
+def _has_onnx(directory: str) -> bool:
+    return os.path.isdir(directory) and any(name.endswith(".onnx") for name in os.listdir(directory))
+
+
+def _publish(tmp_dir: str, directory: str) -> None:
+    # Several workers may export at once; the first finished directory wins and the rest are dropped
+    try:
+        os.replace(tmp_dir, directory)
+    except OSError:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def export_model(model_name: str, quantize: bool = False) -> str:
+    """Exports (and optionally quantizes) `model_name` unless already on disk. Returns its directory."""
+    from optimum.onnxruntime import ORTModelForSeq2SeqLM, ORTQuantizer
+    from optimum.onnxruntime.configuration import AutoQuantizationConfig
+    from transformers import AutoTokenizer
+
+    fp32_dir = model_dir(model_name)
+    if not _has_onnx(fp32_dir):
+        logging.info(f"Exporting '{model_name}' to ONNX in {fp32_dir}")
+        tmp_dir = f"{fp32_dir}.tmp{os.getpid()}"
+        ORTModelForSeq2SeqLM.from_pretrained(model_name, export=True, use_cache=True).save_pretrained(tmp_dir)
+        AutoTokenizer.from_pretrained(model_name).save_pretrained(tmp_dir)
+        _publish(tmp_dir, fp32_dir)
+    if not quantize:
+        return fp32_dir
+
+    int8_dir = model_dir(model_name, quantize=True)
+    if not _has_onnx(int8_dir):
+        logging.info(f"Quantizing '{model_name}' to int8 in {int8_dir}")
+        tmp_dir = f"{int8_dir}.tmp{os.getpid()}"
+        # Dynamic (weights-only) quantization needs no calibration data. The avx2 config runs on any
+        # x86-64 CPU; ONNX Runtime still uses VNNI instructions at run time where available.
+        if platform.machine().lower() in ("arm64", "aarch64"):
+            config = AutoQuantizationConfig.arm64(is_static=False, per_channel=False)
+        else:
+            config = AutoQuantizationConfig.avx2(is_static=False, per_channel=False)
+        os.makedirs(tmp_dir, exist_ok=True)
+        for name in sorted(os.listdir(fp32_dir)):
+            if name.endswith(".onnx"):
+                ORTQuantizer.from_pretrained(fp32_dir, file_name=name).quantize(
+                    save_dir=tmp_dir, quantization_config=config, file_suffix=""
+                )
+            elif os.path.isfile(os.path.join(fp32_dir, name)) and not name.endswith(".onnx_data"):
+                shutil.copy2(os.path.join(fp32_dir, name), tmp_dir)  # Model config and tokenizer files
+        _publish(tmp_dir, int8_dir)
+    return int8_dir
+
+
+def load_onnx_pipeline(model_name: str, quantize: bool = False):
+    """
+    A transformers summarization pipeline running on ONNX Runtime. The inference sessions are
+    created once here and reused for every call.
+    """
+    import onnxruntime
+    from optimum.onnxruntime import ORTModelForSeq2SeqLM
+    from transformers import AutoTokenizer, pipeline
+
+    directory = export_model(model_name, quantize)
+    options = onnxruntime.SessionOptions()
+    options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+    if ONNX_INTRA_OP_THREADS:
+        options.intra_op_num_threads = ONNX_INTRA_OP_THREADS
+    model = ORTModelForSeq2SeqLM.from_pretrained(
+        directory, use_cache=True, session_options=options, provider="CPUExecutionProvider"
+    )
+    return pipeline("summarization", model=model, tokenizer=AutoTokenizer.from_pretrained(directory))
+
+
+def main(argv=None) -> None:
+    from utils.summarizer import MODEL_NAME
+
+    parser = argparse.ArgumentParser(description="Export the summarization model to ONNX.")
+    parser.add_argument("--model", default=MODEL_NAME, help=f"Model to export (default: {MODEL_NAME})")
+    parser.add_argument("--quantize", action="store_true", help="Also write the int8 quantized variant")
+    args = parser.parse_args(argv)
+    print(f"Wrote {export_model(args.model)}")
+    if args.quantize:
+        print(f"Wrote {export_model(args.model, quantize=True)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+"""
+Offline precompute job for chapter summaries.
+
+The canon is finite (1,189 chapters), so every single-chapter summary can be generated ahead
+of time and served by `app.summarize` without running the model. Results are written to an
+SQLite artifact indexed by (book id, chapter) and tagged with the summary fingerprint
+(model + generation parameters). Re-running the job only recomputes chapters that are
+missing or whose fingerprint no longer matches, so it is resumable and incremental.
+
+    python -m utils.precompute --workers 4
+    python -m utils.precompute --books GEN EXO --force
+"""
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import sqlite3
+import threading
+import time
+from utils import archaeology, bible, summarizer
+from utils.books import BOOKS, BOOKS_BY_ID, resolve_book
+
+_BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+PRECOMPUTED_PATH = os.environ.get("PRECOMPUTED_PATH", os.path.join(_BASE_DIR, "..", "data", "precomputed.sqlite3"))
+# How often (seconds) the serving side re-checks whether the artifact has appeared
+PRECOMPUTED_CHECK_INTERVAL = 30.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS summaries (
+    book_id TEXT NOT NULL,
+    chapter INTEGER NOT NULL,
+    reference TEXT NOT NULL,
+    verses TEXT NOT NULL,
+    summary TEXT NOT NULL,
+    proof TEXT NOT NULL,
+    fingerprint TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (book_id, chapter)
+) WITHOUT ROWID
+"""
+
+
+# --- Serving side ---
+
+_local = threading.local()
+_missing_since = None
+
+
+def get_precomputed(book: str, chapter) -> dict | None:
+    """
+    Returns {"reference", "verses", "summary", "proof"} for a single chapter if the artifact has
+    an entry generated with the current model and parameters, otherwise None.
+    """
+    global _missing_since
+    resolved = resolve_book(book)
+    chapter = str(chapter).strip()
+    if resolved is None or not chapter.isdigit():
+        return None  # Ranges and unknown books always go through the live path
+    if _missing_since is not None and time.monotonic() - _missing_since < PRECOMPUTED_CHECK_INTERVAL:
+        return None
+
+    conn = getattr(_local, "conn", None)
+    if conn is None or getattr(_local, "path", None) != PRECOMPUTED_PATH:
+        if not os.path.exists(PRECOMPUTED_PATH):
+            _missing_since = time.monotonic()
+            return None
+        _missing_since = None
+        conn = sqlite3.connect(f"file:{PRECOMPUTED_PATH}?mode=ro", uri=True, check_same_thread=False)
+        _local.conn, _local.path = conn, PRECOMPUTED_PATH
+
+    try:
+        row = conn.execute(
+            "SELECT reference, verses, summary, proof FROM summaries WHERE book_id = ? AND chapter = ? AND fingerprint = ?",
+            (resolved.id, int(chapter), summarizer.summary_fingerprint()),
+        ).fetchone()
+    except sqlite3.Error as e:
+        logging.warning(f"Precomputed summaries unavailable: {e}")
+        return None
+    if row is None:
+        return None
+    reference, verses, summary, proof = row
+    return {"reference": reference, "verses": verses, "summary": summary, "proof": json.loads(proof)}
+
+
+# --- Job ---
+
+def _init_worker(torch_threads: int) -> None:
+    # Several worker processes share the machine; keep each one from claiming every core
+    try:
+        import torch
+        torch.set_num_threads(torch_threads)
+    except ImportError:
+        pass
+    # Load the model as the worker starts rather than on its first chapter
+    summarizer.load_model()
+
+
+def _process_chapter(task: tuple) -> dict:
+    book_id, chapter = task
+    book = BOOKS_BY_ID[book_id]
+    result = {"book_id": book_id, "chapter": chapter}
+    try:
+        verses = bible.get_bible_verses(book.name, str(chapter))
+    except Exception as e:
+        return dict(result, error=f"fetch failed: {e}")
+    if "error" in verses or not verses.get("text"):
+        return dict(result, error=verses.get("error", "no verses"))
+
+    summary = summarizer.summarize_text(verses["text"])
+    if summary.startswith("Error:"):
+        return dict(result, error=summary)
+    return dict(
+        result,
+        reference=f"{book.name} {chapter}",
+        verses=verses["text"],
+        summary=summary,
+        proof=json.dumps(archaeology.get_archeological_proof(book.name, str(chapter))),
+        fingerprint=summarizer.summary_fingerprint(),
+    )
+
+
+def pending_chapters(conn: sqlite3.Connection, fingerprint: str, book_ids=None, force: bool = False) -> list[tuple]:
+    """(book id, chapter) pairs that are missing or were generated with another fingerprint."""
+    done = set()
+    if not force:
+        done = set(conn.execute("SELECT book_id, chapter FROM summaries WHERE fingerprint = ?", (fingerprint,)))
+    books = [BOOKS_BY_ID[book_id] for book_id in book_ids] if book_ids else BOOKS
+    return [(book.id, chapter) for book in books for chapter in range(1, book.chapters + 1) if (book.id, chapter) not in done]
+
+
+def run(output_path: str, workers: int, book_ids=None, force: bool = False, limit: int | None = None) -> dict:
+    directory = os.path.dirname(output_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    conn = sqlite3.connect(output_path)
+    conn.execute("PRAGMA journal_mode=WAL")  # The API can keep reading while the job writes
+    conn.execute(_SCHEMA)
+
+    tasks = pending_chapters(conn, summarizer.summary_fingerprint(), book_ids, force)
+    if limit is not None:
+        tasks = tasks[:limit]
+    print(f"{len(tasks)} chapters to compute with {workers} worker(s)")
+
+    stats = {"computed": 0, "failed": 0, "elapsed": 0.0, "chapters_per_minute": 0.0}
+    if not tasks:
+        return stats
+
+    torch_threads = max(1, (os.cpu_count() or 1) // workers)
+    started = time.monotonic()
+    # spawn: torch and tokenizer thread pools do not survive fork() reliably
+    context = multiprocessing.get_context("spawn")
+    with context.Pool(workers, initializer=_init_worker, initargs=(torch_threads,)) as pool:
+        for result in pool.imap_unordered(_process_chapter, tasks):
+            if "error" in result:
+                stats["failed"] += 1
+                logging.warning(f"{result['book_id']} {result['chapter']}: {result['error']}")
+            else:
+                # Committed one row at a time so an interrupted run keeps its progress
+                conn.execute(
+                    "INSERT OR REPLACE INTO summaries VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (result["book_id"], result["chapter"], result["reference"], result["verses"],
+                     result["summary"], result["proof"], result["fingerprint"], time.time()),
+                )
+                conn.commit()
+                stats["computed"] += 1
+            done = stats["computed"] + stats["failed"]
+            if done % 25 == 0 or done == len(tasks):
+                elapsed = time.monotonic() - started
+                print(f"{done}/{len(tasks)} chapters, {done / elapsed * 60:.1f} chapters/min")
+
+    stats["elapsed"] = time.monotonic() - started
+    stats["chapters_per_minute"] = (stats["computed"] + stats["failed"]) / stats["elapsed"] * 60
+    conn.close()
+    return stats
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Precompute summaries for every chapter of the canon.")
+    parser.add_argument("--output", default=PRECOMPUTED_PATH, help=f"SQLite artifact to write (default: {PRECOMPUTED_PATH})")
+    parser.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 2) // 2), help="Worker processes")
+    parser.add_argument("--books", nargs="+", metavar="BOOK", help="Only these books (any recognized name or id)")
+    parser.add_argument("--force", action="store_true", help="Recompute chapters that are already up to date")
+    parser.add_argument("--limit", type=int, help="Stop after this many chapters")
+    args = parser.parse_args(argv)
+
+    book_ids = None
+    if args.books:
+        resolved = [resolve_book(name) for name in args.books]
+        unknown = [name for name, book in zip(args.books, resolved) if book is None]
+        if unknown:
+            parser.error(f"Unknown book(s): {', '.join(unknown)}")
+        book_ids = [book.id for book in resolved]
+
+    stats = run(args.output, args.workers, book_ids, args.force, args.limit)
+    print(
+        f"Computed {stats['computed']} chapters ({stats['failed']} failed) in {stats['elapsed']:.1f}s, "
+        f"{stats['chapters_per_minute']:.1f} chapters/min"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Opt-in profiling of single requests, for finding out why one /summarize call was slow.
+
+Off unless PROFILING_ENABLED=1. A request then asks for it with the X-Profile header or the
+`profile` query parameter: "1" (or "timing") for stage timings, "cprofile" to also run cProfile
+on the request thread. If PROFILING_TOKEN is set, the request must also send it in the
+X-Profile-Token header. Stage timings come back in a Server-Timing header, which browser dev
+tools display; the cProfile summary is added to JSON responses under "profile".
+
+Stages are recorded by metrics.timed() and by the summarizer for each model call the request
+waited on. A request that is not profiled costs one context variable lookup per stage.
+"""
+import cProfile
+import contextvars
+import hmac
+import io
+import os
+import pstats
+import time
+
+PROFILING_ENABLED = os.environ.get("PROFILING_ENABLED", "0") == "1"
+PROFILING_TOKEN = os.environ.get("PROFILING_TOKEN", "")
+# Functions listed in the cProfile summary, by cumulative time
+PROFILING_CPROFILE_LINES = int(os.environ.get("PROFILING_CPROFILE_LINES", 30))
+
+PROFILE_MODES = ("timing", "cprofile")
+
+_active = contextvars.ContextVar("profile", default=None)
+
+
+class Profile:
+    """Stages recorded for one request, in the order they finished."""
+
+    def __init__(self, mode: str):
+        self.mode = mode
+        self.started = time.perf_counter()
+        self.stages = []  # (name, seconds, description or None)
+        self.profiler = cProfile.Profile() if mode == "cprofile" else None
+
+
+def requested_mode(flag: str | None, token: str | None = None) -> str | None:
+    """The profile mode a request asked for with `flag`, or None if it did not or may not profile."""
+    if not PROFILING_ENABLED or not flag:
+        return None
+    if PROFILING_TOKEN and not hmac.compare_digest((token or "").encode(), PROFILING_TOKEN.encode()):
+        return None
+    flag = flag.lower()
+    if flag in ("1", "true"):
+        return "timing"
+    return flag if flag in PROFILE_MODES else None
+
+
+def start(mode: str) -> contextvars.Token:
+    """Starts profiling the current request; pass the returned token to stop()."""
+    profile = Profile(mode)
+    if profile.profiler is not None:
+        profile.profiler.enable()
+    return _active.set(profile)
+
+
+def stop(token: contextvars.Token) -> None:
+    profile = _active.get()
+    _active.reset(token)
+    if profile is not None and profile.profiler is not None:
+        profile.profiler.disable()
+
+
+def current() -> Profile | None:
+    return _active.get()
+
+
+def record(stage: str, seconds: float, description: str | None = None) -> None:
+    profile = _active.get()
+    if profile is not None:
+        profile.stages.append((stage, seconds, description))
+
+
+def server_timing(profile: Profile) -> str:
+    """The Server-Timing header value: each stage, numbered when it occurred more than once, then the total."""
+    counts = {}
+    for name, _, _ in profile.stages:
+        counts[name] = counts.get(name, 0) + 1
+    seen = {}
+    entries = []
+    for name, seconds, description in profile.stages:
+        if counts[name] > 1:
+            seen[name] = seen.get(name, 0) + 1
+            name = f"{name}-{seen[name]}"
+        entry = f"{name};dur={seconds * 1000:.1f}"
+        if description:
+            entry += f';desc="{description}"'
+        entries.append(entry)
+    entries.append(f"total;dur={(time.perf_counter() - profile.started) * 1000:.1f}")
+    return ", ".join(entries)
+
+
+def cprofile_summary(profile: Profile) -> str | None:
+    """The slowest PROFILING_CPROFILE_LINES functions by cumulative time, as printed by pstats."""
+    if profile.profiler is None:
+        return None
+    profile.profiler.disable()
+    out = io.StringIO()
+    stats = pstats.Stats(profile.profiler, stream=out)
+    stats.strip_dirs().sort_stats("cumulative").print_stats(PROFILING_CPROFILE_LINES)
+    return out.getvalue()
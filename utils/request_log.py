@@ -0,0 +1,120 @@
+"""
+Sampled capture of /summarize traffic, so the real access distribution can be replayed against a
+test server (benchmarks.replay) when trying cache or batching changes.
+
+With REQUEST_LOG_SAMPLE_RATE above 0, that fraction of /summarize requests is appended to
+REQUEST_LOG_PATH as one JSON line each:
+
+    {"book", "chapter", "mode", "timestamp", "latency_ms", "status", "cache_status"}
+
+Nothing identifies the client: no address, headers or anything from the body but the reference.
+The request thread only puts the record on a bounded queue and a background thread writes it, so
+a slow disk never holds up a request; when the queue is full the record is dropped and counted
+in request_log_dropped_total. Every gunicorn worker appends to the same file, each batch of whole
+lines with a single write.
+"""
+import json
+import logging
+import os
+import queue
+import random
+import threading
+from utils import metrics
+from utils.forksafe import per_process
+
+_BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+# Fraction of /summarize requests recorded; 0 disables the log
+REQUEST_LOG_SAMPLE_RATE = float(os.environ.get("REQUEST_LOG_SAMPLE_RATE", 0))
+REQUEST_LOG_PATH = os.environ.get("REQUEST_LOG_PATH", os.path.join(_BASE_DIR, "..", "data", "requests.jsonl"))
+# Records waiting for the writer; more are dropped
+REQUEST_LOG_QUEUE_SIZE = int(os.environ.get("REQUEST_LOG_QUEUE_SIZE", 10000))
+# Most records written in one go
+REQUEST_LOG_BATCH = 1000
+
+
+def sampled() -> bool:
+    """Whether to record the current request."""
+    return REQUEST_LOG_SAMPLE_RATE > 0 and random.random() < REQUEST_LOG_SAMPLE_RATE
+
+
+def cache_status(lookups: list[tuple]) -> str:
+    """
+    A request's cache status from its cache.track_lookups() list: the least cached result of its
+    summary lookups (a range makes several), or "uncached" if it made none (extractive, errors).
+    """
+    results = {result for cache, result in lookups if cache == "summaries"}
+    for status in ("miss", "disk_hit", "memory_hit"):
+        if status in results:
+            return status
+    return "uncached"
+
+
+def log_request(book: str, chapter, mode: str, timestamp: float, latency: float, status: int, cache_status: str) -> None:
+    record = {
+        "book": book,
+        "chapter": str(chapter),
+        "mode": mode,
+        "timestamp": round(timestamp, 3),
+        "latency_ms": round(latency * 1000, 1),
+        "status": status,
+        "cache_status": cache_status,
+    }
+    try:
+        _writer().put_nowait(record)
+    except queue.Full:
+        metrics.inc("request_log_dropped_total")
+
+
+def flush() -> None:
+    """Blocks until every queued record is written (or dropped)."""
+    records_queue = _writer.current()
+    if records_queue is not None:
+        records_queue.join()
+
+
+def read_requests(path: str) -> list[dict]:
+    """The records of a capture file, oldest first. Lines that are not valid records are skipped."""
+    records = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if isinstance(record, dict) and {"book", "chapter", "timestamp"} <= record.keys():
+                records.append(record)
+    records.sort(key=lambda record: record["timestamp"])
+    return records
+
+
+def _start_writer() -> queue.Queue:
+    records_queue = queue.Queue(maxsize=REQUEST_LOG_QUEUE_SIZE)
+    threading.Thread(target=_write, args=(records_queue,), name="request-log-writer", daemon=True).start()
+    return records_queue
+
+
+# The queue the writer thread of this process drains
+_writer = per_process(_start_writer)
+
+
+def _write(records_queue: queue.Queue) -> None:
+    while True:
+        records = [records_queue.get()]
+        while len(records) < REQUEST_LOG_BATCH:
+            try:
+                records.append(records_queue.get_nowait())
+            except queue.Empty:
+                break
+        data = "".join(json.dumps(record) + "\n" for record in records).encode("utf-8")
+        try:
+            directory = os.path.dirname(REQUEST_LOG_PATH)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            # Unbuffered, so the batch is one write() appended whole even with other workers writing
+            with open(REQUEST_LOG_PATH, "ab", buffering=0) as f:
+                f.write(data)
+        except OSError as e:
+            logging.warning(f"Could not write {len(records)} request log record(s) to {REQUEST_LOG_PATH}: {e}")
+            metrics.inc("request_log_dropped_total", len(records))
+        for _ in records:
+            records_queue.task_done()
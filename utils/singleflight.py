@@ -0,0 +1,74 @@
+"""
+Single-flight deduplication of identical work in flight.
+
+When a chapter trends, many requests for it arrive before the first one has fetched or summarized
+it, and without this each of them would call bible-api.com and run the model itself. The first
+caller for a key becomes the leader and does the work; callers arriving while it runs wait on the
+leader's future and get the same result, or the same exception. The key is released as soon as the
+leader finishes, so later callers go to the caches the leader filled rather than to this.
+
+Followers are counted in singleflight_coalesced_total, labelled with the group's name.
+"""
+import asyncio
+import threading
+from concurrent.futures import Future
+from utils import metrics
+
+
+class SingleFlight:
+    def __init__(self, name: str):
+        self.name = name
+        self._calls = {}  # key -> Future of the leader's call
+        self._lock = threading.Lock()
+
+    def claim(self, key) -> tuple[Future, bool]:
+        """
+        (future, leader) for `key`. The leader must resolve the future with finish(); everyone
+        else waits on it. For callers that start several calls together (a batch of model inputs).
+        """
+        with self._lock:
+            future = self._calls.get(key)
+            if future is None:
+                future = self._calls[key] = Future()
+                return future, True
+        metrics.inc("singleflight_coalesced_total", call=self.name)
+        return future, False
+
+    def finish(self, key, future: Future, result=None, exception: BaseException | None = None) -> None:
+        with self._lock:
+            if self._calls.get(key) is future:
+                del self._calls[key]
+        if exception is not None:
+            future.set_exception(exception)
+        else:
+            future.set_result(result)
+
+    def do(self, key, function, *args):
+        """function(*args), unless a call for `key` is already running, in which case its result."""
+        future, leader = self.claim(key)
+        if not leader:
+            return future.result()
+        try:
+            result = function(*args)
+        except BaseException as e:
+            self.finish(key, future, exception=e)
+            raise
+        self.finish(key, future, result)
+        return result
+
+    async def do_async(self, key, function, *args):
+        """do() for a coroutine function. Shares its calls with do(), so sync and async callers coalesce too."""
+        future, leader = self.claim(key)
+        if not leader:
+            return await asyncio.wrap_future(future)
+        try:
+            result = await function(*args)
+        except BaseException as e:
+            self.finish(key, future, exception=e)
+            raise
+        self.finish(key, future, result)
+        return result
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._calls)
@@ -1,109 +1,595 @@
-from transformers import pipeline, set_seed
+import hashlib
+import json
 import logging # For logging errors
+import os
+import re
+import threading
+import time
+from utils import metrics, profiling
+from utils.batching import BatchScheduler
+from utils.cache import MISSING, LRUCache, SQLiteStore, TwoTierCache
+from utils.extractive import summarize_extractive
+from utils.singleflight import SingleFlight
 
 # Configure basic logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
-# Initialize the summarization pipeline
-# Using a specific revision for reproducibility, though this model is quite standard.
 MODEL_NAME = "sshleifer/distilbart-cnn-12-6"
-try:
-    summarizer_pipeline = pipeline("summarization", model=MODEL_NAME, tokenizer=MODEL_NAME)
-    # Some models benefit from a seed for deterministic output if do_sample=True, but for do_sample=False it's less critical.
-    # set_seed(42) # Uncomment if you plan to use do_sample=True and want consistent results
-except Exception as e:
-    logging.error(f"Failed to load summarization model '{MODEL_NAME}': {e}")
-    # Fallback or raise critical error depending on desired application behavior
-    summarizer_pipeline = None 
+# Inference engine, see build_pipeline():
+#   "pytorch"   - transformers pipeline("summarization") on eager PyTorch (default)
+#   "onnx"      - the same model exported to ONNX and run by ONNX Runtime (utils.onnx_backend)
+#   "onnx-int8" - the ONNX export with int8 dynamically quantized weights
+SUMMARIZER_BACKENDS = ("pytorch", "onnx", "onnx-int8")
+SUMMARIZER_BACKEND = os.environ.get("SUMMARIZER_BACKEND", "pytorch").lower()
+# Seconds a request waits for a model that is still loading before giving up
+MODEL_LOAD_TIMEOUT = float(os.environ.get("MODEL_LOAD_TIMEOUT", 60))
+# Dummy input for the warmup generation that runs right after the model loads
+WARMUP_TEXT = "In the beginning God created the heaven and the earth. And the earth was without form, and void."
+
+# The summarization pipeline is built by load_model(), normally on the background thread started by
+# start_model_warmup(), so importing this module does not pull in torch or transformers.
+summarizer_pipeline = None
+_model_lock = threading.Lock()
+_model_done = threading.Event()
+_model_status = {"state": "not_loaded", "error": None, "load_seconds": None, "warmup_seconds": None}
+_warmup_thread = None
+_warmup_lock = threading.Lock()
+
+if SUMMARIZER_BACKEND not in SUMMARIZER_BACKENDS:
+    raise ValueError(f"SUMMARIZER_BACKEND must be one of {', '.join(SUMMARIZER_BACKENDS)}, got '{SUMMARIZER_BACKEND}'")
 
 # Define max input length based on typical limits for models like BART.
-# distilbart-cnn-12-6 has a max positional embedding of 1024.
+# distilbart-cnn-12-6 has a max positional embedding of 1024 tokens.
 MODEL_MAX_INPUT_LENGTH = 1024 
+# <s> and </s> are added around every input and count against the limit
+MODEL_SPECIAL_TOKENS = 2
+# Verses repeated from the end of one chunk at the start of the next, for context
+CHUNK_OVERLAP_VERSES = int(os.environ.get("CHUNK_OVERLAP_VERSES", 0))
+# Rough English average, only used if the pipeline has no tokenizer
+CHARS_PER_TOKEN_ESTIMATE = 4
+# Chunks of one long text are run through the model together, this many per padded batch
+SUMMARY_BATCH_SIZE = int(os.environ.get("SUMMARY_BATCH_SIZE", 8))
+# Model calls from all request threads are coalesced: the scheduler waits up to this long for
+# more work once something is queued, and runs at most SUMMARY_BATCH_SIZE inputs per call
+SUMMARY_BATCH_MAX_WAIT_MS = float(os.environ.get("SUMMARY_BATCH_MAX_WAIT_MS", 5))
 # Desired summary length constraints
 SUMMARY_MAX_LENGTH = 150 # Increased slightly
 SUMMARY_MIN_LENGTH = 40  # Increased slightly
+# Bump whenever the chunking/recombination logic changes output for the same text and params
+SUMMARIZER_VERSION = 2
+# "abstractive" runs the model; "extractive" picks representative verses (utils.extractive) in milliseconds
+SUMMARY_MODES = ("abstractive", "extractive")
+DEFAULT_SUMMARY_MODE = "abstractive"
+# Abstractive requests are answered extractively while this many inputs are already waiting for the
+# model (0 disables), so a saturated worker degrades instead of timing out
+SUMMARY_DEGRADE_QUEUE_DEPTH = int(os.environ.get("SUMMARY_DEGRADE_QUEUE_DEPTH", 32))
+# Chapter ranges are summarized per chapter, then reduced in a tree: each node summarizes at most this
+# many child summaries. The default is as many full-length summaries as fit one model input.
+SUMMARY_REDUCE_FANOUT = max(2, int(os.environ.get(
+    "SUMMARY_REDUCE_FANOUT", (MODEL_MAX_INPUT_LENGTH - MODEL_SPECIAL_TOKENS) // SUMMARY_MAX_LENGTH
+)))
+
+# Summary cache: generation is greedy (do_sample=False), so the same text, model and params always
+# give the same summary. Entries are keyed by a hash of all three, so changing the model or any
+# parameter simply stops matching old entries. Set SUMMARY_CACHE_PATH to "" to disable the disk tier.
+_BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+SUMMARY_CACHE_MAX_BYTES = int(os.environ.get("SUMMARY_CACHE_MAX_BYTES", 16 * 1024 * 1024))  # In-process budget
+SUMMARY_CACHE_DISK_MAX_ENTRIES = int(os.environ.get("SUMMARY_CACHE_DISK_MAX_ENTRIES", 100000))
+SUMMARY_CACHE_PATH = os.environ.get("SUMMARY_CACHE_PATH", os.path.join(_BASE_DIR, "..", "data", "cache", "summaries.sqlite3"))
+
+_SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?;:])\s+")
+
+summary_cache = TwoTierCache(
+    "summaries",
+    LRUCache(max_entries=100000, max_bytes=SUMMARY_CACHE_MAX_BYTES),
+    SQLiteStore(SUMMARY_CACHE_PATH, max_entries=SUMMARY_CACHE_DISK_MAX_ENTRIES) if SUMMARY_CACHE_PATH else None,
+)
+
+
+def _run_model_batch(items: list[tuple]) -> list[str]:
+    """Runs (text, max_length, min_length) items; items with the same lengths share one pipeline call."""
+    groups = {}
+    for i, (text, max_length, min_length) in enumerate(items):
+        groups.setdefault((max_length, min_length), []).append(i)
+    results = [None] * len(items)
+    for (max_length, min_length), indices in groups.items():
+        with metrics.timed("stage_duration_seconds", stage="generate"):
+            summaries = summarize_batch([items[i][0] for i in indices], max_length, min_length)
+        for i, summary in zip(indices, summaries):
+            results[i] = summary
+    return results
+
+
+summary_scheduler = BatchScheduler(
+    "summaries", _run_model_batch, max_batch_size=SUMMARY_BATCH_SIZE, max_wait_ms=SUMMARY_BATCH_MAX_WAIT_MS
+)
+# Summaries being generated, by summary cache key
+_summaries = SingleFlight("summarize")
+
+
+def build_pipeline(backend: str | None = None):
+    """
+    Builds the summarization engine for `backend` (default SUMMARIZER_BACKEND). Every backend
+    returns an object with the interface of a transformers summarization pipeline: called with a
+    text or a list of texts plus max_length, min_length, do_sample, truncation and optionally
+    batch_size, it returns one {"summary_text": ...} per text, and it has a `tokenizer`.
+    """
+    backend = SUMMARIZER_BACKEND if backend is None else backend
+    if backend == "pytorch":
+        from transformers import pipeline # Imported here: torch and transformers take seconds to import
+        return pipeline("summarization", model=MODEL_NAME, tokenizer=MODEL_NAME)
+    if backend in ("onnx", "onnx-int8"):
+        from utils.onnx_backend import load_onnx_pipeline # Needs the optional optimum[onnxruntime]
+        return load_onnx_pipeline(MODEL_NAME, quantize=backend == "onnx-int8")
+    raise ValueError(f"Unknown summarizer backend '{backend}'")
 
-def summarize_text(text: str) -> str:
+
+def load_model(warmup: bool = True) -> bool:
+    """
+    Builds the pipeline and, with `warmup`, runs one short generation so the first real request
+    does not pay for lazy initialization. Only the first caller loads; others wait for it.
+    Returns True when the model is ready.
+    """
+    global summarizer_pipeline
+    with _model_lock:
+        if _model_status["state"] in ("ready", "failed"):
+            return _model_status["state"] == "ready"
+        _model_status["state"] = "loading"
+        started = time.perf_counter()
+        try:
+            loaded = build_pipeline()
+            _model_status["load_seconds"] = round(time.perf_counter() - started, 3)
+            if warmup:
+                _warm_up(loaded)
+        except Exception as e:
+            logging.error(f"Failed to load summarization model '{MODEL_NAME}' ({SUMMARIZER_BACKEND}): {e}")
+            _model_status.update(state="failed", error=str(e))
+            _model_done.set()
+            return False
+        summarizer_pipeline = loaded
+        _model_status["state"] = "ready"
+        _model_done.set()
+    logging.info(f"Summarization model '{MODEL_NAME}' ready on {SUMMARIZER_BACKEND} (load {_model_status['load_seconds']}s, warmup {_model_status['warmup_seconds']}s)")
+    return True
+
+
+def warm_up_model() -> None:
+    """
+    Runs the warmup generation on an already loaded model (e.g. in a worker forked after
+    load_model(warmup=False)). If it fails, the model is marked failed like a failed load, so
+    the worker still starts and answers extractively instead of crashing during boot.
+    """
+    global summarizer_pipeline
     if summarizer_pipeline is None:
-        logging.error("Summarization pipeline is not available.")
-        return "Error: Text summarization service is currently unavailable."
+        return
+    try:
+        _warm_up(summarizer_pipeline)
+    except Exception as e:
+        logging.error(f"Warmup of summarization model '{MODEL_NAME}' ({SUMMARIZER_BACKEND}) failed: {e}")
+        summarizer_pipeline = None
+        _model_status.update(state="failed", error=str(e))
+
+
+def _warm_up(engine) -> None:
+    started = time.perf_counter()
+    engine(WARMUP_TEXT, max_length=20, min_length=5, do_sample=False, truncation=True)
+    _model_status["warmup_seconds"] = round(time.perf_counter() - started, 3)
+
+
+def start_model_warmup() -> None:
+    """Starts load_model() on a background thread unless the model is already loading or loaded."""
+    global _warmup_thread
+    with _warmup_lock:
+        if _warmup_thread is None and _model_status["state"] == "not_loaded":
+            _warmup_thread = threading.Thread(target=load_model, name="model-warmup", daemon=True)
+            _warmup_thread.start()
+
+
+def get_pipeline(timeout: float | None = None):
+    """
+    The loaded pipeline, starting the load if nobody has yet and waiting up to `timeout` seconds
+    (default MODEL_LOAD_TIMEOUT) for it. None if the model failed to load or is still loading.
+    """
+    if summarizer_pipeline is None and _model_status["state"] != "failed":
+        start_model_warmup()
+        _model_done.wait(MODEL_LOAD_TIMEOUT if timeout is None else timeout)
+    return summarizer_pipeline
+
+
+def model_status() -> dict:
+    """{"state": "not_loaded" | "loading" | "ready" | "failed", "error", "load_seconds", "warmup_seconds"}"""
+    return dict(_model_status)
+
+
+def summary_fingerprint() -> str:
+    """Hash of the model name, inference backend and every generation parameter that affects the output."""
+    params = {
+        "model": MODEL_NAME,
+        "backend": SUMMARIZER_BACKEND, # int8 weights produce (slightly) different summaries
+        "version": SUMMARIZER_VERSION,
+        "max_input_length": MODEL_MAX_INPUT_LENGTH,
+        "chunk_overlap": CHUNK_OVERLAP_VERSES,
+        "max_length": SUMMARY_MAX_LENGTH,
+        "min_length": SUMMARY_MIN_LENGTH,
+        "do_sample": False,
+    }
+    return hashlib.sha256(json.dumps(params, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def summary_cache_key(text: str) -> str:
+    return hashlib.sha256(f"{summary_fingerprint()}\n{text}".encode("utf-8")).hexdigest()
+
+
+def summary_cache_stats() -> dict:
+    return summary_cache.stats()
+
+
+def _collect_metrics() -> list[tuple]:
+    scheduler = summary_scheduler.stats()
+    return [
+        *metrics.cache_samples("summaries", summary_cache.stats()),
+        ("model_queue_depth", {}, scheduler["queue_depth"]),
+        ("model_batches_total", {}, scheduler["batches"]),
+        ("model_batch_items_total", {}, scheduler["items"]),
+        metrics.histogram_sample("model_batch_size", scheduler["batch_size_histogram"], scheduler["items"]),
+    ]
+
+
+metrics.register_collector(_collect_metrics)
+
+
+def summary_scheduler_stats() -> dict:
+    """Batches run, queue depth and batch-size histograms of the model scheduler."""
+    return summary_scheduler.stats()
+
+
+def effective_summary_mode(mode: str = DEFAULT_SUMMARY_MODE) -> str:
+    """
+    The mode a request for `mode` should actually use: abstractive requests fall back to
+    extractive if the model failed to load or its queue is saturated.
+    """
+    if mode != "abstractive":
+        return mode
+    if _model_status["state"] == "failed":
+        return "extractive"
+    if SUMMARY_DEGRADE_QUEUE_DEPTH and summary_scheduler.queue_depth() >= SUMMARY_DEGRADE_QUEUE_DEPTH:
+        logging.warning("Summarization queue is saturated, answering extractively.")
+        return "extractive"
+    return mode
+
+
+def summarize_text(text: str, mode: str = DEFAULT_SUMMARY_MODE) -> str:
+    if mode == "abstractive" and text and isinstance(text, str):
+        key = summary_cache_key(text)
+        cached = summary_cache.get(key)
+        if cached is not MISSING:
+            return cached
+        # Concurrent misses for the same text share one model run, and its error
+        return _summaries.do(key, _summarize_uncached, text, key)
+    for event in summarize_text_stream(text, mode=mode):
+        pass
+    return event["summary"] if event["event"] == "summary" else event["error"]
+
+
+def _summarize_uncached(text: str, key: str) -> str:
+    # A flight that finished between our cache miss and taking the lead has already stored it
+    # (in memory, which is checked without counting a second lookup)
+    cached = summary_cache.memory.get(key)
+    if cached is not MISSING:
+        return cached
+    for event in _summarize_miss_events(text, key):
+        pass
+    return event["summary"] if event["event"] == "summary" else event["error"]
 
+
+def summarize_texts(texts: list[str], mode: str = DEFAULT_SUMMARY_MODE) -> list[str]:
+    """
+    summarize_text for many texts, results in the same order. Uncached texts that fit the model in
+    one pass are submitted to the scheduler together so they share padded batches; longer texts go
+    through the chunked path meanwhile.
+    """
+    results = [None] * len(texts)
+    direct = {}
+    following = {}  # index -> future of the same text summarized by another request
+    pipeline = MISSING  # looked up once, on the first uncached text, since it may wait for the model to load
+    try:
+        for i, text in enumerate(texts):
+            if mode != "abstractive" or not text or not isinstance(text, str):
+                results[i] = summarize_text(text, mode=mode)
+                continue
+            key = summary_cache_key(text)
+            cached = summary_cache.get(key)
+            if cached is not MISSING:
+                results[i] = cached
+                continue
+            if pipeline is MISSING:
+                pipeline = get_pipeline()
+            if pipeline is None:
+                logging.error("Summarization pipeline is not available.")
+                results[i] = "Error: Text summarization service is currently unavailable."
+            elif count_tokens(text) <= MODEL_MAX_INPUT_LENGTH - MODEL_SPECIAL_TOKENS:
+                future, leader = _summaries.claim(key)
+                if leader:
+                    direct[i] = (key, future)
+                else:
+                    following[i] = future
+
+        futures = summary_scheduler.submit_many([(texts[i], SUMMARY_MAX_LENGTH, SUMMARY_MIN_LENGTH) for i in direct])
+        for i, text in enumerate(texts):
+            if results[i] is None and i not in direct and i not in following:
+                results[i] = summarize_text(text, mode=mode)
+        for (i, (key, flight)), future in zip(direct.items(), futures):
+            try:
+                results[i] = _model_result(future, f"text {i + 1} of {len(texts)}")
+            except Exception as e:
+                logging.error(f"Error during text summarization: {e}")
+                results[i] = "Error: Could not summarize text due to an internal issue."
+            else:
+                summary_cache.set(key, results[i])
+            # Every claimed flight is finished before waiting on anyone else's, so two overlapping ranges never wait on each other
+            _summaries.finish(key, flight, results[i])
+    except BaseException as e:
+        # Claimed flights must always be finished, or later requests for their texts would wait forever
+        for key, flight in direct.values():
+            if not flight.done():
+                _summaries.finish(key, flight, exception=e)
+        raise
+    for i, flight in following.items():
+        results[i] = flight.result()
+    return results
+
+
+def summarize_range(chapter_texts: list[str], first_chapter: int = 1, mode: str = DEFAULT_SUMMARY_MODE) -> str:
+    for event in summarize_range_stream(chapter_texts, first_chapter=first_chapter, mode=mode):
+        pass
+    return event["summary"] if event["event"] == "summary" else event["error"]
+
+
+def summarize_range_stream(chapter_texts: list[str], first_chapter: int = 1, mode: str = DEFAULT_SUMMARY_MODE):
+    """
+    Summary of consecutive chapters, starting at chapter number `first_chapter`. Each chapter is
+    summarized (and cached) on its own, then the chapter summaries are reduced with reduce_summaries.
+    Events as in summarize_text_stream, with one "chunk" per chapter.
+    """
+    if mode not in SUMMARY_MODES:
+        yield {"event": "error", "error": f"Error: Unknown summarization mode '{mode}'."}
+        return
+    if not chapter_texts:
+        yield {"event": "error", "error": "Error: No text provided for summarization."}
+        return
+
+    summaries = summarize_texts(chapter_texts, mode=mode)
+    for i, summary in enumerate(summaries):
+        if summary.startswith("Error:"):
+            yield {"event": "error", "error": summary}
+            return
+        yield {"event": "chunk", "index": i, "total": len(summaries), "summary": summary}
+
+    summary = reduce_summaries(summaries, first_chapter=first_chapter, mode=mode)
+    yield {"event": "error", "error": summary} if summary.startswith("Error:") else {"event": "summary", "summary": summary}
+
+
+def reduce_summaries(summaries: list[str], first_chapter: int = 1, mode: str = DEFAULT_SUMMARY_MODE) -> str:
+    """
+    Reduces the summaries of consecutive chapters to one, level by level. A node at level L covers
+    SUMMARY_REDUCE_FANOUT ** L chapters, aligned to chapter 1 (with a fan-out of 6: chapters 1-6,
+    7-12, ..., then 1-36, ...). Overlapping ranges therefore share their inner nodes, and the summary
+    cache serves those instead of running the model. Only nodes with more than one child are summarized.
+    """
+    # (index of the node within its level, summary), starting from the chapters themselves
+    nodes = [(first_chapter - 1 + i, summary) for i, summary in enumerate(summaries)]
+    while len(nodes) > 1:
+        groups = {}
+        for index, summary in nodes:
+            groups.setdefault(index // SUMMARY_REDUCE_FANOUT, []).append(summary)
+        to_reduce = [index for index, children in groups.items() if len(children) > 1]
+        reduced = dict(zip(to_reduce, summarize_texts(["\n".join(groups[index]) for index in to_reduce], mode=mode)))
+        for summary in reduced.values():
+            if summary.startswith("Error:"):
+                return summary
+        nodes = [(index, reduced[index] if index in reduced else children[0]) for index, children in groups.items()]
+    return nodes[0][1] if nodes else "Error: No text provided for summarization."
+
+
+def summarize_text_stream(text: str, mode: str = DEFAULT_SUMMARY_MODE):
+    """
+    Same as summarize_text, as a generator of events: {"event": "chunk", "index", "total", "summary"}
+    for each chunk of a long text as soon as its summary is ready, then exactly one final
+    {"event": "summary", "summary"} or {"event": "error", "error"}.
+    """
     if not text or not isinstance(text, str):
         logging.warning("Summarize_text called with empty or invalid input.")
-        return "Error: No text provided for summarization."
+        yield {"event": "error", "error": "Error: No text provided for summarization."}
+        return
+    if mode not in SUMMARY_MODES:
+        yield {"event": "error", "error": f"Error: Unknown summarization mode '{mode}'."}
+        return
+    if mode == "extractive":
+        # Cheap enough that caching would cost more than it saves
+        yield {"event": "summary", "summary": summarize_extractive(text)}
+        return
 
-    try:
-        # Simple chunking strategy for texts longer than model's max input length
-        # This is a basic approach; more advanced methods involve overlapping chunks, recursive summarization, etc.
-        
-        # Tokenize to get actual token count - more accurate than char count for model limits
-        # However, for simplicity here, we'll stick to character count as an approximation,
-        # as direct tokenization before splitting adds complexity with the current pipeline usage.
-        # A more robust solution would use tokenizer.encode to check token length.
-        
-        text_len = len(text) # Character length as a proxy
-
-        if text_len > MODEL_MAX_INPUT_LENGTH:
-            logging.info(f"Text length ({text_len} chars) exceeds model max input ({MODEL_MAX_INPUT_LENGTH} chars). Applying basic chunking.")
-            
-            # Heuristic: Split into chunks that are slightly less than the max model length to allow for summarization overhead.
-            # This is a very naive splitting strategy (by character, not by sentence or token).
-            # For better results, split along sentence boundaries.
-            num_chunks = (text_len // (MODEL_MAX_INPUT_LENGTH - SUMMARY_MAX_LENGTH)) + 1
-            chunk_size = text_len // num_chunks
-            
-            chunks = [text[i:i + chunk_size] for i in range(0, text_len, chunk_size)]
-            
-            summaries = []
-            for i, chunk in enumerate(chunks):
-                if not chunk.strip(): # Skip empty chunks
-                    continue
-                logging.info(f"Summarizing chunk {i+1}/{len(chunks)} (length: {len(chunk)} chars)")
-                # Adjust summary length for chunks - make them shorter
-                chunk_summary_max_length = max(SUMMARY_MIN_LENGTH, SUMMARY_MAX_LENGTH // len(chunks)) 
-                chunk_summary_min_length = max(10, SUMMARY_MIN_LENGTH // len(chunks))
-
-                # Ensure chunk is not too short for the min_length requirement of the summary
-                if len(chunk) < chunk_summary_min_length * 2: # Heuristic
-                    logging.warning(f"Chunk {i+1} is too short for meaningful summarization, using chunk as is.")
-                    summaries.append(chunk)
-                    continue
-
-                summary_output = summarizer_pipeline(
-                    chunk, 
-                    max_length=chunk_summary_max_length, 
-                    min_length=chunk_summary_min_length, 
-                    do_sample=False,
-                    truncation=True # Ensure input is truncated if it somehow still exceeds model limits
-                )
-                summaries.append(summary_output[0]['summary_text'])
-            
-            final_summary = " ".join(summaries)
-            # If the combined summary is too long, summarize it again (recursive summarization)
-            if len(final_summary) > SUMMARY_MAX_LENGTH * 1.5: # Heuristic factor
-                 logging.info("Combined summary is too long, performing a second pass summarization.")
-                 final_summary_output = summarizer_pipeline(
-                    final_summary,
-                    max_length=SUMMARY_MAX_LENGTH,
-                    min_length=SUMMARY_MIN_LENGTH,
-                    do_sample=False,
-                    truncation=True
-                 )
-                 final_summary = final_summary_output[0]['summary_text']
-            return final_summary
+    key = summary_cache_key(text)
+    cached = summary_cache.get(key)
+    if cached is not MISSING:
+        yield {"event": "summary", "summary": cached}
+        return
+    yield from _summarize_miss_events(text, key)
 
-        else:
-            # Text is within the direct processing limit
-            summary_output = summarizer_pipeline(
-                text, 
-                max_length=SUMMARY_MAX_LENGTH, 
-                min_length=SUMMARY_MIN_LENGTH, 
-                do_sample=False,
-                truncation=True # Good practice
-            )
-            return summary_output[0]['summary_text']
 
+def _summarize_miss_events(text: str, key: str):
+    if get_pipeline() is None:
+        logging.error("Summarization pipeline is not available.")
+        yield {"event": "error", "error": "Error: Text summarization service is currently unavailable."}
+        return
+
+    try:
+        for event in _summarize_events(text):
+            if event["event"] == "summary":
+                final = event
+            else:
+                yield event
     except Exception as e:
         logging.error(f"Error during text summarization: {e}")
         # Potentially inspect 'e' for specific HuggingFace transformer errors
-        return "Error: Could not summarize text due to an internal issue."
+        yield {"event": "error", "error": "Error: Could not summarize text due to an internal issue."}
+        return
+    # Only successful summaries reach the cache, so that the next call after an error retries
+    summary_cache.set(key, final["summary"])
+    yield final
+
+
+def count_tokens(text: str) -> int:
+    """Token count as the model sees it, without special tokens."""
+    tokenizer = getattr(summarizer_pipeline, "tokenizer", None)
+    if tokenizer is None:
+        return len(text) // CHARS_PER_TOKEN_ESTIMATE + 1
+    return len(tokenizer.encode(text, add_special_tokens=False))
+
+
+def _split_long_unit(unit: str, budget: int) -> list[str]:
+    """Splits a verse that alone exceeds the token budget, at sentence then word boundaries."""
+    pieces = []
+    for sentence in _SENTENCE_BOUNDARY.split(unit):
+        if count_tokens(sentence) <= budget:
+            pieces.append(sentence)
+            continue
+        words = sentence.split()
+        current = []
+        for word in words:
+            if current and count_tokens(" ".join(current + [word])) > budget:
+                pieces.append(" ".join(current))
+                current = []
+            current.append(word)
+        if current:
+            pieces.append(" ".join(current))
+    return pieces
+
+
+def chunk_text(text: str, max_tokens: int | None = None, overlap: int | None = None) -> list[str]:
+    """
+    Packs whole verses (lines) into chunks of at most `max_tokens` model tokens, so no verse or
+    sentence is cut in half. The last `overlap` verses of a chunk are repeated at the start of the
+    next one for context. A single verse longer than the budget is split at sentence boundaries.
+    """
+    budget = (MODEL_MAX_INPUT_LENGTH - MODEL_SPECIAL_TOKENS) if max_tokens is None else max_tokens
+    overlap = CHUNK_OVERLAP_VERSES if overlap is None else overlap
+
+    units = []
+    for line in text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        tokens = count_tokens(line)
+        if tokens > budget:
+            units.extend((piece, count_tokens(piece)) for piece in _split_long_unit(line, budget))
+        else:
+            units.append((line, tokens))
+
+    chunks = []
+    current = []
+    current_tokens = 0
+    for unit, tokens in units:
+        # +1 per verse for the joining whitespace, which can change how the first word tokenizes
+        if current and current_tokens + tokens + 1 > budget:
+            chunks.append("\n".join(u for u, _ in current))
+            carried = current[-overlap:] if overlap else []
+            if sum(t + 1 for _, t in carried) + tokens + 1 > budget:
+                carried = []
+            current = list(carried)
+            current_tokens = sum(t + 1 for _, t in carried)
+        current.append((unit, tokens))
+        current_tokens += tokens + 1
+    if current:
+        chunks.append("\n".join(u for u, _ in current))
+    return chunks
+
+
+def summarize_batch(texts: list[str], max_length: int, min_length: int) -> list[str]:
+    """
+    Summarizes several texts in padded batches of SUMMARY_BATCH_SIZE. Texts are sorted longest
+    first so each batch holds inputs of similar length and little compute goes to padding;
+    summaries are returned in the original order. Calls the model directly, bypassing the scheduler.
+    """
+    if len(texts) == 1:
+        summary_output = summarizer_pipeline(texts[0], max_length=max_length, min_length=min_length, do_sample=False, truncation=True)
+        return [summary_output[0]['summary_text']]
+    order = sorted(range(len(texts)), key=lambda i: count_tokens(texts[i]), reverse=True)
+    outputs = summarizer_pipeline(
+        [texts[i] for i in order],
+        batch_size=SUMMARY_BATCH_SIZE,
+        max_length=max_length,
+        min_length=min_length,
+        do_sample=False,
+        truncation=True # Ensure input is truncated if it somehow still exceeds model limits
+    )
+    summaries = [None] * len(texts)
+    for i, output in zip(order, outputs):
+        summaries[i] = output['summary_text']
+    return summaries
+
+
+def _generate(texts: list[str], max_length: int, min_length: int, description: str) -> list[str]:
+    # Goes through the scheduler so concurrent requests share forward passes
+    futures = summary_scheduler.submit_many([(text, max_length, min_length) for text in texts])
+    return [_model_result(future, description) for future in futures]
+
+
+def _model_result(future, description: str) -> str:
+    """Waits for a model call, and records it as a stage of the request if the request is profiled."""
+    summary = future.result()
+    if profiling.current() is not None:
+        profiling.record(
+            "generate", future.run_seconds,
+            f"{description} - batch of {future.batch_size} - queued {future.queued_seconds * 1000:.1f} ms",
+        )
+    return summary
+
+
+def _summarize_events(text: str):
+    with metrics.timed("stage_duration_seconds", stage="tokenize"):
+        token_count = count_tokens(text)
+
+    if token_count <= MODEL_MAX_INPUT_LENGTH - MODEL_SPECIAL_TOKENS:
+        # Text is within the direct processing limit
+        yield {"event": "summary", "summary": _generate([text], SUMMARY_MAX_LENGTH, SUMMARY_MIN_LENGTH, "whole text")[0]}
+        return
+
+    # Pack whole verses into as few chunks as fit the model's real token limit
+    with metrics.timed("stage_duration_seconds", stage="chunk"):
+        chunks = chunk_text(text)
+    logging.info(f"Text length ({token_count} tokens) exceeds model max input ({MODEL_MAX_INPUT_LENGTH} tokens). Split into {len(chunks)} chunks.")
+
+    # Adjust summary length for chunks - make them shorter
+    chunk_summary_max_length = max(SUMMARY_MIN_LENGTH, SUMMARY_MAX_LENGTH // len(chunks))
+    chunk_summary_min_length = max(10, SUMMARY_MIN_LENGTH // len(chunks))
+
+    to_summarize = []
+    for i, chunk in enumerate(chunks):
+        # Ensure chunk is not too short for the min_length requirement of the summary
+        if count_tokens(chunk) < chunk_summary_min_length * 2: # Heuristic
+            logging.warning(f"Chunk {i+1} is too short for meaningful summarization, using chunk as is.")
+            continue
+        to_summarize.append(i)
+
+    futures = {}
+    if to_summarize:
+        logging.info(f"Summarizing {len(to_summarize)} chunks in batches of {SUMMARY_BATCH_SIZE}")
+        # All chunks are queued at once so they still share batches; each is reported as it resolves
+        batch = summary_scheduler.submit_many(
+            [(chunks[i], chunk_summary_max_length, chunk_summary_min_length) for i in to_summarize]
+        )
+        futures = dict(zip(to_summarize, batch))
+
+    summaries = []
+    for i, chunk in enumerate(chunks):
+        summary = _model_result(futures[i], f"chunk {i + 1} of {len(chunks)}") if i in futures else chunk
+        summaries.append(summary)
+        yield {"event": "chunk", "index": i, "total": len(chunks), "summary": summary}
+
+    final_summary = " ".join(summaries)
+    # If the combined summary is longer than a single summary may be, summarize it again (recursive summarization)
+    if count_tokens(final_summary) > SUMMARY_MAX_LENGTH:
+        logging.info("Combined summary is too long, performing a second pass summarization.")
+        final_summary = _generate([final_summary], SUMMARY_MAX_LENGTH, SUMMARY_MIN_LENGTH, "second pass")[0]
+    yield {"event": "summary", "summary": final_summary}